@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Header
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import logging
+
+from app.core.config import settings
+from app.core.security import admin_authorized
+from app.schemas.admin import ProfileRequest
+from app.schemas.ret_result import ResponseResult, ResultMessageEnum
+from app.utils.loop_monitor import loop_monitor
+from app.utils.profiler import ProfilerBusyError, profiler
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.post("/profile")
+async def profile_worker(
+    request: ProfileRequest,
+    format: str = "json",
+    x_admin_token: Optional[str] = Header(default=None)
+):
+    """
+    요청을 받은 워커 프로세스를 지정 시간/요청 수 동안 샘플링 프로파일링합니다.
+
+    - PROFILER_ENABLED=false(기본) 이거나 ADMIN_TOKEN 미설정 시 404
+    - X-Admin-Token 헤더 필요
+    - format=collapsed: collapsed-stack 텍스트만 반환 (flamegraph.pl / speedscope 입력)
+    """
+    if not settings.PROFILER_ENABLED or not settings.ADMIN_TOKEN:
+        return ResponseResult.error(result_code=404, result_msg=ResultMessageEnum.NOT_FOUND)
+    if not admin_authorized(x_admin_token):
+        return ResponseResult.error(result_code=401, result_msg=ResultMessageEnum.AUTHENTICATION_REQUIRE)
+
+    try:
+        result = await profiler.profile(
+            duration_s=min(request.duration_s, settings.PROFILER_MAX_DURATION_S),
+            max_requests=request.requests,
+            interval_ms=request.interval_ms,
+            memory=request.memory,
+            memory_frames=request.memory_frames,
+            top=request.top,
+            include_idle=request.include_idle
+        )
+    except ProfilerBusyError as e:
+        return ResponseResult.error(result_code=409, result_msg=str(e))
+    except Exception as e:
+        logger.exception(f"Profiling error: {e}")
+        return ResponseResult.error(result_code=500, result_msg=f"Profiling error: {str(e)}")
+
+    if format == "collapsed":
+        return PlainTextResponse(result["collapsed"] + "\n")
+    return ResponseResult.success(
+        result_code=200,
+        result_msg="Profiling completed",
+        data=result
+    )
+
+
+@router.get("/loop")
+async def event_loop_stats(
+    format: str = "json",
+    stacks: bool = True,
+    x_admin_token: Optional[str] = Header(default=None)
+):
+    """
+    요청을 받은 워커의 이벤트 루프 lag 히스토그램 / 최근 블로킹 스택 / 부하 차단 횟수.
+
+    - ADMIN_TOKEN 미설정 시 404, X-Admin-Token 헤더 필요 (스택에 소스 경로가 포함됨)
+    - format=prometheus: lag 히스토그램과 카운터를 Prometheus text 형식으로 반환
+    """
+    if not settings.ADMIN_TOKEN:
+        return ResponseResult.error(result_code=404, result_msg=ResultMessageEnum.NOT_FOUND)
+    if not admin_authorized(x_admin_token):
+        return ResponseResult.error(result_code=401, result_msg=ResultMessageEnum.AUTHENTICATION_REQUIRE)
+
+    if format == "prometheus":
+        return PlainTextResponse(loop_monitor.prometheus(), media_type="text/plain; version=0.0.4")
+    return ResponseResult.success(
+        result_code=200,
+        result_msg="Event loop stats",
+        data=loop_monitor.snapshot(include_stacks=stacks)
+    )
@@ -1,52 +1,304 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, Request
+from starlette.requests import ClientDisconnect
+from typing import Optional
+import asyncio
 import logging
 
+from app.core.config import settings
+from app.core.llm_scheduler import LLMOverloaded
+from app.core.security import admin_authorized
 from app.schemas.blog import SearchQuery
-from app.schemas.ret_result import ResponseResult
-from app.services.rag_service import rag_service
+from app.schemas.ret_result import ResponseResult, ResultMessageEnum
+from app.services.corpus_registry import UnknownCorpusError, corpus_registry
+from app.services.index_snapshots import SnapshotError
+from app.services.cache_warmer import cache_warmer
+from app.services.query_log import query_log
+from app.services.upload_service import UploadError, upload_service
+from app.utils.disconnect import ClientDisconnected, cancel_on_disconnect
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
 @router.post("/search")
-async def search_blog(query: SearchQuery):
+async def search_blog(query: SearchQuery, request: Request):
     """
     Search blog posts using RAG.
+    클라이언트 연결이 끊기면 검색/LLM 호출을 취소합니다.
     """
     try:
-        if query.test:
-            answer = rag_service.query_test(query.query)
-        elif query.referer:
-            answer = rag_service.query_with_sources(query.query)
-        else:
-            answer = rag_service.query(query.query)
-        return await ResponseResult.success(
+        corpus = corpus_registry.get(query.corpus)
+        mode = "test" if query.test else "sources" if query.referer else "plain"
+        filters = query.filter.model_dump(mode="json", exclude_none=True) if query.filter else None
+        query_log.record("blog/search", {
+            "query": query.query, "mode": mode, "corpus": corpus.name, "k": query.k, "filter": filters
+        })
+        answer = await cancel_on_disconnect(request, corpus.aanswer(query.query, mode, query.k, filters), "blog/search")
+        return ResponseResult.success(
             result_code=200,
             result_msg="Blog search successful",
-            data={"answer": answer}
+            data={"answer": answer, "corpus": corpus.name}
         )
+    except UnknownCorpusError:
+        return ResponseResult.error(
+            result_code=404,
+            result_msg=f"Unknown corpus: {query.corpus}"
+        )
+    except ClientDisconnected:
+        # 받을 클라이언트가 없으므로 직렬화 없이 종료
+        return ResponseResult.error(result_code=499, result_msg="Client disconnected")
+    except LLMOverloaded as e:
+        logger.warning(f"LLM 스케줄러 거절: {e}")
+        return ResponseResult.error(result_code=503, result_msg=str(e))
     except Exception as e:
-        return await ResponseResult.error(
+        return ResponseResult.error(
             result_code=500,
             result_msg=f"Blog search error: {str(e)}"
         )
 
 
 @router.post("/index")
-async def index_blog_posts():
+async def index_blog_posts(corpus: Optional[str] = None):
     """
-    Trigger re-indexing of blog posts.
+    Trigger re-indexing of blog posts (corpus 생략 시 기본 코퍼스).
+    새 스냅샷으로 빌드하는 동안에도 기존 버전으로 검색하고, 완성되면 리더를 교체합니다.
     """
     try:
-        rag_service.load_and_index()
-        return await ResponseResult.success(
+        target = corpus_registry.get(corpus)
+        await asyncio.to_thread(target.load_and_index)
+        corpus_registry.refresh(target.name)
+        # 재인덱싱으로 비워진 검색/답변 캐시를 인기 질의로 다시 채움
+        cache_warmer.schedule("reindex")
+        return ResponseResult.success(
             result_code=200,
-            result_msg="Blog posts indexed successfully"
+            result_msg="Blog posts indexed successfully",
+            data={"corpus": target.name, "index_version": target.index_version}
+        )
+    except UnknownCorpusError:
+        return ResponseResult.error(
+            result_code=404,
+            result_msg=f"Unknown corpus: {corpus}"
         )
     except Exception as e:
         logger.exception(f"Error indexing blog posts: {e}", exc_info=True)
-        return await ResponseResult.error(
+        return ResponseResult.error(
             result_code=500,
             result_msg=f"Blog indexing error: {str(e)}"
         )
+
+
+@router.post("/upload")
+async def upload_blog_posts(
+    request: Request,
+    corpus: Optional[str] = None,
+    filename: Optional[str] = None,
+    directory: Optional[str] = None,
+    overwrite: bool = False,
+    x_admin_token: Optional[str] = Header(default=None)
+):
+    """
+    마크다운 파일 / 아카이브(.zip, .tar, .tar.gz)를 업로드하고 업로드한 글만 인덱싱합니다.
+
+    - multipart/form-data (파일 여러 개) 또는 raw 바디 + filename 쿼리
+    - 바디는 청크 단위로 디스크에 기록 (업로드 크기와 무관하게 메모리 일정)
+    - 기존 글과 내용(sha256)이 같으면 건너뛰고, 같은 경로의 다른 내용은 overwrite=true 일 때만 교체
+    - ADMIN_TOKEN 미설정 시 404, X-Admin-Token 헤더 필요
+    """
+    if not settings.ADMIN_TOKEN:
+        return ResponseResult.error(result_code=404, result_msg=ResultMessageEnum.NOT_FOUND)
+    if not admin_authorized(x_admin_token):
+        return ResponseResult.error(result_code=401, result_msg=ResultMessageEnum.AUTHENTICATION_REQUIRE)
+
+    try:
+        target = corpus_registry.get(corpus)
+        content_length = request.headers.get("content-length")
+        result = await upload_service.upload(
+            target,
+            request.stream(),
+            content_type=request.headers.get("content-type", ""),
+            filename=filename,
+            directory=directory,
+            overwrite=overwrite,
+            content_length=int(content_length) if content_length and content_length.isdigit() else None
+        )
+        if result["indexed"]:
+            corpus_registry.refresh(target.name)
+            # 새 글이 반영되도록 비워진 검색/답변 캐시를 인기 질의로 다시 채움
+            cache_warmer.schedule("reindex")
+        return ResponseResult.success(
+            result_code=200,
+            result_msg=ResultMessageEnum.FILE_UPLOAD_SUCCESS,
+            data=result
+        )
+    except UnknownCorpusError:
+        return ResponseResult.error(
+            result_code=404,
+            result_msg=f"Unknown corpus: {corpus}"
+        )
+    except UploadError as e:
+        return ResponseResult.error(
+            result_code=e.status_code,
+            result_msg=str(e)
+        )
+    except ClientDisconnect:
+        return ResponseResult.error(result_code=499, result_msg="Client disconnected")
+    except Exception as e:
+        logger.exception(f"Error uploading blog posts: {e}")
+        return ResponseResult.error(
+            result_code=500,
+            result_msg=f"Blog upload error: {str(e)}"
+        )
+
+
+@router.get("/index/snapshots")
+async def list_snapshots(corpus: Optional[str] = None):
+    """
+    코퍼스의 인덱스 스냅샷 목록(manifest)과 활성 버전을 조회합니다.
+    """
+    try:
+        info = await asyncio.to_thread(corpus_registry.get(corpus).snapshot_info)
+        return ResponseResult.success(
+            result_code=200,
+            result_msg="Index snapshots",
+            data=info
+        )
+    except UnknownCorpusError:
+        return ResponseResult.error(
+            result_code=404,
+            result_msg=f"Unknown corpus: {corpus}"
+        )
+
+
+@router.post("/index/rollback")
+async def rollback_index(
+    corpus: Optional[str] = None,
+    version: Optional[str] = None,
+    x_admin_token: Optional[str] = Header(default=None)
+):
+    """
+    이전(또는 지정한) 스냅샷으로 되돌립니다 (체크섬 검증 후 포인터 교체, 재시작 불필요).
+    ADMIN_TOKEN 미설정 시 404, X-Admin-Token 헤더 필요
+    """
+    if not settings.ADMIN_TOKEN:
+        return ResponseResult.error(result_code=404, result_msg=ResultMessageEnum.NOT_FOUND)
+    if not admin_authorized(x_admin_token):
+        return ResponseResult.error(result_code=401, result_msg=ResultMessageEnum.AUTHENTICATION_REQUIRE)
+
+    try:
+        target = corpus_registry.get(corpus)
+        active = await asyncio.to_thread(target.rollback, version)
+        corpus_registry.refresh(target.name)
+        return ResponseResult.success(
+            result_code=200,
+            result_msg="Index rolled back",
+            data={"corpus": target.name, "index_version": active}
+        )
+    except UnknownCorpusError:
+        return ResponseResult.error(
+            result_code=404,
+            result_msg=f"Unknown corpus: {corpus}"
+        )
+    except SnapshotError as e:
+        return ResponseResult.error(
+            result_code=409,
+            result_msg=str(e)
+        )
+    except Exception as e:
+        logger.exception(f"Error rolling back index: {e}")
+        return ResponseResult.error(
+            result_code=500,
+            result_msg=f"Index rollback error: {str(e)}"
+        )
+
+
+@router.post("/index/summaries")
+async def build_summaries(corpus: Optional[str] = None, x_admin_token: Optional[str] = Header(default=None)):
+    """
+    활성 스냅샷의 글 / 섹션 요약 생성을 백그라운드로 시작합니다 (summary-first 검색용, 캐시된 요약은 재사용).
+    코퍼스 전체를 LLM 으로 요약하므로 ADMIN_TOKEN 미설정 시 404, X-Admin-Token 헤더 필요
+    """
+    if not settings.ADMIN_TOKEN:
+        return ResponseResult.error(result_code=404, result_msg=ResultMessageEnum.NOT_FOUND)
+    if not admin_authorized(x_admin_token):
+        return ResponseResult.error(result_code=401, result_msg=ResultMessageEnum.AUTHENTICATION_REQUIRE)
+
+    try:
+        target = corpus_registry.get(corpus)
+        started = await asyncio.to_thread(target.build_summaries)
+        return ResponseResult.success(
+            result_code=200,
+            result_msg="Summary generation started" if started else "Summary generation already running",
+            data={"corpus": target.name, "started": started}
+        )
+    except UnknownCorpusError:
+        return ResponseResult.error(
+            result_code=404,
+            result_msg=f"Unknown corpus: {corpus}"
+        )
+    except Exception as e:
+        logger.exception(f"Error starting summary generation: {e}")
+        return ResponseResult.error(
+            result_code=500,
+            result_msg=f"Summary generation error: {str(e)}"
+        )
+
+
+@router.get("/index/summaries")
+async def get_summary_status(corpus: Optional[str] = None):
+    """
+    요약 인덱스 상태 (활성 스냅샷의 요약 수, 진행 중인 배치의 생성 / 재사용 / 실패 수)를 조회합니다.
+    """
+    try:
+        status = await asyncio.to_thread(corpus_registry.get(corpus).summary_status)
+        return ResponseResult.success(
+            result_code=200,
+            result_msg="Summary index status",
+            data=status
+        )
+    except UnknownCorpusError:
+        return ResponseResult.error(
+            result_code=404,
+            result_msg=f"Unknown corpus: {corpus}"
+        )
+
+
+@router.get("/corpora")
+async def list_corpora():
+    """
+    코퍼스별 인덱스 상태(열림 여부, 청크 수, 크기, 로드 시간, 축출 횟수)를 조회합니다.
+    """
+    return ResponseResult.success(
+        result_code=200,
+        result_msg="Corpus stats",
+        data=corpus_registry.stats()
+    )
+
+
+@router.post("/cache/warm")
+async def warm_cache(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    쿼리 로그 상위 입력으로 캐시 예열을 시작합니다 (백그라운드).
+    기록된 질의를 LLM 으로 다시 실행하므로 ADMIN_TOKEN 미설정 시 404, X-Admin-Token 헤더 필요
+    """
+    if not settings.ADMIN_TOKEN:
+        return ResponseResult.error(result_code=404, result_msg=ResultMessageEnum.NOT_FOUND)
+    if not admin_authorized(x_admin_token):
+        return ResponseResult.error(result_code=401, result_msg=ResultMessageEnum.AUTHENTICATION_REQUIRE)
+
+    cache_warmer.schedule("manual")
+    return ResponseResult.success(
+        result_code=202,
+        result_msg="Cache warming scheduled"
+    )
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """
+    캐시 적중률과 마지막 예열 결과를 조회합니다.
+    """
+    return ResponseResult.success(
+        result_code=200,
+        result_msg="Cache stats",
+        data=cache_warmer.stats()
+    )
@@ -0,0 +1,70 @@
+from fastapi import APIRouter, BackgroundTasks
+from starlette.concurrency import run_in_threadpool
+import logging
+
+from app.core.llm_scheduler import LLMOverloaded
+from app.schemas.mochachat import ChatRequest
+from app.schemas.ret_result import ResponseResult
+from app.services.chat_service import chat_service
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.post("/chat")
+async def chat(request: ChatRequest, background_tasks: BackgroundTasks):
+    """
+    세션 기반 대화. session_id 를 넘기면 이전 대화를 이어서 답변합니다.
+    """
+    try:
+        result = await run_in_threadpool(chat_service.chat, request.session_id, request.message)
+        if result.pop("needs_compaction"):
+            background_tasks.add_task(run_in_threadpool, chat_service.compact, result["session_id"])
+        return ResponseResult.success(
+            result_code=200,
+            result_msg="Chat successful",
+            data=result
+        )
+    except LLMOverloaded as e:
+        logger.warning(f"LLM 스케줄러 거절: {e}")
+        return ResponseResult.error(
+            result_code=503,
+            result_msg=str(e),
+            data={"session_id": request.session_id}
+        )
+    except Exception as e:
+        logger.exception(f"Chat error: {e}")
+        return ResponseResult.error(
+            result_code=500,
+            result_msg=f"Chat error: {str(e)}",
+            data={"session_id": request.session_id}
+        )
+
+
+@router.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    """
+    세션의 요약과 최근 대화 이력을 조회합니다.
+    """
+    history = chat_service.history(session_id)
+    if history is None:
+        return ResponseResult.error(result_code=404, result_msg="Session not found")
+    return ResponseResult.success(result_code=200, result_msg="Session found", data=history)
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """
+    세션을 삭제합니다.
+    """
+    if not chat_service.store.delete(session_id):
+        return ResponseResult.error(result_code=404, result_msg="Session not found")
+    return ResponseResult.success(result_code=200, result_msg="Session deleted")
+
+
+@router.get("/stats")
+async def session_stats():
+    """
+    세션 저장소 메모리 사용량을 조회합니다.
+    """
+    return ResponseResult.success(result_code=200, data=chat_service.store.stats())
@@ -1,46 +1,101 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+import asyncio
 import logging
 
-from app.core.groq_client import call_groq_with_yaml
-from app.utils.prompt_loader import get_prompt, render_prompt
+import orjson
+
+from app.core.config import settings
+from app.core.groq_client import acall_groq_with_yaml, astream_groq_with_yaml, generation_stats
+from app.core.llm_scheduler import LLMOverloaded, llm_scheduler
+from app.services.sql_engine import sql_engine, SQLExecutionUnsupported
+from app.services.query_analyzer import query_analyzer, format_analysis_for_prompt
+from app.services.query_log import query_log
+from app.utils.prompt_loader import get_prompt
+from app.utils.token_counter import TokenBudgetExceeded, render_prompt_within_budget
 from app.schemas.sql_tutor import TextInput, SQLInput
-from app.utils.json_utils import parse_json_response, validate_json_structure
+from app.utils.structured_output import IncrementalJSONParser, parse_structured_output
 from app.schemas.ret_result import ResponseResult
+from app.utils.disconnect import ClientDisconnected, cancel_on_disconnect, cancellation_stats
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
 @router.post("/result")
-async def get_sql_result(data: SQLInput):
-    """SQL 쿼리 실행 결과를 시뮬레이션합니다."""
+async def get_sql_result(data: SQLInput, request: Request):
+    """SQL 쿼리를 로컬 SQLite 엔진으로 실행하고, 실행할 수 없으면 LLM으로 시뮬레이션합니다."""
+    query_log.record("tools/sql/result", {"query": data.query, "context": data.context})
     try:
+        if settings.SQL_ENGINE_ENABLED:
+            try:
+                local_result = await sql_engine.execute_async(data.query, data.context)
+                return ResponseResult.success(
+                    result_code=200,
+                    result_msg="SQL execution successful",
+                    data={
+                        "query": data.query,
+                        "database_type": data.database_type,
+                        "engine": "sqlite",
+                        "execution_result": local_result
+                    }
+                )
+            except SQLExecutionUnsupported as e:
+                logger.info(f"로컬 실행 불가, LLM 시뮬레이션으로 대체: {e}")
+
         prompt_data = get_prompt("sql_tutor_prompts.yaml", "sql_execute")
         system_prompt = prompt_data.get("system", "")
         user_template = prompt_data.get("user", "")
 
-        user_prompt = render_prompt(user_template, {
+        user_prompt, estimated_tokens = render_prompt_within_budget("sql_execute", system_prompt, user_template, {
             "query": data.query,
             "database_type": data.database_type,
             "context": data.context
         })
 
-        result = call_groq_with_yaml(system_prompt, user_prompt)
-        parsed_result = parse_json_response(result)
+        parsed_result = await cancel_on_disconnect(request, acall_groq_with_yaml(
+            system_prompt, user_prompt,
+            output_schema=prompt_data.get("output_schema"),
+            estimated_tokens=estimated_tokens,
+            section="sql_execute",
+            generation=prompt_data.get("generation")
+        ), "tools/sql/result")
 
-        return await ResponseResult.success(
+        return ResponseResult.success(
             result_code=200,
             result_msg="SQL simulation successful",
             data={
                 "query": data.query,
                 "database_type": data.database_type,
+                "engine": "llm",
                 "execution_result": parsed_result
             }
         )
 
+    except TokenBudgetExceeded as e:
+        logger.warning(f"SQL 실행 시뮬레이션 프롬프트 예산 초과: {e}")
+        return ResponseResult.error(
+            result_code=413,
+            result_msg=str(e),
+            data={
+                "query": data.query,
+                "database_type": data.database_type,
+                "estimated_tokens": e.tokens,
+                "token_budget": e.budget
+            }
+        )
+
+    except ClientDisconnected:
+        # 받을 클라이언트가 없으므로 직렬화 없이 종료
+        return ResponseResult.error(result_code=499, result_msg="Client disconnected")
+
+    except LLMOverloaded as e:
+        logger.warning(f"LLM 스케줄러 거절: {e}")
+        return ResponseResult.error(result_code=503, result_msg=str(e))
+
     except Exception as e:
         logger.exception(f"SQL 실행 시뮬레이션 오류: {e}")
-        return await ResponseResult.error(
+        return ResponseResult.error(
             result_code=500,
             result_msg=f"SQL simulation error: {str(e)}",
             data={
@@ -51,36 +106,34 @@ async def get_sql_result(data: SQLInput):
 
 
 @router.post("/convert")
-async def convert_nl_to_sql(data: TextInput):
+async def convert_nl_to_sql(data: TextInput, request: Request):
     """자연어를 SQL 쿼리로 변환합니다."""
+    query_log.record("tools/sql/convert", {"description": data.description, "context": data.context})
     try:
         prompt_data = get_prompt("sql_tutor_prompts.yaml", "sql_convert")
         system_prompt = prompt_data.get("system", "")
         user_template = prompt_data.get("user", "")
 
-        user_prompt = render_prompt(user_template, {
+        user_prompt, estimated_tokens = render_prompt_within_budget("sql_convert", system_prompt, user_template, {
             "natural_language_query": data.description,
             "database_type": data.database_type,
             "context": data.context
         })
 
-        # LLM 호출
-        result = call_groq_with_yaml(system_prompt, user_prompt)
-        logger.info(f"LLM 원본 응답 타입: {type(result)}")
-        logger.info(f"LLM 원본 응답 내용: {str(result)[:200]}...")
-
-        # JSON 파싱
-        parsed_result = parse_json_response(result)
-        logger.info(f"파싱된 결과 타입: {type(parsed_result)}")
+        # LLM 호출 (output_schema 로 구조화 출력 요청 및 1회 검증)
+        validated_result = await cancel_on_disconnect(request, acall_groq_with_yaml(
+            system_prompt, user_prompt,
+            output_schema=prompt_data.get("output_schema"),
+            estimated_tokens=estimated_tokens,
+            section="sql_convert",
+            generation=prompt_data.get("generation")
+        ), "tools/sql/convert")
 
-        # 필수 필드 검증
-        required_fields = ["sql_query", "explanation", "complexity", "estimated_performance", "key_concepts", "security_notes"]
-        validated_result = validate_json_structure(parsed_result, required_fields)
         # 응답 구조 표준화
         response = {"input": data.description, "database_type": data.database_type, "context": data.context}
         response.update(validated_result)
 
-        return await ResponseResult.success(
+        return ResponseResult.success(
             result_code=200,
             result_msg="Natural language to SQL conversion successful",
             data={
@@ -97,9 +150,30 @@ async def convert_nl_to_sql(data: TextInput):
             }
         )
 
+    except TokenBudgetExceeded as e:
+        logger.warning(f"natural lang to SQL prompt over budget: {e}")
+        return ResponseResult.error(
+            result_code=413,
+            result_msg=str(e),
+            data={
+                "description": data.description,
+                "database_type": data.database_type,
+                "estimated_tokens": e.tokens,
+                "token_budget": e.budget
+            }
+        )
+
+    except ClientDisconnected:
+        # 받을 클라이언트가 없으므로 직렬화 없이 종료
+        return ResponseResult.error(result_code=499, result_msg="Client disconnected")
+
+    except LLMOverloaded as e:
+        logger.warning(f"LLM 스케줄러 거절: {e}")
+        return ResponseResult.error(result_code=503, result_msg=str(e))
+
     except Exception as e:
         logger.exception(f"natural lang to SQL convert Error: {e}", exc_info=True)
-        return await ResponseResult.error(
+        return ResponseResult.error(
             result_code=500,
             result_msg=f"Error converting natural language to SQL: {str(e)}",
             data={
@@ -109,48 +183,166 @@ async def convert_nl_to_sql(data: TextInput):
         )
 
 
-@router.post("/optimize")
-async def optimize_sql(data: SQLInput):
-    """SQL 쿼리를 최적화합니다."""
-    try:
-        prompt_data = get_prompt("sql_tutor_prompts.yaml", "sql_optimize")
-        system_prompt = prompt_data.get("system", "")
-        user_template = prompt_data.get("user", "")
+@router.post("/convert/stream")
+async def convert_nl_to_sql_stream(data: TextInput):
+    """
+    자연어를 SQL 쿼리로 변환하며, 필드가 완성되는 즉시 NDJSON 이벤트로 전송합니다.
 
-        user_prompt = render_prompt(user_template, {
-            "query": data.query,
+    이벤트 형식:
+        {"event": "field", "key": "sql_query", "value": "..."}
+        {"event": "done", "data": {...}}
+        {"event": "error", "message": "..."}
+    """
+    query_log.record("tools/sql/convert", {"description": data.description, "context": data.context})
+    prompt_data = get_prompt("sql_tutor_prompts.yaml", "sql_convert")
+    system_prompt = prompt_data.get("system", "")
+    output_schema = prompt_data.get("output_schema")
+    try:
+        # 스트림 시작 전에 예산을 확인해야 413 상태 코드로 응답할 수 있음
+        user_prompt, estimated_tokens = render_prompt_within_budget("sql_convert", system_prompt, prompt_data.get("user", ""), {
+            "natural_language_query": data.description,
             "database_type": data.database_type,
-            "data_scale": "1k,10k,100k,1m",
-            "performance_requirements": "balanced"
+            "context": data.context
         })
+    except TokenBudgetExceeded as e:
+        logger.warning(f"natural lang to SQL stream prompt over budget: {e}")
+        return ResponseResult.error(
+            result_code=413,
+            result_msg=str(e),
+            data={
+                "description": data.description,
+                "database_type": data.database_type,
+                "estimated_tokens": e.tokens,
+                "token_budget": e.budget
+            }
+        )
+
+    async def event_stream():
+        # 비동기 생성기: 연결이 끊기면 StreamingResponse 가 task 를 취소하고 업스트림 스트림도 닫힘
+        parser = IncrementalJSONParser()
+        chunks = []
+        try:
+            async for delta in astream_groq_with_yaml(system_prompt, user_prompt, output_schema, estimated_tokens,
+                                                      section="sql_convert", generation=prompt_data.get("generation")):
+                chunks.append(delta)
+                for key, value in parser.feed(delta):
+                    yield orjson.dumps({"event": "field", "key": key, "value": value}) + b"\n"
+            result = parse_structured_output(output_schema, "".join(chunks))
+            yield orjson.dumps({"event": "done", "data": result}) + b"\n"
+        except (asyncio.CancelledError, GeneratorExit):
+            cancellation_stats.record("tools/sql/convert/stream")
+            raise
+        except Exception as e:
+            logger.exception(f"natural lang to SQL stream Error: {e}")
+            yield orjson.dumps({"event": "error", "message": str(e)}) + b"\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+@router.post("/optimize")
+async def optimize_sql(data: SQLInput, request: Request):
+    """SQL 쿼리를 최적화합니다. 로컬 계획 분석으로 판단 가능한 경우 LLM을 호출하지 않습니다."""
+    query_log.record("tools/sql/optimize", {"query": data.query, "context": data.context})
+    try:
+        analysis = None
+        if settings.SQL_ANALYZER_ENABLED:
+            try:
+                analysis = await query_analyzer.analyze_async(data.query, data.context)
+            except SQLExecutionUnsupported as e:
+                logger.info(f"로컬 계획 분석 불가, LLM 분석만 수행: {e}")
+
+        data_scale = analysis["data_scale"] if analysis else query_analyzer.data_scale
+        plan_analysis = {k: v for k, v in analysis.items() if k != "answer"} if analysis else None
+
+        if analysis and analysis.get("answer"):
+            parsed_result = analysis["answer"]
+            engine = "rule"
+        else:
+            prompt_data = get_prompt("sql_tutor_prompts.yaml", "sql_optimize")
+            system_prompt = prompt_data.get("system", "")
+            user_template = prompt_data.get("user", "")
+
+            user_prompt, estimated_tokens = render_prompt_within_budget("sql_optimize", system_prompt, user_template, {
+                "query": data.query,
+                "database_type": data.database_type,
+                "data_scale": data_scale,
+                "performance_requirements": "balanced",
+                "plan_analysis": format_analysis_for_prompt(analysis)
+            }, truncatable=("plan_analysis",))
 
-        result = call_groq_with_yaml(system_prompt, user_prompt)
-        parsed_result = parse_json_response(result)
+            parsed_result = await cancel_on_disconnect(request, acall_groq_with_yaml(
+                system_prompt, user_prompt,
+                output_schema=prompt_data.get("output_schema"),
+                estimated_tokens=estimated_tokens,
+                section="sql_optimize",
+                generation=prompt_data.get("generation")
+            ), "tools/sql/optimize")
+            engine = "llm"
 
-        return await ResponseResult.success(
+        return ResponseResult.success(
             result_code=200,
-            result_msg="Natural language to SQL conversion successful",
+            result_msg="SQL optimization successful",
             data={
                 "query": data.query,
                 "database_type": data.database_type,
-                "data_scale": "1k,10k,100k,1m",
+                "data_scale": data_scale,
                 "performance_requirements": "balanced",
+                "engine": engine,
+                "plan_analysis": plan_analysis,
                 "execution_result": {
                     "optimized_query": parsed_result.get("optimized_query"),
-                    "optimization_explanation": parsed_result.get("optimization_explanation"),
-                    "expected_improvements": parsed_result.get("expected_improvements"),
-                    "additional_recommendations": parsed_result.get("additional_recommendations")
+                    "performance_analysis": parsed_result.get("performance_analysis"),
+                    "optimization_suggestions": parsed_result.get("optimization_suggestions"),
+                    "monitoring_suggestions": parsed_result.get("monitoring_suggestions")
                 }
             }
         )
 
+    except TokenBudgetExceeded as e:
+        logger.warning(f"SQL 최적화 프롬프트 예산 초과: {e}")
+        return ResponseResult.error(
+            result_code=413,
+            result_msg=str(e),
+            data={
+                "query": data.query,
+                "database_type": data.database_type,
+                "estimated_tokens": e.tokens,
+                "token_budget": e.budget
+            }
+        )
+
+    except ClientDisconnected:
+        # 받을 클라이언트가 없으므로 직렬화 없이 종료
+        return ResponseResult.error(result_code=499, result_msg="Client disconnected")
+
+    except LLMOverloaded as e:
+        logger.warning(f"LLM 스케줄러 거절: {e}")
+        return ResponseResult.error(result_code=503, result_msg=str(e))
+
     except Exception as e:
         logger.exception(f"SQL 최적화 오류: {e}", exc_info=True)
-        return await ResponseResult.error(
+        return ResponseResult.error(
             result_code=500,
-            result_msg=f"Error converting natural language to SQL: {str(e)}",
+            result_msg=f"SQL optimization error: {str(e)}",
             data={
                 "query": data.query,
                 "database_type": data.database_type
             }
         )
+
+
+@router.get("/generation/stats")
+async def get_generation_stats():
+    """
+    섹션 / 생성 프로필별 지연 시간, 토큰 사용량, 파싱 성공률과 연결 끊김으로 취소된 요청 수,
+    LLM 스케줄러의 우선순위 클래스별 동시 실행 수 / 큐 깊이 / 대기 시간을 반환합니다 (워커 단위).
+    """
+    return ResponseResult.success(
+        result_code=200,
+        result_msg="Generation stats",
+        data={
+            "profiles": generation_stats.snapshot(),
+            "cancelled_requests": cancellation_stats.snapshot(),
+            "scheduler": llm_scheduler.snapshot()
+        }
+    )
@@ -2,6 +2,8 @@
 from fastapi import APIRouter
 from app.api.v1.endpoints.tools import sql_tutor
 from app.api.v1.endpoints.blog import blog
+from app.api.v1.endpoints.mochachat import chat
+from app.api.v1.endpoints.admin import profiler
 
 api_router = APIRouter()
 
@@ -10,3 +12,9 @@ api_router.include_router(sql_tutor.router, prefix="/tools/sql", tags=["SQL Tuto
 
 # blog router
 api_router.include_router(blog.router, prefix="/blog", tags=["Blog"])
+
+# mochachat router
+api_router.include_router(chat.router, prefix="/mochachat", tags=["MochaChat"])
+
+# admin router
+api_router.include_router(profiler.router, prefix="/admin", tags=["Admin"])
@@ -0,0 +1,186 @@
+"""
+업스트림(Groq) 신호로 조정되는 LLM 동시 호출 한도 (AIMD).
+
+llm_scheduler 의 전체 슬롯 수(capacity)로 사용되며, 업스트림 HTTP 응답마다 갱신됩니다.
+- 429 (rate limit)               → limit × backoff (기본 0.5)
+- 5xx / 연결 오류 / 타임아웃      → limit × latency_backoff (기본 0.9)
+- x-ratelimit-remaining-* 가 한도의 headroom 비율 미만 → limit × latency_backoff (429 가 나기 전에 감속)
+- 단기 지연 EWMA 가 장기 기준선의 tolerance 배 초과 → limit × latency_backoff (업스트림 큐잉 징후)
+- 그 외 성공이고 슬롯을 절반 이상 쓰고 있으면 → limit + 1/limit (limit 개 성공마다 +1)
+감소는 cooldown_s 에 한 번만 적용해 하나의 혼잡 이벤트로 연쇄 감소하지 않게 합니다.
+
+지연은 응답 헤더 수신까지의 시간입니다 (스트리밍은 첫 토큰까지, SDK 재시도는 시도마다 따로 기록).
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+
+logger = logging.getLogger(__name__)
+
+_RATE_LIMIT_HEADERS = ("requests", "tokens")
+
+
+class AdaptiveLimit:
+    def __init__(self, initial: int, min_limit: int, max_limit: int, backoff: float = 0.5,
+                 latency_backoff: float = 0.9, tolerance: float = 2.0, headroom: float = 0.1,
+                 cooldown_s: float = 2.0, smoothing: float = 0.2, baseline_smoothing: float = 0.02,
+                 warmup: int = 10):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.backoff = backoff
+        self.latency_backoff = latency_backoff
+        self.tolerance = tolerance
+        self.headroom = headroom
+        self.cooldown_s = cooldown_s
+        self.smoothing = smoothing
+        self.baseline_smoothing = baseline_smoothing
+        self.warmup = warmup
+        self._lock = threading.Lock()
+        self._short: Optional[float] = None
+        self._long: Optional[float] = None
+        self._samples = 0
+        self._last_decrease = 0.0
+        self._in_flight: Callable[[], int] = lambda: 0
+        self._on_increase: Optional[Callable[[], None]] = None
+        self.responses = 0
+        self.throttled = 0
+        self.errors = 0
+        self.increases = 0
+        self.decreases: Counter = Counter()
+        self.rate_limit: Dict[str, Any] = {}
+
+    @property
+    def value(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    def bind(self, in_flight: Callable[[], int], on_increase: Callable[[], None]):
+        """스케줄러 연결: 현재 사용 중인 슬롯 수 조회, 한도 증가 시 대기자 배정"""
+        self._in_flight = in_flight
+        self._on_increase = on_increase
+
+    def _decrease(self, factor: float, reason: str):
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown_s:
+            return
+        self._last_decrease = now
+        before = self.value
+        self._limit = max(float(self.min_limit), self._limit * factor)
+        self.decreases[reason] += 1
+        if self.value != before:
+            logger.info(f"LLM 동시 호출 한도 감소 ({reason}): {before} → {self.value}")
+
+    def _update_latency(self, latency_s: float):
+        self._samples += 1
+        if self._short is None:
+            self._short = self._long = latency_s
+            return
+        self._short += self.smoothing * (latency_s - self._short)
+        self._long += self.baseline_smoothing * (latency_s - self._long)
+
+    def _low_headroom(self, headers: httpx.Headers) -> bool:
+        low = False
+        for kind in _RATE_LIMIT_HEADERS:
+            try:
+                remaining = float(headers[f"x-ratelimit-remaining-{kind}"])
+                limit = float(headers[f"x-ratelimit-limit-{kind}"])
+            except (KeyError, ValueError):
+                continue
+            self.rate_limit[kind] = {
+                "remaining": remaining, "limit": limit, "reset": headers.get(f"x-ratelimit-reset-{kind}")
+            }
+            if limit > 0 and remaining / limit < self.headroom:
+                low = True
+        return low
+
+    def record(self, status: int, latency_s: float, headers: httpx.Headers):
+        increased = False
+        with self._lock:
+            self.responses += 1
+            low_headroom = self._low_headroom(headers)
+            if status == 429:
+                self.throttled += 1
+                self._decrease(self.backoff, "throttled")
+            elif status >= 500:
+                self.errors += 1
+                self._decrease(self.latency_backoff, "server_error")
+            elif low_headroom:
+                self._decrease(self.latency_backoff, "rate_limit_headroom")
+            else:
+                self._update_latency(latency_s)
+                if self._samples >= self.warmup and self._short > self._long * self.tolerance:
+                    self._decrease(self.latency_backoff, "latency")
+                elif status < 400 and self._in_flight() * 2 >= self.value and self._limit < self.max_limit:
+                    before = self.value
+                    self._limit = min(float(self.max_limit), self._limit + 1 / self._limit)
+                    if self.value != before:
+                        self.increases += 1
+                        increased = True
+        if increased and self._on_increase is not None:
+            self._on_increase()
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+            self._decrease(self.latency_backoff, "transport_error")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "limit": self.value,
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "latency_ms_short": round(self._short * 1000, 1) if self._short is not None else None,
+                "latency_ms_baseline": round(self._long * 1000, 1) if self._long is not None else None,
+                "responses": self.responses,
+                "throttled": self.throttled,
+                "errors": self.errors,
+                "increases": self.increases,
+                "decreases": dict(self.decreases),
+                "rate_limit": dict(self.rate_limit),
+            }
+
+
+class LimitObservingTransport(httpx.BaseTransport):
+    """업스트림 응답 상태 / 헤더 수신 지연 / rate-limit 헤더를 AdaptiveLimit 에 기록"""
+
+    def __init__(self, inner: httpx.BaseTransport, limit: AdaptiveLimit):
+        self.inner = inner
+        self.limit = limit
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = self.inner.handle_request(request)
+        except httpx.TransportError:
+            self.limit.record_error()
+            raise
+        self.limit.record(response.status_code, time.perf_counter() - started, response.headers)
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+class AsyncLimitObservingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner: httpx.AsyncBaseTransport, limit: AdaptiveLimit):
+        self.inner = inner
+        self.limit = limit
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await self.inner.handle_async_request(request)
+        except httpx.TransportError:
+            self.limit.record_error()
+            raise
+        self.limit.record(response.status_code, time.perf_counter() - started, response.headers)
+        return response
+
+    async def aclose(self):
+        await self.inner.aclose()
@@ -1,6 +1,6 @@
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings as PydanticSettings
-from typing import List
+from typing import Any, Dict, List
 import os
 from dotenv import load_dotenv
 
@@ -30,9 +30,149 @@ class Settings(PydanticSettings):
     # External API Keys
     GROQ_API_KEY: str = Field("...", env="GROQ_API_KEY")
     GROQ_MODEL: str = Field("openai/gpt-oss-20b", env="GROQ_MODEL")
+    # 구조화 출력 모드: "json_schema" | "json_object" | "off"
+    GROQ_STRUCTURED_OUTPUT: str = Field("json_schema", env="GROQ_STRUCTURED_OUTPUT")
+    # 섹션별 생성 파라미터 재정의 (프롬프트 YAML 의 generation 블록보다 우선)
+    # 예: {"sql_execute": {"reasoning_effort": "low", "max_completion_tokens": 1024}}
+    GROQ_GENERATION_OVERRIDES: Dict[str, Dict[str, Any]] = Field({}, env="GROQ_GENERATION_OVERRIDES")
+
+    # LLM 호출 스케줄링 (워커당 동시 호출 수, 우선순위 클래스, 클라이언트별 가중치)
+    # priority 값이 작을수록 우선, min_concurrency 는 다른 클래스가 쓸 수 없는 예약 슬롯
+    LLM_MAX_CONCURRENCY: int = Field(8, env="LLM_MAX_CONCURRENCY")
+    LLM_PRIORITY_CLASSES: Dict[str, Dict[str, float]] = Field({
+        "interactive": {"priority": 0, "min_concurrency": 2, "max_concurrency": 8, "max_wait_s": 10, "max_queue": 200},
+        "background": {"priority": 1, "min_concurrency": 0, "max_concurrency": 6, "max_wait_s": 300, "max_queue": 1000},
+    }, env="LLM_PRIORITY_CLASSES")
+    LLM_CLIENT_WEIGHTS: Dict[str, float] = Field({}, env="LLM_CLIENT_WEIGHTS")  # X-Client-Id / IP → 가중치 (기본 1)
+    # 동시 호출 한도 자동 조정 (AIMD, LLM_MAX_CONCURRENCY 가 상한)
+    LLM_ADAPTIVE_LIMIT_ENABLED: bool = Field(True, env="LLM_ADAPTIVE_LIMIT_ENABLED")
+    LLM_INITIAL_CONCURRENCY: int = Field(4, env="LLM_INITIAL_CONCURRENCY")
+    LLM_MIN_CONCURRENCY: int = Field(1, env="LLM_MIN_CONCURRENCY")
+    LLM_LIMIT_BACKOFF: float = Field(0.5, env="LLM_LIMIT_BACKOFF")  # 429 시 곱할 비율
+    LLM_LIMIT_LATENCY_TOLERANCE: float = Field(2.0, env="LLM_LIMIT_LATENCY_TOLERANCE")  # 단기/기준 지연 비율 상한
+    LLM_RATE_LIMIT_HEADROOM: float = Field(0.1, env="LLM_RATE_LIMIT_HEADROOM")  # x-ratelimit-remaining 비율 하한
+    LLM_LIMIT_COOLDOWN_S: float = Field(2.0, env="LLM_LIMIT_COOLDOWN_S")
+
+    # Token accounting / prompt budgets (프롬프트 섹션명 기준)
+    # "heuristic" | "hf:<tokenizer.json 경로>" (tokenizers 는 의존성에 포함) | "tiktoken:<encoding>" (tiktoken 별도 설치 필요)
+    TOKENIZER: str = Field("heuristic", env="TOKENIZER")
+    TOKEN_BUDGET_MODE: str = Field("truncate", env="TOKEN_BUDGET_MODE")  # "truncate" | "reject"
+    PROMPT_TOKEN_BUDGET_DEFAULT: int = Field(6000, env="PROMPT_TOKEN_BUDGET_DEFAULT")
+    PROMPT_TOKEN_BUDGETS: Dict[str, int] = Field(
+        {"sql_execute": 6000, "sql_convert": 6000, "sql_optimize": 4000},
+        env="PROMPT_TOKEN_BUDGETS"
+    )
+
+    # Embedding model / shared embedding service
+    EMBEDDING_BACKEND: str = Field("huggingface", env="EMBEDDING_BACKEND")  # "huggingface" | "onnx"
+    EMBEDDING_MODEL: str = Field("sentence-transformers/all-MiniLM-L6-v2", env="EMBEDDING_MODEL")
+    EMBEDDING_ONNX_PATH: str = Field("backend/data/models/minilm-onnx", env="EMBEDDING_ONNX_PATH")
+    EMBEDDING_ONNX_QUANTIZE: bool = Field(True, env="EMBEDDING_ONNX_QUANTIZE")
+    EMBEDDING_ONNX_THREADS: int = Field(0, env="EMBEDDING_ONNX_THREADS")  # 0 이면 onnxruntime 기본값
+    EMBEDDING_SERVICE_SOCKET: str = Field("", env="EMBEDDING_SERVICE_SOCKET")  # 비어 있으면 워커 내 모델 사용
+    EMBEDDING_SERVICE_TIMEOUT: float = Field(10.0, env="EMBEDDING_SERVICE_TIMEOUT")
+    EMBEDDING_SERVICE_ADMIN_TIMEOUT: float = Field(0.0, env="EMBEDDING_SERVICE_ADMIN_TIMEOUT")  # 재인덱싱/롤백, 0 이면 무제한
+    EMBEDDING_BATCH_SIZE: int = Field(32, env="EMBEDDING_BATCH_SIZE")
+    EMBEDDING_BATCH_WAIT_MS: int = Field(5, env="EMBEDDING_BATCH_WAIT_MS")
+
+    # RAG corpora (/blog/search 의 corpus 로 선택, 기본 코퍼스는 blog)
+    # 예: {"docs": {"data_dir": "backend/data/docs", "persist_directory": "backend/data/chroma_docs"}}
+    RAG_CORPORA: Dict[str, Dict[str, str]] = Field({}, env="RAG_CORPORA")
+    RAG_CORPUS_MEMORY_MB: int = Field(512, env="RAG_CORPUS_MEMORY_MB")  # 열린 인덱스 합계 상한, 0 이면 무제한
+    # 버전별 인덱스 스냅샷 (활성 버전 외 보관 개수, 다른 프로세스의 활성화 감지 주기)
+    INDEX_SNAPSHOT_KEEP: int = Field(3, env="INDEX_SNAPSHOT_KEEP")
+    INDEX_SNAPSHOT_CHECK_INTERVAL_S: float = Field(5.0, env="INDEX_SNAPSHOT_CHECK_INTERVAL_S")
+    # 활성에서 물러난 버전을 정리하지 않고 두는 시간 (다른 워커가 포인터 변경을 감지해 전환할 때까지)
+    INDEX_SNAPSHOT_PRUNE_GRACE_S: float = Field(60.0, env="INDEX_SNAPSHOT_PRUNE_GRACE_S")
+    # 검색 결과 수 (/blog/search 의 k, 상한 초과 값은 상한으로 제한)
+    RAG_DEFAULT_K: int = Field(4, env="RAG_DEFAULT_K")
+    RAG_MAX_K: int = Field(20, env="RAG_MAX_K")
+    # HNSW 파라미터 (스냅샷 빌드 시 컬렉션에 기록되므로 변경 후 재인덱싱 필요)
+    RAG_HNSW_M: int = Field(16, env="RAG_HNSW_M")
+    RAG_HNSW_CONSTRUCTION_EF: int = Field(100, env="RAG_HNSW_CONSTRUCTION_EF")
+    RAG_HNSW_SEARCH_EF: int = Field(100, env="RAG_HNSW_SEARCH_EF")  # 필터가 선택적일수록 높여야 recall 유지
+    # 글 / 섹션 요약 인덱스 (재인덱싱 후 백그라운드 생성) 와 summary-first 검색
+    SUMMARY_ENABLED: bool = Field(False, env="SUMMARY_ENABLED")
+    SUMMARY_RATE_PER_S: float = Field(0.5, env="SUMMARY_RATE_PER_S")  # 요약 LLM 호출 속도 상한
+    SUMMARY_SECTION_MIN_CHARS: int = Field(1500, env="SUMMARY_SECTION_MIN_CHARS")  # 이보다 긴 섹션은 따로 요약
+    RAG_SUMMARY_FIRST: bool = Field(False, env="RAG_SUMMARY_FIRST")  # 요약 인덱스가 있으면 요약부터 검색
+    RAG_SUMMARY_EXPAND_POSTS: int = Field(1, env="RAG_SUMMARY_EXPAND_POSTS")  # 원문 청크를 덧붙일 상위 글 수
+    RAG_SUMMARY_EXPAND_K: int = Field(2, env="RAG_SUMMARY_EXPAND_K")  # 글마다 덧붙일 청크 수
+
+    # Local SQL execution engine (/tools/sql/result)
+    SQL_ENGINE_ENABLED: bool = Field(True, env="SQL_ENGINE_ENABLED")
+    SQL_ENGINE_ROW_LIMIT: int = Field(1000, env="SQL_ENGINE_ROW_LIMIT")
+    SQL_ENGINE_TIMEOUT_MS: int = Field(2000, env="SQL_ENGINE_TIMEOUT_MS")
+    SQL_ENGINE_CACHE_SIZE: int = Field(64, env="SQL_ENGINE_CACHE_SIZE")
+    SQL_ENGINE_CACHE_MB: int = Field(256, env="SQL_ENGINE_CACHE_MB")  # DB 이미지 캐시 총량 상한
+    SQL_ENGINE_WORKERS: int = Field(4, env="SQL_ENGINE_WORKERS")
+    SQL_ENGINE_MAX_DB_MB: int = Field(64, env="SQL_ENGINE_MAX_DB_MB")  # 요청별 인메모리 DB 크기 상한
+
+    # Query plan pre-analysis (/tools/sql/optimize)
+    SQL_ANALYZER_ENABLED: bool = Field(True, env="SQL_ANALYZER_ENABLED")
+    SQL_ANALYZER_SCALES: str = Field("1000,10000,100000", env="SQL_ANALYZER_SCALES")
+    SQL_ANALYZER_TIMEOUT_MS: int = Field(3000, env="SQL_ANALYZER_TIMEOUT_MS")
+    SQL_ANALYZER_CACHE_SIZE: int = Field(128, env="SQL_ANALYZER_CACHE_SIZE")
+    SQL_ANALYZER_MAX_DB_MB: int = Field(256, env="SQL_ANALYZER_MAX_DB_MB")  # 합성 데이터 DB 크기 상한
+
+    # Query log / caches / cache warming
+    QUERY_LOG_PATH: str = Field("", env="QUERY_LOG_PATH")  # 원문 입력을 기록하므로 opt-in (예: backend/data/query_log.jsonl)
+    QUERY_LOG_MAX_BYTES: int = Field(16 * 1024 * 1024, env="QUERY_LOG_MAX_BYTES")
+    CACHE_EMBEDDING_SIZE: int = Field(2048, env="CACHE_EMBEDDING_SIZE")
+    CACHE_RETRIEVAL_SIZE: int = Field(1024, env="CACHE_RETRIEVAL_SIZE")
+    CACHE_ANSWER_SIZE: int = Field(0, env="CACHE_ANSWER_SIZE")  # 0 이면 답변 캐시/예열 비활성
+    CACHE_WARM_ENABLED: bool = Field(True, env="CACHE_WARM_ENABLED")
+    CACHE_WARM_TOP_N: int = Field(50, env="CACHE_WARM_TOP_N")
+    CACHE_WARM_WINDOW_HOURS: int = Field(72, env="CACHE_WARM_WINDOW_HOURS")
+    CACHE_WARM_RATE: float = Field(2.0, env="CACHE_WARM_RATE")  # 초당 예열 항목 수 상한
+    CACHE_WARM_IDLE_MS: int = Field(500, env="CACHE_WARM_IDLE_MS")  # 마지막 실시간 요청 후 대기 시간
+    CACHE_WARM_STARTUP_DELAY_S: float = Field(5.0, env="CACHE_WARM_STARTUP_DELAY_S")
+
+    # Response compression
+    COMPRESSION_MINIMUM_SIZE: int = Field(1024, env="COMPRESSION_MINIMUM_SIZE")
+    COMPRESSION_OFFLOAD_SIZE: int = Field(64 * 1024, env="COMPRESSION_OFFLOAD_SIZE")
+    COMPRESSION_GZIP_LEVEL: int = Field(6, env="COMPRESSION_GZIP_LEVEL")
+
+    # MochaChat sessions
+    CHAT_SESSION_BYTE_BUDGET: int = Field(64 * 1024 * 1024, env="CHAT_SESSION_BYTE_BUDGET")
+    CHAT_SESSION_SPILL_PATH: str = Field("", env="CHAT_SESSION_SPILL_PATH")  # 비어 있으면 SQLite spill 비활성
+    CHAT_MAX_TURNS: int = Field(20, env="CHAT_MAX_TURNS")
+    CHAT_HISTORY_TOKEN_BUDGET: int = Field(1500, env="CHAT_HISTORY_TOKEN_BUDGET")
+    CHAT_MAX_MESSAGE_CHARS: int = Field(4000, env="CHAT_MAX_MESSAGE_CHARS")
+    CHAT_MAX_SUMMARY_CHARS: int = Field(1500, env="CHAT_MAX_SUMMARY_CHARS")
+
+    # Traffic record / replay (opt-in)
+    RECORDER_ENABLED: bool = Field(False, env="RECORDER_ENABLED")
+    RECORDER_SAMPLE_RATE: float = Field(0.05, env="RECORDER_SAMPLE_RATE")
+    RECORDER_PATH: str = Field("backend/data/recordings/traffic.jsonl", env="RECORDER_PATH")
+    RECORDER_MAX_BYTES: int = Field(64 * 1024 * 1024, env="RECORDER_MAX_BYTES")
+    RECORDER_BACKUP_COUNT: int = Field(5, env="RECORDER_BACKUP_COUNT")
+    RECORDER_MAX_BODY_BYTES: int = Field(1024 * 1024, env="RECORDER_MAX_BODY_BYTES")
+
+    # On-demand profiler (/admin/profile, X-Admin-Token 필요)
+    PROFILER_ENABLED: bool = Field(False, env="PROFILER_ENABLED")
+    PROFILER_MAX_DURATION_S: float = Field(60.0, env="PROFILER_MAX_DURATION_S")
+
+    # 글 업로드 (/blog/upload, X-Admin-Token 필요) - 바디는 스테이징 디렉터리로 스트리밍, 메모리는 버퍼 1개분
+    UPLOAD_STAGING_DIR: str = Field("backend/data/uploads_tmp", env="UPLOAD_STAGING_DIR")  # data_dir 과 같은 파일시스템 권장
+    UPLOAD_MAX_BYTES: int = Field(800 * 1024 * 1024, env="UPLOAD_MAX_BYTES")  # nginx client_max_body_size 와 맞춤
+    UPLOAD_MAX_FILE_BYTES: int = Field(10 * 1024 * 1024, env="UPLOAD_MAX_FILE_BYTES")  # 마크다운 파일 하나
+    UPLOAD_MAX_FILES: int = Field(5000, env="UPLOAD_MAX_FILES")
+    UPLOAD_MAX_ARCHIVE_ENTRIES: int = Field(50000, env="UPLOAD_MAX_ARCHIVE_ENTRIES")  # 디렉터리 / 거절 항목 포함
+    UPLOAD_MAX_EXPANDED_BYTES: int = Field(2 * 1024 * 1024 * 1024, env="UPLOAD_MAX_EXPANDED_BYTES")  # 아카이브 해제 총량
+    UPLOAD_BUFFER_BYTES: int = Field(1024 * 1024, env="UPLOAD_BUFFER_BYTES")
+
+    # 이벤트 루프 lag 모니터 (블로킹 호출 탐지 로그 + /admin/loop 통계, LOOP_LAG_SHED_MS > 0 이면 503 부하 차단)
+    LOOP_MONITOR_ENABLED: bool = Field(True, env="LOOP_MONITOR_ENABLED")
+    LOOP_MONITOR_INTERVAL_MS: float = Field(100.0, env="LOOP_MONITOR_INTERVAL_MS")
+    LOOP_BLOCK_THRESHOLD_MS: float = Field(250.0, env="LOOP_BLOCK_THRESHOLD_MS")
+    LOOP_BLOCK_REPORTS: int = Field(20, env="LOOP_BLOCK_REPORTS")  # 보관할 최근 블로킹 스택 수
+    LOOP_LAG_SHED_MS: float = Field(0.0, env="LOOP_LAG_SHED_MS")  # 0 이면 차단 안 함
+    LOOP_LAG_SHED_RETRY_AFTER_S: float = Field(2.0, env="LOOP_LAG_SHED_RETRY_AFTER_S")
 
     # Security
     SECRET_KEY: str = Field("your-secret-key-here", env="SECRET_KEY")
+    ADMIN_TOKEN: str = Field("", env="ADMIN_TOKEN")  # 비어 있으면 관리자 엔드포인트 비활성
 
 
 settings = Settings()
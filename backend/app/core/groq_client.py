@@ -1,8 +1,110 @@
+import asyncio
 import json
-from groq import Groq
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+from groq import AsyncGroq, Groq
 from app.core.config import settings
+from app.core.llm_scheduler import llm_limit, llm_scheduler
+from app.utils.structured_output import get_response_format, validate_structured_output
+from app.utils.traffic_recorder import create_upstream_async_http_client, create_upstream_http_client
 
-client = Groq(api_key=settings.GROQ_API_KEY)
+client = Groq(api_key=settings.GROQ_API_KEY, http_client=create_upstream_http_client(settings.RECORDER_ENABLED, llm_limit))
+# 비동기 클라이언트: 호출 task 가 취소되면(클라이언트 연결 끊김) 업스트림 HTTP 요청도 즉시 중단됨
+async_client = AsyncGroq(
+    api_key=settings.GROQ_API_KEY,
+    http_client=create_upstream_async_http_client(settings.RECORDER_ENABLED, llm_limit)
+)
+logger = logging.getLogger(__name__)
+
+# 프롬프트 YAML 의 generation 블록에서 허용하는 키
+_GENERATION_KEYS = ("model", "temperature", "max_completion_tokens", "top_p", "reasoning_effort", "stop")
+
+
+def resolve_generation(section: Optional[str] = None, generation: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    생성 파라미터를 기본값 < 프롬프트 YAML 섹션의 generation < Settings.GROQ_GENERATION_OVERRIDES[section] 순으로 병합합니다.
+    """
+    params: Dict[str, Any] = {
+        "model": settings.GROQ_MODEL,
+        "temperature": 1,
+        "max_completion_tokens": 2048,
+        "top_p": 1,
+        "reasoning_effort": "medium",
+    }
+    for source in (generation or {}, settings.GROQ_GENERATION_OVERRIDES.get(section or "", {})):
+        for key, value in source.items():
+            if key in _GENERATION_KEYS:
+                params[key] = value
+            else:
+                logger.warning(f"알 수 없는 생성 파라미터 무시: {section}.{key}")
+    return params
+
+
+def profile_label(params: Dict[str, Any]) -> str:
+    return f"{params['model']}|effort={params.get('reasoning_effort')}|max={params.get('max_completion_tokens')}|t={params.get('temperature')}"
+
+
+class GenerationStats:
+    """섹션 / 생성 프로필별 지연 시간, 토큰 사용량, 파싱 성공률을 누적합니다."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._lock = threading.Lock()
+        self._profiles: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def record(self, section: str, profile: str, latency_s: float, usage=None, parsed: Optional[bool] = None):
+        with self._lock:
+            entry = self._profiles.setdefault((section, profile), {
+                "calls": 0, "parse_checked": 0, "parse_failures": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "cancelled": 0, "latencies": deque(maxlen=self.window),
+            })
+            entry["calls"] += 1
+            entry["latencies"].append(latency_s * 1000)
+            if parsed is not None:
+                entry["parse_checked"] += 1
+                entry["parse_failures"] += 0 if parsed else 1
+            if usage is not None:
+                entry["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+                entry["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+
+    def record_cancelled(self, section: str, profile: str):
+        """클라이언트 연결 끊김으로 취소된 호출 (지연 시간/토큰 통계에는 포함하지 않음)"""
+        with self._lock:
+            entry = self._profiles.setdefault((section, profile), {
+                "calls": 0, "parse_checked": 0, "parse_failures": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "cancelled": 0, "latencies": deque(maxlen=self.window),
+            })
+            entry["cancelled"] += 1
+
+    def snapshot(self) -> list:
+        with self._lock:
+            rows = []
+            for (section, profile), entry in self._profiles.items():
+                latencies = sorted(entry["latencies"])
+                calls = entry["calls"]
+                rows.append({
+                    "section": section,
+                    "profile": profile,
+                    "calls": calls,
+                    "cancelled": entry["cancelled"],
+                    # 스트리밍 호출은 파싱 결과를 알 수 없으므로 검증된 호출만으로 계산
+                    "parse_success_rate": (
+                        round(1 - entry["parse_failures"] / entry["parse_checked"], 4) if entry["parse_checked"] else None
+                    ),
+                    "latency_ms_p50": round(latencies[len(latencies) // 2], 1) if latencies else None,
+                    "latency_ms_p95": (
+                        round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1) if latencies else None
+                    ),
+                    "avg_prompt_tokens": round(entry["prompt_tokens"] / calls, 1) if calls else None,
+                    "avg_completion_tokens": round(entry["completion_tokens"] / calls, 1) if calls else None,
+                })
+            return sorted(rows, key=lambda r: (r["section"], r["latency_ms_p50"] or 0))
+
+
+generation_stats = GenerationStats()
 
 
 def _parse_json_safe(text: str):
@@ -24,21 +126,41 @@ def _parse_json_safe(text: str):
         return text
 
 
-def call_groq_with_yaml(system_prompt: str, user_prompt: str):
-    # Using synchronous call per groq SDK example in the environment.
-    completion = client.chat.completions.create(
-        model=settings.GROQ_MODEL,
+def _build_request(system_prompt: str, user_prompt: str, params: Dict[str, Any],
+                   output_schema: Optional[str] = None, stream: bool = False) -> dict:
+    request = dict(
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
         ],
-        temperature=1,
-        max_completion_tokens=2048,
-        top_p=1,
-        reasoning_effort="medium",
-        stream=False
+        stream=stream,
+        **params
+    )
+    response_format = get_response_format(output_schema, settings.GROQ_STRUCTURED_OUTPUT)
+    if response_format:
+        request["response_format"] = response_format
+    return request
+
+
+def _cost(estimated_tokens: Optional[int]) -> float:
+    """공정 큐잉 비용: 요청당 1 + 예상 프롬프트 토큰 1000개당 1"""
+    return 1.0 + (estimated_tokens or 0) / 1000
+
+
+def _log_usage(usage, estimated_tokens: Optional[int]):
+    if usage is None:
+        return
+    logger.info(
+        f"[tokens] groq usage: prompt={usage.prompt_tokens} (estimated {estimated_tokens}) "
+        f"completion={usage.completion_tokens} total={usage.total_tokens}"
     )
 
+
+def _finish_completion(completion, params: Dict[str, Any], latency: float, output_schema: Optional[str],
+                       estimated_tokens: Optional[int], section: Optional[str]):
+    usage = getattr(completion, "usage", None)
+    _log_usage(usage, estimated_tokens)
+
     try:
         content = completion.choices[0].message.content
     except Exception:
@@ -47,5 +169,117 @@ def call_groq_with_yaml(system_prompt: str, user_prompt: str):
         except Exception:
             content = str(completion)
 
+    # 구조화 출력: 스키마 검증 1회로 파싱 완료
+    if output_schema:
+        try:
+            result, validated = validate_structured_output(output_schema, content)
+        except Exception:
+            generation_stats.record(section or "default", profile_label(params), latency, usage, parsed=False)
+            raise
+        # 기본값으로 채운 결과는 파싱 실패로 집계
+        generation_stats.record(section or "default", profile_label(params), latency, usage, parsed=validated)
+        return result
+
     # JSON 파싱 보정
-    return _parse_json_safe(content)
+    result = _parse_json_safe(content)
+    generation_stats.record(section or "default", profile_label(params), latency, usage, parsed=isinstance(result, dict))
+    return result
+
+
+def call_groq_with_yaml(system_prompt: str, user_prompt: str, output_schema: Optional[str] = None,
+                        estimated_tokens: Optional[int] = None, section: Optional[str] = None,
+                        generation: Optional[Dict[str, Any]] = None):
+    params = resolve_generation(section, generation)
+    with llm_scheduler.slot(cost=_cost(estimated_tokens)):
+        started = time.perf_counter()
+        # Using synchronous call per groq SDK example in the environment.
+        completion = client.chat.completions.create(
+            **_build_request(system_prompt, user_prompt, params, output_schema)
+        )
+    return _finish_completion(completion, params, time.perf_counter() - started, output_schema, estimated_tokens, section)
+
+
+async def acall_groq_with_yaml(system_prompt: str, user_prompt: str, output_schema: Optional[str] = None,
+                               estimated_tokens: Optional[int] = None, section: Optional[str] = None,
+                               generation: Optional[Dict[str, Any]] = None):
+    """
+    call_groq_with_yaml 의 비동기 버전.
+    task 가 취소되면 진행 중인 HTTP 요청을 닫아 Groq 쪽 생성도 중단되고, 취소 횟수만 통계에 기록합니다.
+    """
+    params = resolve_generation(section, generation)
+    try:
+        async with llm_scheduler.aslot(cost=_cost(estimated_tokens)):
+            started = time.perf_counter()
+            completion = await async_client.chat.completions.create(
+                **_build_request(system_prompt, user_prompt, params, output_schema)
+            )
+    except asyncio.CancelledError:
+        generation_stats.record_cancelled(section or "default", profile_label(params))
+        raise
+    return _finish_completion(completion, params, time.perf_counter() - started, output_schema, estimated_tokens, section)
+
+
+def stream_groq_with_yaml(system_prompt: str, user_prompt: str, output_schema: Optional[str] = None,
+                          estimated_tokens: Optional[int] = None, section: Optional[str] = None,
+                          generation: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """
+    Groq 스트리밍 응답의 content 조각을 순서대로 반환합니다.
+    파싱은 호출 측에서 하므로 통계에는 지연 시간과 토큰 사용량만 기록합니다.
+    """
+    params = resolve_generation(section, generation)
+    usage = None
+    # 스트림이 끝날 때까지 슬롯을 점유
+    with llm_scheduler.slot(cost=_cost(estimated_tokens)):
+        started = time.perf_counter()
+        stream = client.chat.completions.create(
+            **_build_request(system_prompt, user_prompt, params, output_schema, stream=True)
+        )
+        for chunk in stream:
+            x_groq = getattr(chunk, "x_groq", None)
+            if x_groq is not None and getattr(x_groq, "usage", None) is not None:
+                usage = x_groq.usage
+                _log_usage(usage, estimated_tokens)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+    generation_stats.record(section or "default", profile_label(params), time.perf_counter() - started, usage)
+
+
+async def astream_groq_with_yaml(system_prompt: str, user_prompt: str, output_schema: Optional[str] = None,
+                                 estimated_tokens: Optional[int] = None, section: Optional[str] = None,
+                                 generation: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+    """
+    stream_groq_with_yaml 의 비동기 버전.
+    소비 측이 중단되면(취소 / aclose) 업스트림 스트림을 닫아 생성을 멈춥니다.
+    """
+    params = resolve_generation(section, generation)
+    usage = None
+    try:
+        # 스트림이 끝나거나 닫힐 때까지 슬롯을 점유
+        async with llm_scheduler.aslot(cost=_cost(estimated_tokens)):
+            started = time.perf_counter()
+            stream = await async_client.chat.completions.create(
+                **_build_request(system_prompt, user_prompt, params, output_schema, stream=True)
+            )
+            completed = False
+            try:
+                async for chunk in stream:
+                    x_groq = getattr(chunk, "x_groq", None)
+                    if x_groq is not None and getattr(x_groq, "usage", None) is not None:
+                        usage = x_groq.usage
+                        _log_usage(usage, estimated_tokens)
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        yield delta
+                completed = True
+            finally:
+                if not completed:
+                    await stream.close()
+    except (asyncio.CancelledError, GeneratorExit):
+        generation_stats.record_cancelled(section or "default", profile_label(params))
+        raise
+    generation_stats.record(section or "default", profile_label(params), time.perf_counter() - started, usage)
@@ -0,0 +1,349 @@
+"""
+LLM 호출 스케줄러 (우선순위 클래스 + 클라이언트 간 가중 공정 큐잉).
+
+- 워커당 동시 LLM 호출 수를 제한하고 (LLM_ADAPTIVE_LIMIT_ENABLED 면 업스트림 429 / 지연 / rate-limit 헤더로
+  조정되는 adaptive_limit.AdaptiveLimit, 아니면 LLM_MAX_CONCURRENCY 고정), 클래스마다
+  min_concurrency(다른 클래스가 가져갈 수 없는 예약 슬롯) / max_concurrency / max_wait_s(큐 대기 기한) / max_queue 를 둠
+- 빈 슬롯은 우선순위가 높은 클래스(priority 값이 작은 쪽)의 대기자에게 먼저 배정
+  → 백그라운드 작업은 남는 용량만 쓰고, interactive 는 예약 슬롯 덕분에 백그라운드 호출이 끝나기를 기다리지 않음
+- 같은 클래스 안에서는 클라이언트별 가상 종료 시각(start-time fair queuing)으로 순서를 정해
+  한 클라이언트가 큐를 독점하지 못하게 함 (가중치: LLM_CLIENT_WEIGHTS, 비용: 요청당 1 + 예상 토큰/1000)
+- 우선순위 / 클라이언트는 contextvar 로 전달: 미들웨어가 요청마다 설정하고, 백그라운드 작업은 llm_priority("background") 사용
+
+동기(스레드) 호출과 비동기 호출이 같은 슬롯을 공유하므로 상태는 threading.Lock 으로 보호합니다.
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.adaptive_limit import AdaptiveLimit
+from app.core.config import settings
+
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# (priority class, client id)
+_llm_context: ContextVar[Tuple[str, str]] = ContextVar("llm_context", default=(INTERACTIVE, "anonymous"))
+
+
+class LLMOverloaded(Exception):
+    """LLM 큐가 가득 찼거나 대기 기한을 넘김 (503)"""
+
+    def __init__(self, priority: str, reason: str, waited_s: float = 0.0):
+        super().__init__(f"LLM capacity exhausted for '{priority}' ({reason}, waited {waited_s:.1f}s)")
+        self.priority = priority
+        self.reason = reason
+        self.waited_s = waited_s
+
+
+@contextmanager
+def llm_priority(priority: str, client: Optional[str] = None):
+    """블록 안의 LLM 호출을 지정한 우선순위 클래스(및 클라이언트)로 스케줄링합니다."""
+    _, current_client = _llm_context.get()
+    token = _llm_context.set((priority, client or current_client))
+    try:
+        yield
+    finally:
+        _llm_context.reset(token)
+
+
+def current_llm_context() -> Tuple[str, str]:
+    return _llm_context.get()
+
+
+class _Waiter:
+    __slots__ = ("client", "cost", "start_tag", "enqueued", "granted", "abandoned", "_event", "_loop", "_future")
+
+    def __init__(self, client: str, cost: float, loop: Optional[asyncio.AbstractEventLoop]):
+        self.client = client
+        self.cost = cost
+        self.start_tag = 0.0
+        self.enqueued = time.perf_counter()
+        self.granted = False
+        self.abandoned = False
+        self._loop = loop
+        self._future = loop.create_future() if loop is not None else None
+        self._event = threading.Event() if loop is None else None
+
+    def wake(self):
+        if self._loop is None:
+            self._event.set()
+        else:
+            self._loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self._future.done():
+            self._future.set_result(None)
+
+
+class _PriorityClass:
+    def __init__(self, name: str, priority: int, min_concurrency: int, max_concurrency: int,
+                 max_wait_s: float, max_queue: int, window: int = 500):
+        self.name = name
+        self.priority = priority
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_wait_s = max_wait_s
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.queued = 0
+        self.heap: list = []
+        self.virtual_time = 0.0
+        self.client_finish: Dict[str, float] = {}
+        self.granted = 0
+        self.rejected = {"deadline": 0, "queue_full": 0}
+        self.waits_ms: deque = deque(maxlen=window)
+
+    def unused_reservation(self) -> int:
+        return max(0, self.min_concurrency - self.in_flight)
+
+
+class LLMScheduler:
+    def __init__(self, capacity: int, classes: Dict[str, Dict[str, Any]],
+                 client_weights: Optional[Dict[str, float]] = None, limit: Optional[AdaptiveLimit] = None):
+        self._capacity = capacity
+        self.limit = limit
+        self.client_weights = client_weights or {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._classes: Dict[str, _PriorityClass] = {}
+        for name, options in classes.items():
+            self._classes[name] = _PriorityClass(
+                name,
+                priority=int(options.get("priority", 0)),
+                min_concurrency=int(options.get("min_concurrency", 0)),
+                max_concurrency=int(options.get("max_concurrency", capacity)),
+                max_wait_s=float(options.get("max_wait_s", 30)),
+                max_queue=int(options.get("max_queue", 1000)),
+            )
+        if INTERACTIVE not in self._classes:
+            self._classes[INTERACTIVE] = _PriorityClass(INTERACTIVE, 0, 0, capacity, 30, 1000)
+        self._order = sorted(self._classes.values(), key=lambda c: c.priority)
+        if limit is not None:
+            limit.bind(self._in_flight, self._on_limit_increase)
+
+    @property
+    def capacity(self) -> int:
+        """전체 슬롯 수 (adaptive limit 가 있으면 업스트림 신호로 조정된 현재 한도)"""
+        return self.limit.value if self.limit is not None else self._capacity
+
+    def _on_limit_increase(self):
+        with self._lock:
+            self._dispatch()
+
+    def resolve_class(self, name: Optional[str]) -> _PriorityClass:
+        return self._classes.get(name or INTERACTIVE) or self._classes[INTERACTIVE]
+
+    def is_lower_priority(self, name: str, than: str) -> bool:
+        """name 이 than 보다 우선순위가 같거나 낮은 클래스인지 (클라이언트가 스스로 낮추는 것만 허용할 때 사용)"""
+        return name in self._classes and self._classes[name].priority >= self.resolve_class(than).priority
+
+    # --- 슬롯 배정 (lock 안에서 호출) ---
+
+    def _in_flight(self) -> int:
+        return sum(c.in_flight for c in self._order)
+
+    def _can_start(self, cls: _PriorityClass) -> bool:
+        if cls.in_flight >= cls.max_concurrency:
+            return False
+        free = self.capacity - self._in_flight()
+        # 다른 클래스의 아직 쓰지 않은 예약 슬롯은 남겨 둠 (자신의 예약 슬롯은 언제나 사용 가능)
+        reserved_for_others = sum(c.unused_reservation() for c in self._order if c is not cls)
+        if cls.in_flight < cls.min_concurrency:
+            return free > 0
+        return free - reserved_for_others > 0
+
+    def _grant(self, cls: _PriorityClass, waiter: _Waiter):
+        waiter.granted = True
+        cls.in_flight += 1
+        cls.granted += 1
+        cls.waits_ms.append((time.perf_counter() - waiter.enqueued) * 1000)
+
+    def _dispatch(self):
+        progressed = True
+        while progressed:
+            progressed = False
+            for cls in self._order:
+                if not cls.queued or not self._can_start(cls):
+                    continue
+                while cls.heap:
+                    _, _, waiter = heapq.heappop(cls.heap)
+                    if waiter.abandoned:
+                        continue
+                    cls.queued -= 1
+                    cls.virtual_time = max(cls.virtual_time, waiter.start_tag)
+                    if not cls.queued:
+                        # 큐가 비면 클라이언트별 종료 시각도 초기화 (유휴 클라이언트가 몰아서 쓰지 않도록)
+                        cls.client_finish.clear()
+                    self._grant(cls, waiter)
+                    waiter.wake()
+                    progressed = True
+                    break
+                break
+
+    def _enqueue(self, cls: _PriorityClass, waiter: _Waiter) -> bool:
+        """즉시 배정되면 True, 대기열에 들어가면 False"""
+        if not cls.queued and self._can_start(cls):
+            self._grant(cls, waiter)
+            return True
+        if cls.queued >= cls.max_queue:
+            cls.rejected["queue_full"] += 1
+            raise LLMOverloaded(cls.name, "queue_full")
+        weight = float(self.client_weights.get(waiter.client, 1.0)) or 1.0
+        waiter.start_tag = max(cls.virtual_time, cls.client_finish.get(waiter.client, 0.0))
+        finish = waiter.start_tag + waiter.cost / weight
+        cls.client_finish[waiter.client] = finish
+        heapq.heappush(cls.heap, (finish, next(self._seq), waiter))
+        cls.queued += 1
+        return False
+
+    def _abandon(self, cls: _PriorityClass, waiter: _Waiter, reason: Optional[str]) -> bool:
+        """대기를 포기합니다. 그 사이 배정됐다면 False (호출 측이 슬롯을 반납해야 함)."""
+        with self._lock:
+            if waiter.granted:
+                return False
+            waiter.abandoned = True
+            cls.queued -= 1
+            if reason:
+                cls.rejected[reason] += 1
+            return True
+
+    def release(self, name: str):
+        with self._lock:
+            self._classes[name].in_flight -= 1
+            self._dispatch()
+
+    # --- 획득 ---
+
+    def _prepare(self, priority: Optional[str], client: Optional[str]) -> Tuple[_PriorityClass, str]:
+        context_priority, context_client = _llm_context.get()
+        return self.resolve_class(priority or context_priority), client or context_client
+
+    async def acquire(self, priority: Optional[str] = None, client: Optional[str] = None, cost: float = 1.0) -> str:
+        cls, client = self._prepare(priority, client)
+        waiter = _Waiter(client, cost, asyncio.get_running_loop())
+        with self._lock:
+            if self._enqueue(cls, waiter):
+                return cls.name
+        try:
+            await asyncio.wait({waiter._future}, timeout=cls.max_wait_s)
+        except asyncio.CancelledError:
+            if not self._abandon(cls, waiter, None):
+                self.release(cls.name)
+            raise
+        if not waiter.granted and self._abandon(cls, waiter, "deadline"):
+            raise LLMOverloaded(cls.name, "deadline", time.perf_counter() - waiter.enqueued)
+        return cls.name
+
+    def acquire_sync(self, priority: Optional[str] = None, client: Optional[str] = None, cost: float = 1.0) -> str:
+        cls, client = self._prepare(priority, client)
+        waiter = _Waiter(client, cost, None)
+        with self._lock:
+            if self._enqueue(cls, waiter):
+                return cls.name
+        waiter._event.wait(cls.max_wait_s)
+        if not waiter.granted and self._abandon(cls, waiter, "deadline"):
+            raise LLMOverloaded(cls.name, "deadline", time.perf_counter() - waiter.enqueued)
+        return cls.name
+
+    @asynccontextmanager
+    async def aslot(self, priority: Optional[str] = None, client: Optional[str] = None, cost: float = 1.0):
+        name = await self.acquire(priority, client, cost)
+        try:
+            yield name
+        finally:
+            self.release(name)
+
+    @contextmanager
+    def slot(self, priority: Optional[str] = None, client: Optional[str] = None, cost: float = 1.0):
+        name = self.acquire_sync(priority, client, cost)
+        try:
+            yield name
+        finally:
+            self.release(name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            classes = {}
+            for cls in self._order:
+                waits = sorted(cls.waits_ms)
+                oldest = min((w.enqueued for _, _, w in cls.heap if not w.abandoned), default=None)
+                classes[cls.name] = {
+                    "priority": cls.priority,
+                    "min_concurrency": cls.min_concurrency,
+                    "max_concurrency": cls.max_concurrency,
+                    "max_wait_s": cls.max_wait_s,
+                    "in_flight": cls.in_flight,
+                    "queue_depth": cls.queued,
+                    "queued_clients": len({w.client for _, _, w in cls.heap if not w.abandoned}),
+                    "oldest_wait_ms": round((time.perf_counter() - oldest) * 1000, 1) if oldest else 0.0,
+                    "granted": cls.granted,
+                    "rejected": dict(cls.rejected),
+                    "wait_ms_p50": round(waits[len(waits) // 2], 2) if waits else None,
+                    "wait_ms_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 2) if waits else None,
+                    "wait_ms_max": round(waits[-1], 2) if waits else None,
+                }
+            return {
+                "capacity": self.capacity,
+                "in_flight": self._in_flight(),
+                "classes": classes,
+                "adaptive_limit": self.limit.snapshot() if self.limit is not None else None,
+            }
+
+
+# 업스트림 응답으로 조정되는 동시 호출 한도 (LLM_MAX_CONCURRENCY 가 상한)
+llm_limit = AdaptiveLimit(
+    initial=settings.LLM_INITIAL_CONCURRENCY,
+    min_limit=settings.LLM_MIN_CONCURRENCY,
+    max_limit=settings.LLM_MAX_CONCURRENCY,
+    backoff=settings.LLM_LIMIT_BACKOFF,
+    tolerance=settings.LLM_LIMIT_LATENCY_TOLERANCE,
+    headroom=settings.LLM_RATE_LIMIT_HEADROOM,
+    cooldown_s=settings.LLM_LIMIT_COOLDOWN_S,
+) if settings.LLM_ADAPTIVE_LIMIT_ENABLED else None
+
+llm_scheduler = LLMScheduler(
+    capacity=settings.LLM_MAX_CONCURRENCY,
+    classes=settings.LLM_PRIORITY_CLASSES,
+    client_weights=settings.LLM_CLIENT_WEIGHTS,
+    limit=llm_limit,
+)
+
+
+class LLMSchedulingMiddleware:
+    """
+    요청마다 LLM 스케줄링 컨텍스트를 설정합니다 (pure ASGI).
+    - 클라이언트: X-Client-Id 헤더, 없으면 접속 IP
+    - 우선순위: 기본 interactive, X-LLM-Priority 헤더로 같거나 낮은 클래스만 선택 가능 (대량 요청용)
+    """
+
+    def __init__(self, app, scheduler: LLMScheduler = llm_scheduler, default_priority: str = INTERACTIVE):
+        self.app = app
+        self.scheduler = scheduler
+        self.default_priority = default_priority
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        client = headers.get(b"x-client-id", b"").decode("latin-1")[:64]
+        if not client:
+            client = (scope.get("client") or ("anonymous", 0))[0]
+        priority = headers.get(b"x-llm-priority", b"").decode("latin-1").strip().lower()
+        if not self.scheduler.is_lower_priority(priority, self.default_priority):
+            priority = self.default_priority
+
+        token = _llm_context.set((priority, client))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _llm_context.reset(token)
@@ -0,0 +1,12 @@
+import hmac
+from typing import Optional
+
+from app.core.config import settings
+
+
+def admin_authorized(token: Optional[str]) -> bool:
+    """X-Admin-Token 확인 (ADMIN_TOKEN 미설정 시 항상 거절)"""
+    if not settings.ADMIN_TOKEN or token is None:
+        return False
+    # str 끼리 비교하면 비 ASCII 문자가 섞였을 때 TypeError 이므로 bytes 로 비교
+    return hmac.compare_digest(token.encode("utf-8"), settings.ADMIN_TOKEN.encode("utf-8"))
@@ -1,12 +1,19 @@
 # fastapi middleware
 from fastapi import FastAPI
-from starlette.middleware.gzip import GZipMiddleware
+from app.utils.compression import CompressionMiddleware
+from app.utils.traffic_recorder import TrafficRecorderMiddleware
+from app.utils.profiler import ProfilerMiddleware
+from app.core.llm_scheduler import LLMSchedulingMiddleware
+from app.utils.loop_monitor import LoopMonitorMiddleware, loop_monitor
 from fastapi.middleware.cors import CORSMiddleware
 # global setting
 from app.core.config import settings
 from app.utils.error_handler import setup_exception_handlers
 # lifespan
+import asyncio
 from contextlib import asynccontextmanager
+from app.services.rag_service import rag_service
+from app.services.cache_warmer import cache_warmer
 # router
 from app.api.v1.router import api_router
 
@@ -18,6 +25,17 @@ async def lifespan(app: FastAPI):
     # Startup
     print("Starting up FastAPI application...")
 
+    # - event loop lag monitor (preload 등 startup 중 블로킹도 탐지되도록 가장 먼저)
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+
+    # - embedding model (gunicorn preload_app 마스터에서 이미 로드된 경우 재사용)
+    await asyncio.to_thread(rag_service.preload)
+
+    # - cache warming (쿼리 로그 상위 입력, 백그라운드)
+    if settings.CACHE_WARM_ENABLED:
+        cache_warmer.schedule("startup", delay=settings.CACHE_WARM_STARTUP_DELAY_S)
+
     # - init db
 
     # - ping es
@@ -26,6 +44,8 @@ async def lifespan(app: FastAPI):
     yield
 
     # Shutdown
+    await cache_warmer.stop()
+    await loop_monitor.stop()
     # - DB connection close
     print("Shutting down FastAPI application...")
 
@@ -49,13 +69,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# GZipMiddleware
+# 응답 압축 (Accept-Encoding 협상: zstd > br > gzip, 큰 바디는 스레드 풀에서 압축)
 app.add_middleware(
-    GZipMiddleware,
-    minimum_size=1024,     # 1KB 이상만 압축 (작은 바디는 역효과)
-    compresslevel=6
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,     # 1KB 이상만 압축 (작은 바디는 역효과)
+    offload_size=settings.COMPRESSION_OFFLOAD_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL
 )
 
+# 트래픽 기록 (opt-in, 샘플링된 요청과 LLM 업스트림 응답을 JSONL로 기록 → benchmarks.replay_traffic 로 재생)
+if settings.RECORDER_ENABLED:
+    app.add_middleware(
+        TrafficRecorderMiddleware,
+        path=settings.RECORDER_PATH,
+        sample_rate=settings.RECORDER_SAMPLE_RATE,
+        max_bytes=settings.RECORDER_MAX_BYTES,
+        backup_count=settings.RECORDER_BACKUP_COUNT,
+        max_body_bytes=settings.RECORDER_MAX_BODY_BYTES,
+        path_prefix=settings.API_V1_STR
+    )
+
+# LLM 스케줄링 컨텍스트 (클라이언트 식별 + 우선순위 클래스, 클래스별 동시 실행 몫 / 대기 기한 적용)
+app.add_middleware(LLMSchedulingMiddleware)
+
+# 프로파일링 세션 중 완료 요청 수 집계 (/admin/profile 의 requests 종료 조건)
+if settings.PROFILER_ENABLED:
+    app.add_middleware(ProfilerMiddleware)
+
+# 이벤트 루프 lag 모니터 (요청 태스크 → 라우트 기록, lag 초과 시 503 + Retry-After; 가장 바깥에서 먼저 차단)
+if settings.LOOP_MONITOR_ENABLED:
+    app.add_middleware(LoopMonitorMiddleware, monitor=loop_monitor)
+
 
 # Health check API
 @app.get("/health")
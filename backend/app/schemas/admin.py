@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class ProfileRequest(BaseModel):
+    duration_s: float = Field(10.0, gt=0, le=300, description="프로파일링 시간 (요청 수 지정 시 최대 대기 시간)")
+    requests: Optional[int] = Field(None, ge=1, description="이 워커에서 완료된 요청 수가 도달하면 종료")
+    interval_ms: float = Field(5.0, ge=1, le=1000, description="스택 샘플링 간격")
+    memory: bool = Field(True, description="tracemalloc 할당 위치 집계")
+    memory_frames: int = Field(1, ge=1, le=25, description="tracemalloc 이 보관할 스택 깊이")
+    top: int = Field(30, ge=1, le=200, description="할당 위치 상위 N개")
+    include_idle: bool = Field(False, description="유휴 대기 스레드 스택 포함")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "duration_s": 15,
+                "requests": 200,
+                "interval_ms": 5
+            }
+        }
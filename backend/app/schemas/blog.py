@@ -1,15 +1,30 @@
+from datetime import date
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
+
+
+class SearchFilter(BaseModel):
+    """인덱스 메타데이터 조건 (모두 AND, tags 는 하나라도 일치)"""
+    post: Optional[str] = Field(None, max_length=300, description="글 경로 (data_dir 기준, 확장자 제외)")
+    tags: Optional[List[str]] = Field(None, max_length=20, description="front-matter 태그")
+    lang: Optional[str] = Field(None, max_length=20, description="front-matter 언어")
+    date_from: Optional[date] = Field(None, description="게시일 시작 (포함)")
+    date_to: Optional[date] = Field(None, description="게시일 끝 (포함)")
 
 
 class SearchQuery(BaseModel):
-    query: str = Field(..., min_length=1, description="검색할 질문")
+    query: str = Field(..., min_length=1, max_length=2000, description="검색할 질문")
+    corpus: Optional[str] = Field(None, max_length=100, description="검색할 코퍼스 (생략 시 기본 코퍼스)")
+    filter: Optional[SearchFilter] = Field(None, description="벡터 검색 단계에서 적용할 메타데이터 필터")
+    k: Optional[int] = Field(None, ge=1, le=50, description="검색할 청크 수 (기본 RAG_DEFAULT_K, 상한 RAG_MAX_K)")
     referer: bool = True
     test: bool = False
 
     class Config:
         json_schema_extra = {
             "example": {
-                "query": "FastAPI에서 의존성 주입은 어떻게 하나요?"
+                "query": "FastAPI에서 의존성 주입은 어떻게 하나요?",
+                "filter": {"tags": ["fastapi"], "date_from": "2024-01-01"},
+                "k": 4
             }
         }
@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class ChatRequest(BaseModel):
+    message: str = Field(..., min_length=1, description="사용자 메시지")
+    session_id: Optional[str] = Field(default=None, description="이어서 대화할 세션 ID (없으면 새 세션 생성)")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "message": "FastAPI에서 의존성 주입은 어떻게 하나요?",
+                "session_id": None
+            }
+        }
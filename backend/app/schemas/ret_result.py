@@ -2,6 +2,7 @@
 from typing import Optional, Any, Dict
 from enum import Enum
 import logging
+import orjson
 from pydantic import BaseModel, Field
 from starlette.status import HTTP_200_OK, HTTP_500_INTERNAL_SERVER_ERROR
 from fastapi.responses import ORJSONResponse
@@ -42,7 +43,39 @@ class ResultMessageEnum(str, Enum):
     INTERNAL_ERROR = "요청 처리 중 서버 오류가 발생했습니다."
 
 
-# API 공통 응답 규격 정의
+class EnvelopeResponse(ORJSONResponse):
+    """
+    공통 응답 envelope 전용 응답 클래스.
+    이미 평범한 dict인 envelope를 pydantic 모델 생성 없이 orjson으로 바로 직렬화합니다.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _orjson_default(value: Any) -> Any:
+    # data 안에 pydantic 모델 등 orjson이 모르는 타입이 섞여 있는 경우만 처리
+    if isinstance(value, BaseModel):
+        return value.model_dump(exclude_none=True)
+    return str(value)
+
+
+def envelope_response(
+    status: ResponseStatus,
+    result_code: int,
+    result_msg: Optional[str] = None,
+    data: Optional[Dict[str, Any]] = None,
+) -> EnvelopeResponse:
+    """ResponseResult 규격의 응답 (None 필드 제외)을 모델 생성 없이 만듭니다."""
+    content: Dict[str, Any] = {"status": status.value, "result_code": result_code}
+    if result_msg is not None:
+        content["result_msg"] = result_msg.value if isinstance(result_msg, Enum) else result_msg
+    if data is not None:
+        content["data"] = data
+    return EnvelopeResponse(status_code=result_code, content=content)
+
+
+# API 공통 응답 규격 정의 (모델은 스키마 문서용, 응답은 success / error → envelope_response 한 경로로 생성)
 class ResponseResult(BaseModel):
     status: ResponseStatus
     result_code: int
@@ -50,33 +83,19 @@ class ResponseResult(BaseModel):
     data: Optional[Dict[str, Any]] = None
 
     @classmethod
-    async def success(
+    def success(
         cls,
         result_code: int = HTTP_200_OK,
         result_msg: str = ResultMessageEnum.SUCCESS,
         data: Optional[Dict[str, Any]] = None,
     ) -> ORJSONResponse:
-        return retResponseResult(
-            cls(status=ResponseStatus.SUCCESS, result_code=result_code, result_msg=result_msg, data=data)
-        )
+        return envelope_response(ResponseStatus.SUCCESS, result_code, result_msg, data)
 
     @classmethod
-    async def error(
+    def error(
         cls,
         result_code: int = HTTP_500_INTERNAL_SERVER_ERROR,
         result_msg: str = ResultMessageEnum.INTERNAL_ERROR,
         data: Optional[Dict[str, Any]] = None,
     ) -> ORJSONResponse:
-        return retResponseResult(
-            cls(status=ResponseStatus.ERROR, result_code=result_code, result_msg=result_msg, data=data)
-        )
-
-
-# result_code와 status를 일치시키고, None Exclude 설정을 적용한 return
-def retResponseResult(result: ResponseResult) -> ORJSONResponse:
-    status_code = result.result_code
-
-    return ORJSONResponse(
-        status_code=status_code,
-        content=result.model_dump(exclude_unset=True, exclude_none=True)
-    )
+        return envelope_response(ResponseStatus.ERROR, result_code, result_msg, data)
@@ -1,17 +1,19 @@
-from pydantic import BaseModel
+from typing import Any, Dict, List
+from pydantic import BaseModel, Field
 
 
 # 표준 응답 모델들
+# 입력 길이 상한: 토큰 예산 검사 전에 비정상적으로 큰 요청을 검증 단계에서 차단
 class SQLInput(BaseModel):
-    query: str
-    database_type: str = "MariaDB"
-    context: str = ""
+    query: str = Field(..., max_length=20000)
+    database_type: str = Field("MariaDB", max_length=50)
+    context: str = Field("", max_length=200000)
 
 
 class TextInput(BaseModel):
-    description: str
-    database_type: str = "MariaDB"
-    context: str = ""
+    description: str = Field(..., max_length=20000)
+    database_type: str = Field("MariaDB", max_length=50)
+    context: str = Field("", max_length=200000)
 
 
 class ScenarioInput(BaseModel):
@@ -19,3 +21,53 @@ class ScenarioInput(BaseModel):
     database_type: str = "MariaDB"
     expected_scale: str = "medium"
     performance_requirements: str = "standard"
+
+
+# LLM 구조화 출력 모델들 (프롬프트 섹션의 output_schema 에서 이름으로 참조)
+class SQLExecuteOutput(BaseModel):
+    success: bool = True
+    data: List[Dict[str, Any]] = Field(default_factory=list)
+    row_count: int = 0
+    execution_time_ms: float = 0
+    query_explanation: str = ""
+
+
+class SQLConvertOutput(BaseModel):
+    sql_query: str
+    explanation: str
+    complexity: str
+    estimated_performance: str
+    key_concepts: List[str] = Field(default_factory=list)
+    security_notes: str = ""
+
+
+class OptimizationSuggestion(BaseModel):
+    type: str
+    description: str
+    impact: str = ""
+
+
+class PerformanceAnalysis(BaseModel):
+    current_complexity: str = ""
+    bottlenecks: List[str] = Field(default_factory=list)
+    estimated_execution_time: Dict[str, str] = Field(default_factory=dict)
+
+
+class SQLOptimizeOutput(BaseModel):
+    performance_analysis: PerformanceAnalysis = Field(default_factory=PerformanceAnalysis)
+    optimization_suggestions: List[OptimizationSuggestion] = Field(default_factory=list)
+    optimized_query: str
+    monitoring_suggestions: List[str] = Field(default_factory=list)
+
+
+class SchemaDesignOutput(BaseModel):
+    dbml: str
+    design_notes: str = ""
+
+
+OUTPUT_SCHEMAS = {
+    "SQLExecuteOutput": SQLExecuteOutput,
+    "SQLConvertOutput": SQLConvertOutput,
+    "SQLOptimizeOutput": SQLOptimizeOutput,
+    "SchemaDesignOutput": SchemaDesignOutput,
+}
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.llm_scheduler import BACKGROUND, llm_priority
+from app.services.query_analyzer import QueryPlanAnalyzer, query_analyzer
+from app.services.query_log import QueryLog, query_log
+from app.services.corpus_registry import CorpusRegistry, UnknownCorpusError, corpus_registry
+from app.services.sql_engine import SQLExecutionEngine, SQLExecutionUnsupported, sql_engine
+
+
+logger = logging.getLogger(__name__)
+
+WARMABLE_ENDPOINTS = ("blog/search", "tools/sql/result", "tools/sql/optimize")
+
+
+class CacheWarmer:
+    """
+    쿼리 로그의 빈도 상위 입력으로 캐시를 미리 채웁니다 (배포 직후 / 재인덱싱 후).
+
+    - blog/search: 질의 임베딩 + 검색 결과 (답변 캐시가 켜져 있으면 답변까지)
+      기본 코퍼스 외에는 이미 열려 있는 코퍼스만 (예열 때문에 다른 코퍼스가 축출되지 않도록)
+    - tools/sql/result: context DB 이미지 캐시
+    - tools/sql/optimize: 계획 분석 결과 캐시
+    실시간 트래픽과 경쟁하지 않도록 한 번에 한 항목씩, 초당 rate 개 이하로,
+    마지막 실시간 요청 후 idle_ms 가 지났을 때만 실행합니다.
+    """
+
+    def __init__(self, log: QueryLog, registry: CorpusRegistry, engine: SQLExecutionEngine, analyzer: QueryPlanAnalyzer,
+                 top_n: int, window_hours: int, rate: float, idle_ms: int):
+        self.log = log
+        self.registry = registry
+        self.engine = engine
+        self.analyzer = analyzer
+        self.top_n = top_n
+        self.window_hours = window_hours
+        self.rate = rate
+        self.idle_ms = idle_ms
+        self._task: Optional[asyncio.Task] = None
+        self._rerun = False
+        self.last_run: Dict[str, Any] = {}
+
+    def schedule(self, reason: str, delay: float = 0.0):
+        """예열 작업을 백그라운드로 시작합니다. 이미 실행 중이면 끝난 뒤 한 번 더 실행합니다."""
+        if self._task is not None and not self._task.done():
+            self._rerun = True
+            return
+        self._task = asyncio.create_task(self._run_loop(reason, delay))
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run_loop(self, reason: str, delay: float):
+        if delay:
+            await asyncio.sleep(delay)
+        while True:
+            self._rerun = False
+            try:
+                await self.run(reason)
+            except Exception as e:
+                logger.exception(f"캐시 예열 실패: {e}")
+            if not self._rerun:
+                return
+            reason = "rerun"
+
+    async def _wait_for_idle(self):
+        idle = self.idle_ms / 1000
+        while True:
+            remaining = self.log.last_live_request + idle - time.monotonic()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(remaining)
+
+    async def run(self, reason: str) -> Dict[str, Any]:
+        started = time.time()
+        since = started - self.window_hours * 3600 if self.window_hours else None
+        items = await asyncio.to_thread(self.log.top, self.top_n, WARMABLE_ENDPOINTS, since)
+
+        warmed = skipped = failed = 0
+        interval = 1 / self.rate if self.rate > 0 else 0
+        for endpoint, inputs, _ in items:
+            await self._wait_for_idle()
+            item_started = time.monotonic()
+            try:
+                # 답변 예열의 LLM 호출은 실시간 요청 뒤로 (남는 용량만 사용)
+                with llm_priority(BACKGROUND, client="cache-warmer"):
+                    done = await asyncio.to_thread(self.warm_one, endpoint, inputs)
+                if done:
+                    warmed += 1
+                else:
+                    skipped += 1
+            except Exception as e:
+                failed += 1
+                logger.debug(f"캐시 예열 항목 실패 ({endpoint}): {e}")
+            # 항목 처리 시간을 포함해 초당 rate 개를 넘지 않도록 대기
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - item_started)))
+
+        self.last_run = {
+            "reason": reason,
+            "started_at": started,
+            "duration_s": round(time.time() - started, 2),
+            "candidates": len(items),
+            "warmed": warmed,
+            "skipped": skipped,
+            "failed": failed,
+        }
+        logger.info(f"캐시 예열 완료: {self.last_run}")
+        return self.last_run
+
+    def warm_one(self, endpoint: str, inputs: Dict[str, Any]) -> bool:
+        """한 항목을 예열합니다. 예열할 것이 없으면 False."""
+        if endpoint == "blog/search":
+            query = inputs.get("query")
+            if not query:
+                return False
+            try:
+                corpus = self.registry.get(inputs.get("corpus"))
+            except UnknownCorpusError:
+                return False
+            if corpus is not self.registry.default and corpus.service_client is None and not corpus.is_open:
+                return False
+            k, filters = inputs.get("k"), inputs.get("filter")
+            corpus.retrieve(query, k, filters)
+            if corpus.answer_cache.maxsize > 0:
+                corpus.answer(query, inputs.get("mode", "sources"), k, filters)
+            return True
+
+        if endpoint == "tools/sql/result":
+            return self.engine.warm(inputs.get("context", ""))
+
+        if endpoint == "tools/sql/optimize":
+            try:
+                self.analyzer.analyze(inputs.get("query", ""), inputs.get("context", ""))
+            except SQLExecutionUnsupported:
+                return False
+            return True
+
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "last_run": self.last_run,
+            "caches": {
+                "query_embedding": self.registry.default.query_embedding_cache.stats(),
+                "retrieval": self.registry.default.retrieval_cache.stats(),
+                "answer": self.registry.default.answer_cache.stats(),
+                "sql_analyzer": self.analyzer.cache.stats(),
+            },
+        }
+
+
+cache_warmer = CacheWarmer(
+    log=query_log,
+    registry=corpus_registry,
+    engine=sql_engine,
+    analyzer=query_analyzer,
+    top_n=settings.CACHE_WARM_TOP_N,
+    window_hours=settings.CACHE_WARM_WINDOW_HOURS,
+    rate=settings.CACHE_WARM_RATE,
+    idle_ms=settings.CACHE_WARM_IDLE_MS
+)
@@ -0,0 +1,310 @@
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import orjson
+
+from app.core.config import settings
+from app.core.llm_scheduler import BACKGROUND, llm_priority
+from app.services.rag_service import BlogRAGService, rag_service
+from app.utils.token_counter import count_tokens
+
+
+logger = logging.getLogger(__name__)
+
+# 세션 객체 자체의 고정 오버헤드 추정치 (deque, dict 엔트리 등)
+_SESSION_OVERHEAD_BYTES = 512
+_TURN_OVERHEAD_BYTES = 64
+
+
+class ChatSession:
+    """
+    대화 세션. 최근 턴은 고정 크기 ring buffer에 보관하고,
+    밀려난 턴은 pending에 모았다가 compact 시 요약에 합칩니다.
+    같은 세션에 동시에 들어온 요청 / 백그라운드 compact 는 lock 안에서만 세션을 읽고 변경합니다.
+    """
+
+    __slots__ = ("session_id", "turns", "summary", "pending", "size_bytes", "updated_at", "lock", "compacting")
+
+    def __init__(self, session_id: str, max_turns: int, summary: str = "", turns: Optional[List[Tuple[str, str]]] = None):
+        self.session_id = session_id
+        self.turns: Deque[Tuple[str, str]] = deque(maxlen=max_turns)
+        self.summary = summary
+        self.pending: List[Tuple[str, str]] = []
+        self.size_bytes = _SESSION_OVERHEAD_BYTES + len(summary.encode("utf-8"))
+        self.updated_at = time.time()
+        self.lock = threading.Lock()
+        self.compacting = False
+        for role, content in turns or []:
+            self.append(role, content)
+
+    def append(self, role: str, content: str):
+        if len(self.turns) == self.turns.maxlen:
+            evicted = self.turns.popleft()
+            self.pending.append(evicted)
+        self.turns.append((role, content))
+        self.size_bytes += len(content.encode("utf-8")) + _TURN_OVERHEAD_BYTES
+        self.updated_at = time.time()
+
+    def fold_oldest(self):
+        """가장 오래된 턴을 요약 대기 목록으로 옮깁니다."""
+        self.pending.append(self.turns.popleft())
+
+    def recalculate_size(self):
+        self.size_bytes = (
+            _SESSION_OVERHEAD_BYTES
+            + len(self.summary.encode("utf-8"))
+            + sum(len(c.encode("utf-8")) + _TURN_OVERHEAD_BYTES for _, c in self.turns)
+            + sum(len(c.encode("utf-8")) + _TURN_OVERHEAD_BYTES for _, c in self.pending)
+        )
+
+    def to_payload(self) -> bytes:
+        return orjson.dumps({"summary": self.summary, "turns": list(self.pending) + list(self.turns)})
+
+    @classmethod
+    def from_payload(cls, session_id: str, payload: bytes, max_turns: int) -> "ChatSession":
+        data = orjson.loads(payload)
+        session = cls(session_id, max_turns, summary=data.get("summary", ""))
+        for role, content in data.get("turns", []):
+            session.append(role, content)
+        return session
+
+
+class SessionStore:
+    """
+    바이트 예산 기반 인메모리 LRU 세션 저장소.
+    예산을 넘으면 가장 오래 사용되지 않은 세션을 SQLite로 내보내고(spill_path 지정 시), 아니면 폐기합니다.
+    """
+
+    def __init__(self, byte_budget: int, max_turns: int, spill_path: str = ""):
+        self.byte_budget = byte_budget
+        self.max_turns = max_turns
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self._spill: Optional[sqlite3.Connection] = None
+        if spill_path:
+            self._spill = sqlite3.connect(spill_path, check_same_thread=False)
+            self._spill.execute(
+                "CREATE TABLE IF NOT EXISTS chat_sessions (session_id TEXT PRIMARY KEY, payload BLOB, updated_at REAL)"
+            )
+            self._spill.commit()
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                return session
+            session = self._load_spilled(session_id)
+            if session is not None:
+                self._insert(session)
+            return session
+
+    def get_or_create(self, session_id: Optional[str] = None) -> ChatSession:
+        with self._lock:
+            session = self.get(session_id) if session_id else None
+            if session is None:
+                session = ChatSession(session_id or uuid.uuid4().hex, self.max_turns)
+                self._insert(session)
+            return session
+
+    def update(self, session: ChatSession, previous_size: int):
+        """세션 변경 후 크기 변화를 반영하고 예산 초과 시 LRU 세션을 내보냅니다 (session.lock 을 잡은 채 호출)."""
+        with self._lock:
+            current = self._sessions.get(session.session_id)
+            if current is session:
+                self._total_bytes += session.size_bytes - previous_size
+                self._sessions.move_to_end(session.session_id)
+            else:
+                # LLM 호출 중에 내보내진 세션: 방금 변경한 객체가 최신이므로 다시 넣고 내보낸(다시 읽힌) 상태는 버림
+                if current is not None:
+                    self._total_bytes -= current.size_bytes
+                self._delete_spilled(session.session_id)
+                self._sessions[session.session_id] = session
+                self._total_bytes += session.size_bytes
+            self._evict()
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._total_bytes -= session.size_bytes
+            return self._delete_spilled(session_id) or session is not None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            spilled = 0
+            if self._spill is not None:
+                spilled = self._spill.execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0]
+            return {
+                "sessions_in_memory": len(self._sessions),
+                "bytes_in_memory": self._total_bytes,
+                "byte_budget": self.byte_budget,
+                "sessions_spilled": spilled,
+            }
+
+    def _insert(self, session: ChatSession):
+        self._sessions[session.session_id] = session
+        self._total_bytes += session.size_bytes
+        self._evict()
+
+    def _evict(self):
+        # 방금 사용한 세션(맨 뒤)과 다른 요청이 변경 중인 세션은 남겨둠
+        # (세션 lock 을 기다리면 세션 lock → 저장소 lock 순서로 잡는 update 와 교착되므로 시도만 함)
+        for session_id in list(self._sessions)[:-1]:
+            if self._total_bytes <= self.byte_budget:
+                break
+            session = self._sessions[session_id]
+            if not session.lock.acquire(blocking=False):
+                continue
+            try:
+                del self._sessions[session_id]
+                self._total_bytes -= session.size_bytes
+                if self._spill is not None:
+                    self._spill.execute(
+                        "INSERT OR REPLACE INTO chat_sessions (session_id, payload, updated_at) VALUES (?, ?, ?)",
+                        (session_id, session.to_payload(), session.updated_at)
+                    )
+                    self._spill.commit()
+                else:
+                    logger.info(f"세션 메모리 예산 초과로 세션 폐기: {session_id}")
+            finally:
+                session.lock.release()
+
+    def _delete_spilled(self, session_id: str) -> bool:
+        if self._spill is None:
+            return False
+        cursor = self._spill.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+        self._spill.commit()
+        return cursor.rowcount > 0
+
+    def _load_spilled(self, session_id: str) -> Optional[ChatSession]:
+        if self._spill is None:
+            return None
+        row = self._spill.execute("SELECT payload FROM chat_sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        self._delete_spilled(session_id)
+        return ChatSession.from_payload(session_id, row[0], self.max_turns)
+
+
+class ChatService:
+    """
+    mochachat 대화 서비스.
+
+    - 요청마다 최근 대화는 history_token_budget 안에서만 프롬프트에 포함
+    - 예산 밖으로 밀려난 턴은 compact()에서 요약에 합쳐 요약 길이도 제한
+    - 검색은 BlogRAGService를 재사용하며, 후속 질문은 직전 사용자 질문으로 보강
+    """
+
+    def __init__(self, store: SessionStore, rag: BlogRAGService, history_token_budget: int,
+                 max_message_chars: int, max_summary_chars: int):
+        self.store = store
+        self.rag = rag
+        self.history_token_budget = history_token_budget
+        self.max_message_chars = max_message_chars
+        self.max_summary_chars = max_summary_chars
+
+    def _window(self, session: ChatSession) -> Tuple[str, int]:
+        """토큰 예산 안에 들어가는 최근 턴을 반환하고, 예산 밖의 턴 수를 함께 반환합니다 (session.lock 안에서 호출)."""
+        lines: List[str] = []
+        used = 0
+        for role, content in reversed(session.turns):
+            line = f"{role}: {content}"
+            tokens = count_tokens(line)
+            if used + tokens > self.history_token_budget:
+                break
+            lines.append(line)
+            used += tokens
+        return "\n".join(reversed(lines)), len(session.turns) - len(lines)
+
+    def chat(self, session_id: Optional[str], message: str) -> Dict:
+        message = message[:self.max_message_chars]
+        session = self.store.get_or_create(session_id)
+        # LLM 호출 동안은 lock 을 놓으므로 프롬프트에 쓸 상태만 복사
+        with session.lock:
+            history, _ = self._window(session)
+            summary = session.summary
+            last_user = next((c for r, c in reversed(session.turns) if r == "user"), "")
+
+        retrieval_query = f"{last_user}\n{message}" if last_user else message
+        result = self.rag.query_with_history(message, history, summary, retrieval_query)
+
+        with session.lock:
+            previous_size = session.size_bytes
+            # 그 사이 같은 세션의 다른 요청이 턴을 추가했을 수 있으므로 예산 밖 턴 수는 지금 상태로 계산
+            _, overflow = self._window(session)
+            for _ in range(overflow):
+                session.fold_oldest()
+            session.append("user", message)
+            session.append("assistant", result["answer"][:self.max_message_chars])
+            self.store.update(session, previous_size)
+            needs_compaction = bool(session.pending)
+
+        return {
+            "session_id": session.session_id,
+            "answer": result["answer"],
+            "sources": result["sources"],
+            "needs_compaction": needs_compaction,
+        }
+
+    def compact(self, session_id: str):
+        """요약 대기 중인 턴을 요약에 합칩니다 (응답 후 백그라운드에서 실행)."""
+        session = self.store.get(session_id)
+        if session is None:
+            return
+        with session.lock:
+            if not session.pending or session.compacting:
+                return
+            session.compacting = True
+            pending = list(session.pending)
+            previous_summary = session.summary
+
+        try:
+            turns = "\n".join(f"{role}: {content}" for role, content in pending)
+            try:
+                with llm_priority(BACKGROUND):
+                    summary = self.rag.summarize_conversation(previous_summary, turns)
+            except Exception as e:
+                logger.warning(f"대화 요약 실패, 단순 절단으로 대체: {e}")
+                summary = f"{previous_summary}\n{turns}".strip()
+
+            with session.lock:
+                previous_size = session.size_bytes
+                # 요약한 턴만 제거 (요약하는 동안 chat 이 새로 밀어낸 턴은 다음 compact 에서 처리)
+                del session.pending[:len(pending)]
+                # 요약도 상한을 두어 세션 메모리와 프롬프트 토큰이 대화 길이와 무관하게 유지되도록 함
+                session.summary = summary[-self.max_summary_chars:]
+                session.recalculate_size()
+                self.store.update(session, previous_size)
+        finally:
+            session.compacting = False
+
+    def history(self, session_id: str) -> Optional[Dict]:
+        session = self.store.get(session_id)
+        if session is None:
+            return None
+        with session.lock:
+            return {
+                "session_id": session.session_id,
+                "summary": session.summary,
+                "turns": [{"role": role, "content": content} for role, content in session.turns],
+            }
+
+
+chat_service = ChatService(
+    store=SessionStore(
+        byte_budget=settings.CHAT_SESSION_BYTE_BUDGET,
+        max_turns=settings.CHAT_MAX_TURNS,
+        spill_path=settings.CHAT_SESSION_SPILL_PATH
+    ),
+    rag=rag_service,
+    history_token_budget=settings.CHAT_HISTORY_TOKEN_BUDGET,
+    max_message_chars=settings.CHAT_MAX_MESSAGE_CHARS,
+    max_summary_chars=settings.CHAT_MAX_SUMMARY_CHARS
+)
@@ -0,0 +1,161 @@
+import gc
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.rag_service import BlogRAGService, rag_service
+
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownCorpusError(KeyError):
+    """등록되지 않은 코퍼스 이름"""
+
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class CorpusRegistry:
+    """
+    이름별 RAG 코퍼스(블로그 / 문서 모음) 레지스트리.
+
+    - 코퍼스 객체는 처음 조회될 때 생성되고, 벡터 스토어는 첫 검색 시 열림
+    - 모든 코퍼스가 기본 코퍼스의 임베딩 모델 / LLM 클라이언트 / 질의 임베딩 캐시를 공유
+    - 열린 코퍼스의 인덱스 크기(디스크 기준 추정치) 합이 memory_budget_mb 를 넘으면
+      가장 오래 사용하지 않은 코퍼스부터 닫음 (방금 연 코퍼스는 제외)
+    - 임베딩 서비스 모드에서는 인덱스를 서비스 프로세스가 열기 때문에 워커에서는 축출할 것이 없음
+    """
+
+    def __init__(self, default: BlogRAGService, corpora: Dict[str, Dict[str, str]], memory_budget_mb: int):
+        self.default = default
+        self.default_name = default.name
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self._configs: Dict[str, Dict[str, str]] = {
+            default.name: {"data_dir": default.data_dir, "persist_directory": default.persist_directory}
+        }
+        self._configs.update(corpora)
+        self._corpora: Dict[str, BlogRAGService] = {default.name: default}
+        # 열린 코퍼스 (오래 사용하지 않은 순)
+        self._open: "OrderedDict[str, None]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, Any]] = {name: self._empty_stats() for name in self._configs}
+        self._lock = threading.RLock()
+        default.on_open = self._opened
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, Any]:
+        return {"loads": 0, "evictions": 0, "load_ms": None, "documents": None, "size_bytes": 0, "last_used": None}
+
+    def names(self) -> List[str]:
+        return list(self._configs)
+
+    def get(self, name: Optional[str] = None) -> BlogRAGService:
+        """이름으로 코퍼스를 반환하고 LRU 순서를 갱신합니다 (벡터 스토어는 사용 시점에 열림)."""
+        name = name or self.default_name
+        with self._lock:
+            corpus = self._corpora.get(name)
+            if corpus is None:
+                config = self._configs.get(name)
+                if config is None:
+                    raise UnknownCorpusError(name)
+                corpus = BlogRAGService(
+                    data_dir=config["data_dir"],
+                    persist_directory=config["persist_directory"],
+                    name=name,
+                    shared=self.default
+                )
+                corpus.on_open = self._opened
+                self._corpora[name] = corpus
+            self._stats[name]["last_used"] = time.time()
+            if name in self._open:
+                self._open.move_to_end(name)
+            return corpus
+
+    def open(self, name: Optional[str] = None) -> BlogRAGService:
+        """코퍼스를 가져와 벡터 스토어까지 엽니다 (임베딩 서비스 모드에서는 서비스가 인덱스를 소유)."""
+        corpus = self.get(name)
+        if corpus.service_client is None:
+            corpus.open()
+        return corpus
+
+    def _opened(self, corpus: BlogRAGService):
+        """벡터 스토어가 열린 직후 호출: 로드 시간/크기를 기록하고 예산 초과 시 LRU 축출"""
+        with self._lock:
+            self._stats[corpus.name]["loads"] += 1
+            self._stats[corpus.name]["load_ms"] = corpus.load_ms
+        self.refresh(corpus.name)
+
+    def refresh(self, name: str):
+        """열린 코퍼스의 인덱스 크기/청크 수를 다시 계산합니다 (열기 직후, 재인덱싱 후)."""
+        corpus = self._corpora.get(name)
+        if corpus is None or not corpus.is_open:
+            return
+        size = _directory_size(corpus.index_path)
+        try:
+            documents = len(corpus.vector_store.get(include=[])["ids"])
+        except Exception:
+            documents = None
+        with self._lock:
+            self._stats[name]["size_bytes"] = size
+            self._stats[name]["documents"] = documents
+            self._open[name] = None
+            self._open.move_to_end(name)
+            self._evict_over_budget(keep=name)
+        logger.info(f"코퍼스 인덱스: {name} ({documents} chunks, {size / 1024 / 1024:.1f}MB)")
+
+    def _evict_over_budget(self, keep: str):
+        evicted = False
+        while self.memory_budget > 0 and self._open_bytes() > self.memory_budget:
+            victim = next((name for name in self._open if name != keep), None)
+            if victim is None:
+                break
+            self._open.pop(victim)
+            self._corpora[victim].close()
+            self._stats[victim]["evictions"] += 1
+            evicted = True
+            logger.info(f"코퍼스 축출 (메모리 예산 초과): {victim}")
+        if evicted:
+            # close() 가 Chroma System 을 정지한 뒤 남은 참조 순환(LangChain 래퍼 등)을 즉시 수거
+            gc.collect()
+
+    def _open_bytes(self) -> int:
+        return sum(self._stats[name]["size_bytes"] for name in self._open)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            corpora = {}
+            for name, config in self._configs.items():
+                corpus = self._corpora.get(name)
+                corpora[name] = {
+                    "data_dir": config["data_dir"],
+                    "open": bool(corpus is not None and corpus.is_open),
+                    "index_version": corpus.index_version if corpus is not None else None,
+                    **self._stats[name],
+                    "retrieval_cache": corpus.retrieval_cache.stats() if corpus is not None else None,
+                }
+            return {
+                "default": self.default_name,
+                "memory_budget_mb": self.memory_budget // (1024 * 1024),
+                "open_bytes": self._open_bytes(),
+                "remote_index": self.default.service_client is not None,
+                "corpora": corpora,
+            }
+
+
+corpus_registry = CorpusRegistry(
+    default=rag_service,
+    corpora=settings.RAG_CORPORA,
+    memory_budget_mb=settings.RAG_CORPUS_MEMORY_MB
+)
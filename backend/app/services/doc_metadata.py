@@ -0,0 +1,136 @@
+"""
+인덱싱 시 문서 메타데이터 추출과 검색 필터 → Chroma where 변환.
+
+청크 메타데이터 (Chroma 메타데이터 값은 스칼라만 허용되므로 태그는 tag_<name>=True 로 펼쳐 저장):
+    source, post(data_dir 기준 경로, 확장자 제외), title, heading(청크가 속한 섹션 제목),
+    tags("a,b"), tag_<name>, lang, date(ISO), date_ts, modified_ts, start_index
+"""
+import os
+import re
+from datetime import date, datetime, time as dtime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+
+_FRONT_MATTER = re.compile(r"\A---[ \t]*\r?\n(.*?)\r?\n---[ \t]*(?:\r?\n|\Z)", re.DOTALL)
+_HEADING = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t]*#*[ \t]*$", re.MULTILINE)
+
+
+def parse_front_matter(text: str) -> Tuple[Dict[str, Any], str]:
+    """YAML front-matter 를 분리합니다. 형식이 잘못됐으면 본문 그대로 반환합니다."""
+    match = _FRONT_MATTER.match(text)
+    if not match:
+        return {}, text
+    try:
+        front = yaml.safe_load(match.group(1)) or {}
+    except yaml.YAMLError:
+        return {}, text
+    if not isinstance(front, dict):
+        return {}, text
+    return front, text[match.end():]
+
+
+def tag_key(tag: str) -> str:
+    return f"tag_{tag.strip().lower()}"
+
+
+def _normalize_tags(value: Any) -> List[str]:
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, (list, tuple)):
+        return []
+    return sorted({str(t).strip().lower() for t in value if str(t).strip()})
+
+
+def _to_timestamp(value: Any, end_of_day: bool = False) -> Optional[int]:
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        return int((value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp())
+    if isinstance(value, date):
+        moment = datetime.combine(value, dtime.max if end_of_day else dtime.min, tzinfo=timezone.utc)
+        return int(moment.timestamp())
+    return None
+
+
+def document_metadata(path: str, data_dir: str, front: Dict[str, Any], body: str) -> Dict[str, Any]:
+    """파일 경로 / front-matter / 본문 첫 제목 / 수정 시각으로 문서 단위 메타데이터를 만듭니다."""
+    post = os.path.splitext(os.path.relpath(path, data_dir))[0].replace(os.sep, "/")
+    metadata: Dict[str, Any] = {"source": path, "post": post}
+    try:
+        metadata["modified_ts"] = int(os.path.getmtime(path))
+    except OSError:
+        pass
+
+    title = front.get("title")
+    if not title:
+        heading = _HEADING.search(body)
+        title = heading.group(2) if heading else post
+    metadata["title"] = str(title)
+
+    tags = _normalize_tags(front.get("tags") or front.get("categories"))
+    if tags:
+        metadata["tags"] = ",".join(tags)
+        for tag in tags:
+            metadata[tag_key(tag)] = True
+
+    lang = front.get("lang") or front.get("language")
+    if lang:
+        metadata["lang"] = str(lang).lower()
+
+    published = front.get("date")
+    timestamp = _to_timestamp(published)
+    if timestamp is not None:
+        metadata["date"] = published.isoformat() if isinstance(published, (date, datetime)) else str(published)
+        metadata["date_ts"] = timestamp
+    return metadata
+
+
+def headings_index(body: str) -> List[Tuple[int, str]]:
+    """(시작 위치, 제목) 목록"""
+    return [(m.start(), m.group(2)) for m in _HEADING.finditer(body)]
+
+
+def heading_at(headings: List[Tuple[int, str]], position: int) -> Optional[str]:
+    current = None
+    for start, title in headings:
+        if start > position:
+            break
+        current = title
+    return current
+
+
+def build_where(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    /blog/search 의 filter 를 Chroma where 절로 변환합니다 (벡터 검색 단계에서 적용).
+
+    filters: {"post": str, "tags": [str] (하나라도 일치), "lang": str, "date_from": date, "date_to": date}
+    """
+    if not filters:
+        return None
+    clauses: List[Dict[str, Any]] = []
+    if filters.get("post"):
+        clauses.append({"post": {"$eq": filters["post"]}})
+    if filters.get("lang"):
+        clauses.append({"lang": {"$eq": str(filters["lang"]).lower()}})
+    tags = _normalize_tags(filters.get("tags"))
+    if len(tags) == 1:
+        clauses.append({tag_key(tags[0]): {"$eq": True}})
+    elif tags:
+        clauses.append({"$or": [{tag_key(tag): {"$eq": True}} for tag in tags]})
+    date_from = _to_timestamp(filters.get("date_from"))
+    if date_from is not None:
+        clauses.append({"date_ts": {"$gte": date_from}})
+    date_to = _to_timestamp(filters.get("date_to"), end_of_day=True)
+    if date_to is not None:
+        clauses.append({"date_ts": {"$lte": date_to}})
+
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
@@ -0,0 +1,404 @@
+"""
+임베딩/검색 전용 서비스 프로세스와 워커용 클라이언트.
+
+gunicorn 워커마다 sentence-transformers 모델과 Chroma 클라이언트를 따로 로드하면
+RSS가 워커 수만큼 늘어나므로, 모델과 인덱스는 전용 프로세스 하나가 소유하고
+API 워커는 Unix 소켓으로 요청을 보냅니다. 서버는 짧은 대기 시간 동안 들어온
+임베딩 요청을 모아 한 번의 배치로 모델을 호출합니다.
+
+실행:
+    python -m app.services.embedding_service
+
+프로토콜: 4바이트 big-endian 길이 + orjson 페이로드 (요청/응답 동일)
+    {"op": "embed", "texts": [...]}          -> {"ok": true, "result": [[float, ...], ...]}
+    {"op": "search", "query": "...", "k": 4, "corpus": "blog", "where": {...}}  (where: Chroma 메타데이터 조건, 선택)
+                                             -> {"ok": true, "result": [{"page_content": ..., "metadata": {...}}]}
+    {"op": "index", "corpus": "blog"}        -> {"ok": true, "result": null}
+    {"op": "index_files", "corpus": "blog", "paths": [...]} -> {"ok": true, "result": null}  (업로드 파일만 증분 인덱싱)
+    {"op": "rollback", "corpus": "blog", "version": null} -> {"ok": true, "result": "<version>"}
+    {"op": "snapshots", "corpus": "blog"}    -> {"ok": true, "result": {"current": ..., "versions": [...]}}
+    {"op": "summarize", "corpus": "blog"}    -> {"ok": true, "result": true}  (요약 배치 시작, 실행 중이면 false)
+    {"op": "summary_status", "corpus": "blog"}
+    search 에 "collection": "summaries" 를 주면 요약 컬렉션 검색 (없으면 빈 결과)
+    index / index_files / rollback / summary_status 는 관리 요청: 서버는 별도 스레드에서 실행하고 (검색을 막지 않음)
+    클라이언트는 EMBEDDING_SERVICE_ADMIN_TIMEOUT 을 적용 (기본 무제한)
+    (corpus 생략 시 기본 코퍼스)
+    실패 시                                   -> {"ok": false, "error": "..."}
+"""
+import asyncio
+import logging
+import os
+import socket
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+from app.core.config import settings
+from app.utils.cache import LRUCache
+
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct(">I")
+# 인덱스 빌드 / 교체처럼 오래 걸릴 수 있는 요청
+ADMIN_OPS = frozenset({"index", "index_files", "rollback", "summary_status"})
+
+
+class EmbeddingServiceError(Exception):
+    """임베딩 서비스 요청 실패"""
+
+
+# ===== 클라이언트 (API 워커) =====
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            raise ConnectionError("embedding service closed the connection")
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+
+class EmbeddingServiceClient:
+    """
+    임베딩 서비스 동기 클라이언트.
+    LangChain 임베딩/리트리버 인터페이스가 동기이므로 스레드별 연결을 유지합니다.
+
+    Args:
+        timeout: embed / search 등 일반 요청의 소켓 타임아웃
+        admin_timeout: ADMIN_OPS 요청의 소켓 타임아웃 (None 이면 무제한 - 재인덱싱은 문서 수에 비례)
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 10.0, admin_timeout: Optional[float] = None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.admin_timeout = admin_timeout
+        self._local = threading.local()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+            self._local.sock = None
+
+    def request(self, payload: Dict[str, Any]) -> Any:
+        body = orjson.dumps(payload)
+        timeout = self.admin_timeout if payload.get("op") in ADMIN_OPS else self.timeout
+        # 서비스 재시작 등으로 끊긴 연결은 1회 재연결 후 재시도
+        for attempt in range(2):
+            sock = getattr(self._local, "sock", None) or self._connect()
+            try:
+                sock.settimeout(timeout)
+                sock.sendall(_HEADER.pack(len(body)) + body)
+                (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+                response = orjson.loads(_recv_exact(sock, size))
+                break
+            except (ConnectionError, BrokenPipeError):
+                self._close()
+                if attempt:
+                    raise
+            except OSError:
+                self._close()
+                raise
+        if not response.get("ok"):
+            raise EmbeddingServiceError(response.get("error", "unknown error"))
+        return response.get("result")
+
+
+class RemoteEmbeddings(Embeddings):
+    """임베딩 서비스 프로세스에 위임하는 LangChain Embeddings 구현"""
+
+    def __init__(self, client: EmbeddingServiceClient):
+        self.client = client
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.client.request({"op": "embed", "texts": texts})
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """질의 임베딩만 LRU로 캐시 (문서 임베딩은 인덱싱 시 1회뿐이므로 그대로 위임)"""
+
+    def __init__(self, base: Embeddings, cache: LRUCache):
+        self.base = base
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.cache.get(text)
+        if vector is None:
+            vector = self.base.embed_query(text)
+            self.cache.put(text, vector)
+        return vector
+
+
+class RemoteRetriever(BaseRetriever):
+    """임베딩 서비스가 소유한 인덱스를 검색하는 리트리버 (워커는 Chroma를 열지 않음)"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    client: EmbeddingServiceClient
+    k: int = 4
+    corpus: Optional[str] = None
+    where: Optional[Dict[str, Any]] = None
+    collection: Optional[str] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        results = self.client.request({
+            "op": "search", "query": query, "k": self.k, "corpus": self.corpus, "where": self.where,
+            "collection": self.collection
+        })
+        return [Document(page_content=r["page_content"], metadata=r.get("metadata") or {}) for r in results]
+
+
+_client: Optional[EmbeddingServiceClient] = None
+
+
+def get_service_client() -> Optional[EmbeddingServiceClient]:
+    """EMBEDDING_SERVICE_SOCKET 설정 시 프로세스 공용 클라이언트를 반환합니다 (미설정 시 None)."""
+    global _client
+    if not settings.EMBEDDING_SERVICE_SOCKET:
+        return None
+    if _client is None:
+        _client = EmbeddingServiceClient(
+            settings.EMBEDDING_SERVICE_SOCKET,
+            settings.EMBEDDING_SERVICE_TIMEOUT,
+            admin_timeout=settings.EMBEDDING_SERVICE_ADMIN_TIMEOUT or None
+        )
+    return _client
+
+
+def create_local_embeddings(backend: Optional[str] = None) -> Embeddings:
+    """
+    EMBEDDING_BACKEND 설정에 따라 프로세스 내 임베딩 모델을 생성합니다.
+
+    - "huggingface": sentence-transformers (PyTorch fp32)
+    - "onnx": onnxruntime CPU (EMBEDDING_ONNX_QUANTIZE=true 면 int8 동적 양자화)
+    """
+    backend = backend or settings.EMBEDDING_BACKEND
+    if backend == "onnx":
+        from app.services.onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings(
+            settings.EMBEDDING_ONNX_PATH,
+            quantize=settings.EMBEDDING_ONNX_QUANTIZE,
+            num_threads=settings.EMBEDDING_ONNX_THREADS
+        )
+    if backend != "huggingface":
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL)
+
+
+def create_embeddings() -> Embeddings:
+    """서비스 모드면 원격 임베딩, 아니면 프로세스 내 임베딩 모델을 반환합니다."""
+    client = get_service_client()
+    if client is not None:
+        return RemoteEmbeddings(client)
+    return create_local_embeddings()
+
+
+# ===== 서버 (전용 프로세스) =====
+
+class EmbeddingServer:
+    """
+    모델과 인덱스를 소유하는 임베딩 서버.
+
+    - 코퍼스별 인덱스는 CorpusRegistry 가 첫 검색 시 열고 메모리 예산에 따라 LRU 축출
+
+    - 여러 연결에서 들어온 embed/search 요청을 batch_wait_ms 동안 모아 한 번에 임베딩
+    - 모델 호출은 단일 스레드 executor에서 실행하여 이벤트 루프를 막지 않음
+    - 재인덱싱 / 롤백 등 ADMIN_OPS 는 별도 단일 스레드 executor에서 실행 (빌드하는 동안에도 검색은 기존 버전으로 계속)
+    """
+
+    def __init__(self, socket_path: str, registry, batch_size: int = 32, batch_wait_ms: int = 5):
+        self.socket_path = socket_path
+        self.registry = registry
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000
+        self._queue: "asyncio.Queue[Tuple[List[str], asyncio.Future]]" = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+        self._admin_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-admin")
+
+    async def _embed(self, texts: List[str]) -> List[List[float]]:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((texts, future))
+        return await future
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        embeddings = self.registry.default.embeddings
+        while True:
+            batch = [await self._queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.batch_wait
+            while size < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                vectors = await loop.run_in_executor(self._executor, embeddings.embed_documents, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for item_texts, future in batch:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+    def _search_vector(self, corpus: Optional[str], vector: List[float], k: int,
+                       where: Optional[Dict[str, Any]], collection: Optional[str]) -> List[Document]:
+        if collection not in (None, "summaries"):
+            raise ValueError(f"unknown collection: {collection}")
+        target = self.registry.open(corpus)
+        # 검색 도중 축출 / 리더 교체가 일어나도 인덱스는 검색이 끝난 뒤에 해제됨
+        with target.lease() as (version, store):
+            if collection == "summaries":
+                # 요약 배치가 끝나기 전이면 빈 결과 (호출 측이 청크 검색으로 대체)
+                store = target.summary_store(version)
+            if store is None:
+                return []
+            return store.similarity_search_by_vector(vector, k, filter=where)
+
+    async def _search(self, query: str, k: int, corpus: Optional[str],
+                      where: Optional[Dict[str, Any]] = None, collection: Optional[str] = None) -> List[Dict[str, Any]]:
+        vector = (await self._embed([query]))[0]
+        docs = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._search_vector, corpus, vector, k, where, collection
+        )
+        return [{"page_content": d.page_content, "metadata": d.metadata} for d in docs]
+
+    def _index(self, name: Optional[str], paths: Optional[List[str]] = None):
+        corpus = self.registry.get(name)
+        if paths is None:
+            corpus.load_and_index()
+        else:
+            corpus.index_files(paths)
+        self.registry.refresh(corpus.name)
+
+    async def _dispatch(self, request: Dict[str, Any]) -> Any:
+        op = request.get("op")
+        if op == "embed":
+            return await self._embed(request["texts"])
+        if op == "search":
+            return await self._search(request["query"], int(request.get("k", 4)), request.get("corpus"),
+                                      request.get("where"), request.get("collection"))
+        if op == "index":
+            corpus = request.get("corpus")
+            await asyncio.get_running_loop().run_in_executor(self._admin_executor, self._index, corpus)
+            return None
+        if op == "index_files":
+            await asyncio.get_running_loop().run_in_executor(
+                self._admin_executor, self._index, request.get("corpus"), list(request["paths"])
+            )
+            return None
+        if op == "rollback":
+            corpus = self.registry.get(request.get("corpus"))
+            return await asyncio.get_running_loop().run_in_executor(
+                self._admin_executor, corpus.rollback, request.get("version")
+            )
+        if op == "snapshots":
+            return self.registry.get(request.get("corpus")).snapshot_info()
+        if op == "summarize":
+            return self.registry.get(request.get("corpus")).build_summaries()
+        if op == "summary_status":
+            corpus = self.registry.get(request.get("corpus"))
+            return await asyncio.get_running_loop().run_in_executor(self._admin_executor, corpus.summary_status)
+        raise ValueError(f"unknown op: {op}")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+                (size,) = _HEADER.unpack(header)
+                request = orjson.loads(await reader.readexactly(size))
+                try:
+                    response = {"ok": True, "result": await self._dispatch(request)}
+                except Exception as e:
+                    logger.exception(f"임베딩 서비스 요청 처리 오류: {e}")
+                    response = {"ok": False, "error": str(e)}
+                body = orjson.dumps(response)
+                writer.write(_HEADER.pack(len(body)) + body)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        # 기본 코퍼스 인덱스를 미리 열어 첫 요청 지연을 없앰
+        self.registry.open()
+        batcher = asyncio.create_task(self._batch_loop())
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        logger.info(f"임베딩 서비스 시작: {self.socket_path}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self._executor.shutdown(wait=False)
+            self._admin_executor.shutdown(wait=False)
+
+
+def main():
+    from app.services.corpus_registry import CorpusRegistry
+    from app.services.rag_service import BlogRAGService
+
+    logging.basicConfig(level=logging.INFO)
+    if not settings.EMBEDDING_SERVICE_SOCKET:
+        raise SystemExit("EMBEDDING_SERVICE_SOCKET is not set")
+    socket_path = settings.EMBEDDING_SERVICE_SOCKET
+    # 서버 자신은 로컬 모델을 사용 (rag_service 싱글톤은 원격 모드라 모델을 로드하지 않음)
+    registry = CorpusRegistry(
+        default=BlogRAGService(embeddings=create_local_embeddings()),
+        corpora=settings.RAG_CORPORA,
+        memory_budget_mb=settings.RAG_CORPUS_MEMORY_MB
+    )
+    server = EmbeddingServer(
+        socket_path,
+        registry,
+        batch_size=settings.EMBEDDING_BATCH_SIZE,
+        batch_wait_ms=settings.EMBEDDING_BATCH_WAIT_MS
+    )
+    asyncio.run(server.serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,496 @@
+"""
+버전별 인덱스 스냅샷 (blue/green 교체).
+
+디렉터리 구조 (root = BlogRAGService.persist_directory):
+    <root>/CURRENT                    활성 버전 이름 (임시 파일 → os.replace 로 원자적 교체)
+    <root>/snapshots/<version>/       Chroma 디렉터리 + manifest.json
+    <root>/.build.lock                빌드 → 활성화를 프로세스 간에 하나씩 실행하기 위한 flock 파일
+    <root>/RETIRED                    활성에서 물러난 버전과 시각 (다른 워커가 아직 읽고 있을 수 있어 prune 에서 유예)
+
+- 새 인덱스는 항상 새 버전 디렉터리에 빌드하고, manifest.json(내용 체크섬 포함)을 마지막에 기록
+  → manifest 가 없는 디렉터리는 빌드 중이거나 중단된 것이므로 무시 / 정리
+- 외부(CLI/CI)에서 빌드된 버전은 활성화 전에 체크섬을 검증하고 CURRENT 포인터만 교체 (기존 버전은 keep 개 보관 → 즉시 롤백)
+- CURRENT 도 snapshots/ 도 없고 root 에 chroma.sqlite3 가 있으면 기존 단일 디렉터리 구조("legacy")로 읽음
+
+CLI (CI 에서 미리 빌드):
+    python -m app.services.index_snapshots build --data-dir data/blog_posts --root data/chroma_db [--activate]
+    python -m app.services.index_snapshots list|verify|activate|rollback --root data/chroma_db [--version V]
+"""
+import argparse
+import contextlib
+import fcntl
+import hashlib
+import json
+import logging
+import mmap
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_community.document_loaders import DirectoryLoader, TextLoader
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.core.config import settings
+from app.services.doc_metadata import document_metadata, heading_at, headings_index, parse_front_matter
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+LEGACY_VERSION = "legacy"
+BUILD_LOCK = ".build.lock"
+RETIRED = "RETIRED"
+
+
+class SnapshotError(Exception):
+    """스냅샷이 없거나 손상됨"""
+
+
+def load_posts(data_dir: str, paths: Optional[List[str]] = None) -> List[Document]:
+    """
+    마크다운 파일을 글 단위로 로드합니다 (paths 를 주면 그 파일들만).
+    front-matter 는 본문에서 제거하고 필터링용 메타데이터(post, tags, lang, date 등)로 저장합니다.
+    """
+    if paths is not None:
+        docs = [doc for path in paths for doc in TextLoader(path, encoding="utf-8").load()]
+    else:
+        if not os.path.exists(data_dir):
+            os.makedirs(data_dir)
+            # Create a dummy file if empty to avoid errors
+            with open(os.path.join(data_dir, "welcome.md"), "w", encoding="utf-8") as f:
+                f.write("# Welcome to the Blog\n\nThis is a sample blog post to initialize the RAG system.")
+
+        loader = DirectoryLoader(data_dir, glob="**/*.md", loader_cls=TextLoader, loader_kwargs={"encoding": "utf-8"})
+        docs = loader.load()
+    for doc in docs:
+        front, body = parse_front_matter(doc.page_content)
+        doc.page_content = body
+        doc.metadata = document_metadata(doc.metadata["source"], data_dir, front, body)
+    return docs
+
+
+def load_chunks(data_dir: str, paths: Optional[List[str]] = None) -> List[Document]:
+    """
+    글을 청크로 분할합니다 (1000자씩, 200자 겹침).
+    각 청크에는 문서 메타데이터, 청크가 속한 섹션 제목(heading), 글 안에서의 순번(chunk_index)이 붙습니다.
+    """
+    docs = load_posts(data_dir, paths)
+    if not docs:
+        return []
+    headings = {doc.metadata["source"]: headings_index(doc.page_content) for doc in docs}
+
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, add_start_index=True)
+    splits = text_splitter.split_documents(docs)
+    counters: Counter = Counter()
+    for chunk in splits:
+        source = chunk.metadata["source"]
+        heading = heading_at(headings[source], chunk.metadata.get("start_index", 0))
+        if heading:
+            chunk.metadata["heading"] = heading
+        chunk.metadata["chunk_index"] = counters[source]
+        counters[source] += 1
+    return splits
+
+
+def hnsw_metadata() -> Dict[str, Any]:
+    """컬렉션 생성 시 적용되는 HNSW 파라미터 (변경하려면 재인덱싱 필요)"""
+    return {
+        "hnsw:space": "l2",
+        "hnsw:M": settings.RAG_HNSW_M,
+        "hnsw:construction_ef": settings.RAG_HNSW_CONSTRUCTION_EF,
+        "hnsw:search_ef": settings.RAG_HNSW_SEARCH_EF,
+    }
+
+
+def _snapshot_files(path: str) -> List[str]:
+    files = []
+    for root, dirs, names in os.walk(path):
+        if os.path.abspath(root) == os.path.abspath(path):
+            # legacy 구조에서는 root 아래 snapshots/ 가 있을 수 있음
+            dirs[:] = [d for d in dirs if d != "snapshots"]
+        for name in names:
+            if name != MANIFEST:
+                files.append(os.path.join(root, name))
+    return files
+
+
+def content_checksum(vector_store) -> str:
+    """
+    스냅샷 내용(id, 문서, 메타데이터, 임베딩)의 sha256.
+    SQLite 파일은 열기만 해도 WAL 체크포인트 등으로 바이트가 바뀔 수 있으므로 파일이 아닌 내용 기준으로 계산합니다.
+    """
+    import numpy as np
+
+    data = vector_store.get(include=["documents", "metadatas", "embeddings"])
+    rows = sorted(zip(data["ids"], data["documents"], data["metadatas"], data["embeddings"]), key=lambda row: row[0])
+    digest = hashlib.sha256()
+    for doc_id, document, metadata, embedding in rows:
+        digest.update(doc_id.encode("utf-8") + b"\0")
+        digest.update((document or "").encode("utf-8") + b"\0")
+        digest.update(json.dumps(metadata or {}, sort_keys=True, ensure_ascii=False).encode("utf-8") + b"\0")
+        digest.update(np.asarray(embedding, dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+def prefault(path: str):
+    """
+    스냅샷 파일을 mmap + MADV_WILLNEED 로 페이지 캐시에 미리 올립니다.
+    Chroma(HNSW) 로더는 자체적으로 파일을 읽으므로, 읽기 전에 페이지 캐시를 채워 두면 워커들이
+    같은 페이지를 공유하며 디스크 대기 없이 인덱스를 엽니다.
+    """
+    for full in _snapshot_files(path):
+        if os.path.getsize(full) == 0:
+            continue
+        with open(full, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+                mapped.madvise(mmap.MADV_WILLNEED)
+
+
+def release_store(vector_store):
+    """
+    Chroma 스토어가 쓰던 인덱스 메모리를 해제합니다.
+    chromadb 는 persist 경로별 System 을 클래스 수준 캐시(SharedSystemClient)에 보관하므로 스토어 참조를
+    버려도 인덱스가 메모리에 남습니다 → 캐시에서 꺼내 정지. 같은 경로를 여는 다른 Chroma 객체도 함께 닫히므로
+    그 경로를 더 이상 읽지 않을 때만 호출합니다.
+    """
+    from chromadb.api.shared_system_client import SharedSystemClient
+
+    identifier = getattr(getattr(vector_store, "_client", None), "_identifier", None)
+    if identifier is None:
+        return
+    system = SharedSystemClient._identifier_to_system.pop(identifier, None)
+    if system is not None:
+        system.stop()
+
+
+class SnapshotStore:
+    def __init__(self, root: str, keep: int = 3, grace_s: float = 60.0):
+        """
+        Args:
+            keep: 활성 버전 외에 보관할 최근 버전 수
+            grace_s: 활성에서 물러난 버전을 keep 과 관계없이 남겨 두는 시간 (직전 활성 버전은 항상 보관)
+        """
+        self.root = root
+        self.keep = keep
+        self.grace_s = grace_s
+        self.snapshots_dir = os.path.join(root, "snapshots")
+        self.pointer = os.path.join(root, "CURRENT")
+        self.retired_log = os.path.join(root, RETIRED)
+        self._build_guard = threading.RLock()
+        self._build_depth = 0
+        self._build_file = None
+
+    @contextlib.contextmanager
+    def build_lock(self):
+        """
+        기준 버전 선택 → 빌드 → 활성화를 워커 / CLI 프로세스 간에 하나씩 실행합니다 (<root>/.build.lock flock).
+        증분 빌드는 잠금을 잡은 뒤의 current() 를 기준으로 하므로 다른 프로세스가 방금 활성화한 버전을 덮어쓰지 않습니다.
+        같은 스레드에서 다시 들어오면 그대로 통과합니다 (index_files → load_and_index).
+        """
+        with self._build_guard:
+            if self._build_depth == 0:
+                os.makedirs(self.root, exist_ok=True)
+                self._build_file = open(os.path.join(self.root, BUILD_LOCK), "a")
+                fcntl.flock(self._build_file.fileno(), fcntl.LOCK_EX)
+            self._build_depth += 1
+            try:
+                yield
+            finally:
+                self._build_depth -= 1
+                if self._build_depth == 0:
+                    fcntl.flock(self._build_file.fileno(), fcntl.LOCK_UN)
+                    self._build_file.close()
+                    self._build_file = None
+
+    def path(self, version: str) -> str:
+        if version == LEGACY_VERSION:
+            return self.root
+        return os.path.join(self.snapshots_dir, version)
+
+    def manifest(self, version: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.path(version), MANIFEST), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def versions(self) -> List[str]:
+        """완성된(manifest 가 있는) 버전 목록, 오래된 순"""
+        if not os.path.isdir(self.snapshots_dir):
+            return []
+        names = [n for n in os.listdir(self.snapshots_dir) if os.path.exists(os.path.join(self.snapshots_dir, n, MANIFEST))]
+        return sorted(names)
+
+    def current(self) -> Optional[str]:
+        try:
+            with open(self.pointer, "r", encoding="utf-8") as f:
+                version = f.read().strip()
+            return version or None
+        except FileNotFoundError:
+            if os.path.exists(os.path.join(self.root, "chroma.sqlite3")):
+                return LEGACY_VERSION
+            return None
+
+    def pointer_mtime(self) -> float:
+        try:
+            return os.stat(self.pointer).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _new_version() -> str:
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+    @staticmethod
+    def _write_manifest(path: str, manifest: Dict[str, Any]):
+        tmp = os.path.join(path, MANIFEST + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(path, MANIFEST))
+
+    def build(self, data_dir: str, embeddings: Embeddings, embedding_model: str = ""):
+        """
+        새 버전 디렉터리에 인덱스를 빌드하고 manifest 를 기록합니다 (활성화는 하지 않음).
+
+        Returns:
+            (version, vector_store) - 빌드에 사용한 Chroma 객체는 그대로 새 리더로 사용할 수 있음
+            문서가 없으면 (None, None)
+        """
+        from langchain_chroma import Chroma
+
+        splits = load_chunks(data_dir)
+        if not splits:
+            return None, None
+
+        version = self._new_version()
+        path = self.path(version)
+        os.makedirs(path)
+        started = time.perf_counter()
+        hnsw = hnsw_metadata()
+        vector_store = Chroma.from_documents(
+            documents=splits, embedding=embeddings, persist_directory=path, collection_metadata=hnsw
+        )
+        self._write_manifest(path, {
+            "version": version,
+            "created_at": time.time(),
+            "build_seconds": round(time.perf_counter() - started, 2),
+            "data_dir": data_dir,
+            "source_files": len({d.metadata.get("source") for d in splits}),
+            "chunks": len(splits),
+            "embedding_model": embedding_model,
+            "hnsw": hnsw,
+            "checksum": content_checksum(vector_store),
+        })
+        logger.info(f"인덱스 스냅샷 빌드 완료: {version} ({len(splits)} chunks)")
+        return version, vector_store
+
+    def build_incremental(self, base: str, data_dir: str, paths: List[str], embeddings: Embeddings,
+                          embedding_model: str = "", exclude: Tuple[str, ...] = ()):
+        """
+        기준 버전을 복사한 새 버전에서 paths 파일의 청크만 교체 / 추가합니다 (활성화는 하지 않음).
+        나머지 문서는 다시 임베딩하지 않으므로 비용이 업로드한 문서 수에만 비례합니다.
+
+        Args:
+            paths: 인덱스의 source 와 같은 형식의 경로 (data_dir 기준 Path 결합)
+            exclude: 복사하지 않을 파일 이름 (기준 버전에만 유효한 마커 등)
+        """
+        from langchain_chroma import Chroma
+
+        base_manifest = self.manifest(base)
+        if base_manifest is None and base != LEGACY_VERSION:
+            raise SnapshotError(f"snapshot not found or incomplete: {base}")
+        base_path = self.path(base)
+        skipped = {MANIFEST, *exclude}
+
+        def ignore(directory: str, names: List[str]) -> List[str]:
+            ignored = [name for name in names if name in skipped or name.endswith(".tmp")]
+            if os.path.abspath(directory) == os.path.abspath(base_path):
+                # legacy 구조에서는 root 아래 snapshots/ 와 CURRENT 가 함께 있음
+                ignored += [name for name in names if name in ("snapshots", "CURRENT", RETIRED, BUILD_LOCK)]
+            return ignored
+
+        version = self._new_version()
+        path = self.path(version)
+        started = time.perf_counter()
+        shutil.copytree(base_path, path, ignore=ignore)
+        hnsw = (base_manifest or {}).get("hnsw") or hnsw_metadata()
+        vector_store = Chroma(persist_directory=path, embedding_function=embeddings, collection_metadata=hnsw)
+
+        stale = vector_store.get(where={"source": {"$in": list(paths)}}, include=["metadatas"])
+        if stale["ids"]:
+            vector_store.delete(ids=stale["ids"])
+        replaced = {metadata.get("source") for metadata in stale["metadatas"]}
+        splits = load_chunks(data_dir, paths)
+        if splits:
+            vector_store.add_documents(splits)
+
+        chunks = len(vector_store.get(include=[])["ids"])
+        added = {d.metadata.get("source") for d in splits} - replaced
+        self._write_manifest(path, {
+            "version": version,
+            "created_at": time.time(),
+            "build_seconds": round(time.perf_counter() - started, 2),
+            "data_dir": data_dir,
+            "base_version": base,
+            "updated_files": len(paths),
+            "source_files": (base_manifest or {}).get("source_files", 0) + len(added),
+            "chunks": chunks,
+            "embedding_model": embedding_model,
+            "hnsw": hnsw,
+            "checksum": content_checksum(vector_store),
+        })
+        logger.info(f"증분 인덱스 스냅샷 빌드 완료: {version} (base={base}, {len(paths)} files, {len(splits)} chunks)")
+        return version, vector_store
+
+    def verify(self, version: str) -> Dict[str, Any]:
+        from langchain_chroma import Chroma
+
+        manifest = self.manifest(version)
+        if manifest is None:
+            raise SnapshotError(f"snapshot not found or incomplete: {version}")
+        actual = content_checksum(Chroma(persist_directory=self.path(version)))
+        if actual != manifest.get("checksum"):
+            raise SnapshotError(f"checksum mismatch for {version}: expected {manifest.get('checksum')}, got {actual}")
+        return manifest
+
+    def activate(self, version: str, verify: bool = True):
+        """CURRENT 포인터를 원자적으로 교체합니다 (다른 워커는 포인터 변경을 감지해 새 버전으로 전환)."""
+        if verify:
+            self.verify(version)
+        elif self.manifest(version) is None:
+            raise SnapshotError(f"snapshot not found or incomplete: {version}")
+        os.makedirs(self.root, exist_ok=True)
+        outgoing = self.current()
+        if outgoing is not None and outgoing != version:
+            # 포인터를 바꾸기 전에 기록 (그 사이 다른 프로세스의 prune 이 물러나는 버전을 지우지 않도록)
+            self._record_retired(outgoing)
+        tmp = f"{self.pointer}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.pointer)
+        logger.info(f"인덱스 스냅샷 활성화: {version}")
+
+    def retired(self) -> Dict[str, float]:
+        """활성에서 물러난 버전 → 물러난 시각"""
+        try:
+            with open(self.retired_log, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _record_retired(self, version: str):
+        now = time.time()
+        retired = {**self.retired(), version: now}
+        # 직전 활성 버전과 유예 기간 안의 기록만 유지
+        retired = {v: at for v, at in retired.items() if v == version or now - at < self.grace_s}
+        tmp = f"{self.retired_log}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(retired, f)
+        os.replace(tmp, self.retired_log)
+
+    def _in_use(self) -> set:
+        """
+        다른 워커가 아직 열고 있을 수 있는 버전: 직전 활성 버전 + grace_s 안에 물러난 버전
+        (워커는 INDEX_SNAPSHOT_CHECK_INTERVAL_S 마다 포인터를 확인하고, 새 버전을 연 뒤에야 이전 버전을 놓음)
+        """
+        retired = self.retired()
+        if not retired:
+            return set()
+        now = time.time()
+        previous = max(retired, key=retired.get)
+        return {v for v, at in retired.items() if v == previous or now - at < self.grace_s}
+
+    def previous(self) -> Optional[str]:
+        """현재 버전 직전의 완성된 버전 (롤백 대상)"""
+        versions = self.versions()
+        current = self.current()
+        if current in versions:
+            index = versions.index(current)
+            return versions[index - 1] if index > 0 else None
+        return versions[-1] if versions else None
+
+    def prune(self):
+        """
+        현재 버전 + 최근 keep 개 + 다른 워커가 아직 읽고 있을 수 있는 버전(_in_use)을 남기고 삭제
+        (manifest 없는 중단된 빌드 포함)
+        """
+        if not os.path.isdir(self.snapshots_dir):
+            return []
+        current = self.current()
+        complete = [v for v in self.versions() if v != current]
+        retained = set(complete[-self.keep:]) if self.keep > 0 else set()
+        retained |= self._in_use()
+        removed = []
+        newest = max(self.versions(), default="")
+        for name in os.listdir(self.snapshots_dir):
+            if name == current or name in retained:
+                continue
+            # manifest 없는 디렉터리 중 가장 최근 것보다 새 것은 다른 프로세스가 빌드 중일 수 있음
+            if name not in complete and name > newest:
+                continue
+            shutil.rmtree(os.path.join(self.snapshots_dir, name), ignore_errors=True)
+            removed.append(name)
+        return removed
+
+    def describe(self) -> Dict[str, Any]:
+        current = self.current()
+        return {
+            "current": current,
+            "versions": [
+                {**(self.manifest(v) or {"version": v}), "active": v == current} for v in self.versions()
+            ],
+        }
+
+
+def main():
+    from app.services.embedding_service import create_local_embeddings
+
+    parser = argparse.ArgumentParser(description="Build / manage versioned index snapshots")
+    parser.add_argument("command", choices=["build", "list", "verify", "activate", "rollback", "prune"])
+    parser.add_argument("--root", default="backend/data/chroma_db", help="index root (persist_directory)")
+    parser.add_argument("--data-dir", default="backend/data/blog_posts")
+    parser.add_argument("--version", default=None)
+    parser.add_argument("--activate", action="store_true", help="activate after build")
+    parser.add_argument("--keep", type=int, default=settings.INDEX_SNAPSHOT_KEEP)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    store = SnapshotStore(args.root, keep=args.keep, grace_s=settings.INDEX_SNAPSHOT_PRUNE_GRACE_S)
+    if args.command == "build":
+        # --activate 이면 빌드 중 워커의 증분 활성화가 끼어들어 덮어쓰이지 않도록 잠금 안에서 빌드
+        with store.build_lock() if args.activate else contextlib.nullcontext():
+            version, _ = store.build(args.data_dir, create_local_embeddings(), settings.EMBEDDING_MODEL)
+            if version is None:
+                raise SystemExit("no documents found")
+            if args.activate:
+                store.activate(version, verify=False)
+                store.prune()
+        print(version)
+    elif args.command == "list":
+        print(json.dumps(store.describe(), ensure_ascii=False, indent=2))
+    elif args.command == "verify":
+        print(json.dumps(store.verify(args.version or store.current()), ensure_ascii=False, indent=2))
+    elif args.command == "activate":
+        store.activate(args.version)
+    elif args.command == "rollback":
+        version = args.version or store.previous()
+        if version is None:
+            raise SystemExit("no previous snapshot")
+        store.activate(version)
+        print(version)
+    elif args.command == "prune":
+        print("\n".join(store.prune()))
+
+
+if __name__ == "__main__":
+    main()
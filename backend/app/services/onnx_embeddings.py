@@ -0,0 +1,163 @@
+"""
+ONNX Runtime 기반 CPU 임베딩 백엔드 (선택적 int8 동적 양자화).
+
+sentence-transformers/all-MiniLM-L6-v2 와 같은 Transformer + mean pooling + normalize 구성을
+torch 없이 onnxruntime 으로 실행합니다. 모델 디렉터리 구성:
+    <path>/model.onnx        fp32 모델
+    <path>/model_int8.onnx   int8 동적 양자화 모델 (quantize=True, 내보낼 때 --quantize 로 생성 권장, 없으면 최초 로드 시 생성)
+    <path>/tokenizer.json    HuggingFace tokenizers 파일
+
+모델 디렉터리 생성 (torch/transformers 가 설치된 환경에서 1회):
+    python -m app.services.onnx_embeddings --model sentence-transformers/all-MiniLM-L6-v2 --out models/minilm-onnx --quantize
+"""
+import argparse
+import fcntl
+import logging
+import os
+import tempfile
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+logger = logging.getLogger(__name__)
+
+FP32_MODEL_FILE = "model.onnx"
+INT8_MODEL_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+QUANTIZE_LOCK_FILE = ".quantize.lock"
+
+
+def quantize_model(model_dir: str) -> str:
+    """
+    fp32 ONNX 모델을 int8 동적 양자화하여 저장하고 경로를 반환합니다.
+
+    여러 워커가 동시에 처음 로드해도 한 프로세스만 양자화합니다:
+    - <model_dir>/.quantize.lock 을 flock 으로 잡고, 잡은 뒤 이미 만들어졌으면 그대로 사용
+      (quantize_dynamic 이 원본 옆에 model-inferred.onnx 중간 파일을 쓰므로 동시에 실행하면 서로 깨뜨림)
+    - 결과는 같은 디렉터리의 임시 파일에 쓴 뒤 os.replace 로 교체 (쓰다 만 파일을 읽지 않음)
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    source = os.path.join(model_dir, FP32_MODEL_FILE)
+    target = os.path.join(model_dir, INT8_MODEL_FILE)
+    with open(os.path.join(model_dir, QUANTIZE_LOCK_FILE), "a") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            if os.path.exists(target):
+                return target
+            fd, tmp = tempfile.mkstemp(dir=model_dir, prefix=".quantize-", suffix=".onnx")
+            os.close(fd)
+            try:
+                quantize_dynamic(source, tmp, weight_type=QuantType.QInt8)
+                os.replace(tmp, target)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+    logger.info(f"int8 동적 양자화 모델 생성: {target}")
+    return target
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    onnxruntime CPU 임베딩 (mean pooling + L2 normalize, sentence-transformers 출력과 동일한 형태).
+
+    Args:
+        model_dir: model.onnx / tokenizer.json 이 있는 로컬 디렉터리
+        quantize: True 면 int8 동적 양자화 모델 사용
+        max_length: 토큰 최대 길이 (all-MiniLM-L6-v2 기본 256)
+        batch_size: 한 번의 추론에 넣을 문장 수
+        num_threads: onnxruntime intra-op 스레드 수 (0 이면 onnxruntime 기본값)
+    """
+
+    def __init__(self, model_dir: str, quantize: bool = False, max_length: int = 256,
+                 batch_size: int = 32, num_threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(model_dir, INT8_MODEL_FILE if quantize else FP32_MODEL_FILE)
+        if quantize and not os.path.exists(model_path):
+            model_path = quantize_model(model_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+        self.batch_size = batch_size
+        logger.info(f"ONNX 임베딩 모델 로드: {model_path}")
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        last_hidden_state = self.session.run(None, feeds)[0]
+        # mean pooling (padding 토큰 제외) 후 L2 정규화
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (last_hidden_state * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._encode(texts[start:start + self.batch_size]).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
+
+
+def export_model(model_name: str, output_dir: str, quantize: bool = False, opset: int = 17):
+    """HuggingFace 모델을 ONNX 로 내보냅니다 (torch / transformers 필요, 배포 환경에서는 불필요)."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            os.path.join(output_dir, FP32_MODEL_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset
+        )
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, TOKENIZER_FILE))
+    if quantize:
+        quantize_model(output_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a sentence-transformers model to ONNX")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--quantize", action="store_true", help="also write an int8 dynamically quantized model")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    export_model(args.model, args.out, quantize=args.quantize)
+
+
+if __name__ == "__main__":
+    main()
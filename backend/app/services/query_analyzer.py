@@ -0,0 +1,506 @@
+import asyncio
+import hashlib
+import logging
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.sql_engine import (
+    QueryDeadline,
+    SQLExecutionUnsupported,
+    _authorizer,
+    create_connection,
+    limit_database_size,
+    expand_inline_indexes,
+    extract_setup_statements,
+    split_statements,
+    translate_mysql,
+)
+from app.utils.cache import LRUCache
+
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN)\s+\"?(\w+)\"?(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|LEFT\b|RIGHT\b|INNER\b|CROSS\b|GROUP\b|ORDER\b|LIMIT\b|USING\b)(\w+))?", re.IGNORECASE)
+_CLAUSE_END = r"(?=\b(?:WHERE|GROUP\s+BY|ORDER\s+BY|HAVING|LIMIT|LEFT|RIGHT|INNER|CROSS|JOIN|UNION)\b|$)"
+_WHERE_CLAUSE = re.compile(r"\bWHERE\b(.*?)(?=\b(?:GROUP\s+BY|ORDER\s+BY|HAVING|LIMIT|UNION)\b|$)", re.IGNORECASE | re.DOTALL)
+_ON_CLAUSE = re.compile(r"\bON\b(.*?)" + _CLAUSE_END, re.IGNORECASE | re.DOTALL)
+_PREDICATE = re.compile(r"(?:\"?(\w+)\"?\.)?\"?(\w+)\"?\s*(=|<>|!=|<=|>=|<|>|\bIN\b|\bLIKE\b|\bBETWEEN\b|\bIS\b)", re.IGNORECASE)
+_WRAPPED_COLUMN = re.compile(r"\b(\w+)\s*\(\s*(?:\"?(\w+)\"?\.)?\"?(\w+)\"?\s*\)\s*(?:=|<>|!=|<=|>=|<|>|\bIN\b|\bLIKE\b|\bBETWEEN\b)", re.IGNORECASE)
+_LEADING_WILDCARD = re.compile(r"(?:\"?(\w+)\"?\.)?\"?(\w+)\"?\s+LIKE\s+'%", re.IGNORECASE)
+_EQ_LITERAL = re.compile(r"(?:\"?(\w+)\"?\.)?\"?(\w+)\"?\s*=\s*('(?:[^']|'')*'|-?\d+(?:\.\d+)?)(?!\w)")
+_IN_LIST = re.compile(r"(?:\"?(\w+)\"?\.)?\"?(\w+)\"?\s+IN\s*\(((?:\s*(?:'(?:[^']|'')*'|-?\d+(?:\.\d+)?)\s*,?)+)\)", re.IGNORECASE)
+_LITERAL = re.compile(r"'((?:[^']|'')*)'|(-?\d+(?:\.\d+)?)")
+_LOW_CARDINALITY = {"status", "role", "type", "state", "category", "gender", "level", "kind", "is_active", "is_deleted"}
+# 쿼리 리터럴로 채우는 행 간격 (1%: 결과가 비지 않으면서 인덱스 선택도는 유지)
+_SEED_EVERY = 100
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal_value(token: str) -> Any:
+    """translate_mysql 을 거친 SQL 리터럴 토큰 → 파이썬 값 (바인딩용)"""
+    if token.startswith("'"):
+        return token[1:-1].replace("''", "'")
+    return float(token) if "." in token else int(token)
+
+
+def plan_complexity(plan: List[str]) -> str:
+    """
+    EXPLAIN QUERY PLAN 으로 본 시간 복잡도 (n: 테이블 행 수).
+    SCAN(풀 스캔 / 인덱스 전체 순회)은 O(n), 중첩 SCAN 은 O(n^k), SEARCH(인덱스 / PK 탐색)만 있으면 O(log n),
+    SCAN 결과를 정렬하거나 자동 인덱스를 만들면 O(n log n).
+    """
+    scans = sum(1 for detail in plan if re.match(r"SCAN (?!CONSTANT ROW)", detail))
+    searches = any(re.match(r"SEARCH \S+ USING (?!AUTOMATIC)", detail) for detail in plan)
+    sorts = any("TEMP B-TREE" in detail or "AUTOMATIC" in detail for detail in plan)
+    if scans > 1:
+        return f"O(n^{scans})"
+    if scans == 1:
+        return "O(n log n)" if sorts else "O(n)"
+    return "O(log n)" if searches else "O(1)"
+
+
+def _scale_label(rows: int) -> str:
+    if rows >= 1_000_000 and rows % 1_000_000 == 0:
+        return f"{rows // 1_000_000}m"
+    if rows >= 1000 and rows % 1000 == 0:
+        return f"{rows // 1000}k"
+    return str(rows)
+
+
+def _column_expression(name: str, col_type: str, rows: int, unique: bool, pk: bool) -> str:
+    """합성 데이터 생성을 위한 컬럼별 SQL 식 (재귀 CTE의 n 기준, 결정적, 컬럼 이름은 문자열 리터럴로 이스케이프)"""
+    col_type = (col_type or "").upper()
+    lowered = name.lower()
+    if pk or unique and "INT" in col_type:
+        return "n"
+    if lowered.endswith("_id"):
+        return f"((n * 7919) % {rows}) + 1"
+    if "INT" in col_type and ("(1)" in col_type or "BOOL" in col_type or lowered.startswith("is_")):
+        return "n % 2"
+    if "BOOL" in col_type:
+        return "n % 2"
+    if "DATE" in col_type or "TIME" in col_type:
+        return "datetime('2020-01-01', '+' || (n % 1825) || ' days', '+' || (n % 86400) || ' seconds')"
+    if any(t in col_type for t in ("INT", "DEC", "NUM", "REAL", "FLOA", "DOUB")):
+        return "(n * 31) % 10000"
+    prefix = "'" + lowered.replace("'", "''") + "_'"
+    if unique:
+        return f"{prefix} || n"
+    cardinality = 5 if lowered in _LOW_CARDINALITY else max(1, rows // 10)
+    return f"{prefix} || (n % {cardinality})"
+
+
+def _seeded_expression(expression: str, literals: List[Any], params: List[Any]) -> str:
+    """_SEED_EVERY 행마다 쿼리 리터럴을 돌아가며 넣는 식 (값은 params 로 바인딩)"""
+    cases = " ".join(f"WHEN {i} THEN ?" for i in range(len(literals)))
+    params.extend(literals)
+    return (
+        f"CASE WHEN n % {_SEED_EVERY} = 0 THEN CASE (n / {_SEED_EVERY}) % {len(literals)} {cases} END "
+        f"ELSE {expression} END"
+    )
+
+
+class QueryPlanAnalyzer:
+    """
+    /tools/sql/optimize 용 결정적 사전 분석기.
+
+    context의 스키마를 SQLite에 올리고 규모별 합성 데이터를 생성한 뒤,
+    EXPLAIN QUERY PLAN 과 실측 실행 시간으로 full scan / 누락 인덱스를 찾습니다.
+    누락 인덱스만으로 설명되는 경우 인덱스 적용 전후 시간을 근거로 LLM 없이 답변을 만듭니다.
+    """
+
+    def __init__(self, scales: List[int], timeout_ms: int = 3000, max_workers: int = 2, min_speedup: float = 1.5,
+                 cache_size: int = 128, max_db_bytes: int = 256 * 1024 * 1024):
+        self.scales = sorted(scales)
+        self.timeout_ms = timeout_ms
+        self.max_db_bytes = max_db_bytes
+        self.min_speedup = min_speedup
+        # 분석 결과는 (query, context)에 대해 결정적이므로 재사용
+        self.cache = LRUCache(cache_size)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sql-analyzer")
+
+    @property
+    def data_scale(self) -> str:
+        return ",".join(_scale_label(rows) for rows in self.scales)
+
+    # ===== 스키마 / 합성 데이터 =====
+    def _build_schema(self, context: str, deadline: QueryDeadline) -> Tuple[sqlite3.Connection, List[str]]:
+        """
+        context 의 CREATE 문으로 스키마를 만듭니다.
+        분석 전체(스키마 → 합성 데이터 → 측정)에 DB 크기 상한과 deadline progress handler 를 걸고,
+        context 문장은 authorizer 아래에서 실행합니다 (내부 PRAGMA 조회를 위해 적용 후 해제).
+        """
+        conn = create_connection()
+        limit_database_size(conn, self.max_db_bytes)
+        conn.set_progress_handler(deadline, 1000)
+        conn.set_authorizer(_authorizer)
+        tables = []
+        for statement in extract_setup_statements(context):
+            if not re.match(r"^\s*CREATE\b", statement, re.IGNORECASE):
+                continue
+            for sql in [translate_mysql(statement)] + expand_inline_indexes(statement):
+                try:
+                    conn.execute(sql)
+                except sqlite3.Error as e:
+                    logger.debug(f"스키마 문장 적용 실패, 건너뜀: {e} | {sql[:80]}")
+                if deadline.timed_out:
+                    conn.close()
+                    raise SQLExecutionUnsupported(f"context setup exceeded the {self.timeout_ms}ms analysis limit")
+        conn.set_authorizer(None)
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"):
+            tables.append(name)
+        if not tables:
+            conn.close()
+            raise SQLExecutionUnsupported("context에서 테이블 정의(CREATE TABLE)를 찾을 수 없습니다")
+        return conn, tables
+
+    def _columns(self, conn: sqlite3.Connection, table: str) -> List[Tuple[str, str, bool]]:
+        return [(row[1], row[2], bool(row[5])) for row in conn.execute(f"PRAGMA table_info({quote_identifier(table)})")]
+
+    def _unique_columns(self, conn: sqlite3.Connection, table: str) -> set:
+        unique = set()
+        for index in conn.execute(f"PRAGMA index_list({quote_identifier(table)})"):
+            if index[2]:
+                columns = [row[2] for row in conn.execute(f"PRAGMA index_info({quote_identifier(index[1])})")]
+                if len(columns) == 1:
+                    unique.add(columns[0])
+        return unique
+
+    def _populate(self, conn: sqlite3.Connection, tables: List[str], rows: int,
+                  literals: Optional[Dict[str, Dict[str, List[Any]]]] = None):
+        """
+        테이블마다 rows 행의 합성 데이터를 넣습니다.
+        쿼리가 = / IN 으로 비교하는 리터럴은 일부 행에 그대로 넣어 실제로 일치하는 행이 있게 합니다
+        (PK / 유니크 정수 컬럼은 n 이 이미 값 범위를 덮으므로 제외).
+        """
+        for table in tables:
+            columns = self._columns(conn, table)
+            unique = self._unique_columns(conn, table)
+            seeds = (literals or {}).get(table, {})
+            names = ", ".join(quote_identifier(name) for name, _, _ in columns)
+            exprs, params = [], []
+            for name, col_type, pk in columns:
+                expression = _column_expression(name, col_type, rows, name in unique, pk)
+                if seeds.get(name.lower()) and expression != "n":
+                    expression = _seeded_expression(expression, seeds[name.lower()], params)
+                exprs.append(expression)
+            conn.execute(
+                f"WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {rows}) "
+                f"INSERT OR IGNORE INTO {quote_identifier(table)} ({names}) SELECT {', '.join(exprs)} FROM seq",
+                params
+            )
+        conn.commit()
+        conn.execute("ANALYZE")
+
+    # ===== 쿼리 파싱 =====
+    def _aliases(self, query: str, tables: List[str]) -> Dict[str, str]:
+        known = {t.lower(): t for t in tables}
+        aliases = {}
+        for table, alias in _TABLE_REF.findall(query):
+            if table.lower() in known:
+                aliases[table.lower()] = known[table.lower()]
+                if alias:
+                    aliases[alias.lower()] = known[table.lower()]
+        return aliases
+
+    def _resolve(self, qualifier: str, column: str, aliases: Dict[str, str], table_columns: Dict[str, set]) -> Optional[str]:
+        if qualifier:
+            table = aliases.get(qualifier.lower())
+            return table if table and column.lower() in table_columns[table] else None
+        candidates = {t for t in aliases.values() if column.lower() in table_columns[t]}
+        return candidates.pop() if len(candidates) == 1 else None
+
+    def _literals(self, query: str, aliases: Dict[str, str],
+                  table_columns: Dict[str, set]) -> Dict[str, Dict[str, List[Any]]]:
+        """= / IN 으로 비교하는 리터럴: {table: {column(소문자): [값, ...]}}"""
+        result: Dict[str, Dict[str, List[Any]]] = {}
+
+        def add(qualifier, column, tokens):
+            table = self._resolve(qualifier, column, aliases, table_columns)
+            if not table:
+                return
+            values = result.setdefault(table, {}).setdefault(column.lower(), [])
+            for token in tokens:
+                value = _literal_value(token)
+                if value not in values:
+                    values.append(value)
+
+        for clause in _WHERE_CLAUSE.findall(query) + _ON_CLAUSE.findall(query):
+            for qualifier, column, token in _EQ_LITERAL.findall(clause):
+                add(qualifier, column, [token])
+            for qualifier, column, items in _IN_LIST.findall(clause):
+                add(qualifier, column, [m.group(0) for m in _LITERAL.finditer(items)])
+        return result
+
+    def _predicates(self, query: str, aliases: Dict[str, str], table_columns: Dict[str, set]) -> Dict[str, Dict[str, List[str]]]:
+        """
+        테이블별 인덱스 후보 컬럼을 반환합니다: {table: {"eq": [...], "range": [...], "blocked": [...]}}
+        함수로 감싼 컬럼이나 선행 와일드카드 LIKE는 인덱스를 쓸 수 없으므로 blocked로 분류합니다.
+        """
+        stripped = _STRING_LITERAL.sub("'?'", query)
+        result: Dict[str, Dict[str, List[str]]] = {}
+
+        def add(table, column, kind):
+            bucket = result.setdefault(table, {"eq": [], "range": [], "blocked": []})
+            if column not in bucket[kind] and not (kind != "blocked" and column in bucket["blocked"]):
+                bucket[kind].append(column)
+
+        blocked_text = " ".join(_WHERE_CLAUSE.findall(query))
+        for _, qualifier, column in _WRAPPED_COLUMN.findall(blocked_text):
+            table = self._resolve(qualifier, column, aliases, table_columns)
+            if table:
+                add(table, column, "blocked")
+        for qualifier, column in _LEADING_WILDCARD.findall(blocked_text):
+            table = self._resolve(qualifier, column, aliases, table_columns)
+            if table:
+                add(table, column, "blocked")
+
+        clauses = _WHERE_CLAUSE.findall(stripped) + _ON_CLAUSE.findall(stripped)
+        for clause in clauses:
+            for qualifier, column, op in _PREDICATE.findall(clause):
+                table = self._resolve(qualifier, column, aliases, table_columns)
+                if table:
+                    add(table, column, "eq" if op.strip().upper() in ("=", "IN", "IS") else "range")
+            # 조인 조건의 우변 컬럼 (a.x = b.y 의 b.y)
+            for qualifier, column in re.findall(r"=\s*\"?(\w+)\"?\.\"?(\w+)\"?", clause):
+                table = self._resolve(qualifier, column, aliases, table_columns)
+                if table:
+                    add(table, column, "eq")
+        return result
+
+    # ===== 계획 / 측정 =====
+    def _plan(self, conn: sqlite3.Connection, query: str) -> List[str]:
+        conn.set_authorizer(_authorizer)
+        try:
+            return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}")]
+        finally:
+            conn.set_authorizer(None)
+
+    def _measure(self, conn: sqlite3.Connection, query: str, deadline: QueryDeadline, repeat: int = 3) -> Optional[float]:
+        """쿼리를 최대 repeat회 실행해 최소 시간을 ms로 반환합니다. 시간 제한 초과 시 None."""
+        conn.set_authorizer(_authorizer)
+        best = None
+        try:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                cursor = conn.execute(query)
+                while cursor.fetchmany(1000):
+                    pass
+                elapsed = (time.perf_counter() - started) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+        except sqlite3.OperationalError:
+            if not deadline.timed_out:
+                raise
+        finally:
+            conn.set_authorizer(None)
+        return round(best, 3) if best is not None else None
+
+    def _scanned_tables(self, plan: List[str], aliases: Dict[str, str]) -> List[str]:
+        scanned = []
+        for detail in plan:
+            match = re.match(r"SCAN (\w+)", detail)
+            if match and "COVERING INDEX" not in detail:
+                table = aliases.get(match.group(1).lower())
+                if table and table not in scanned:
+                    scanned.append(table)
+        return scanned
+
+    def _suggest_indexes(self, conn: sqlite3.Connection, query: str, aliases, predicates) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """full scan 이 사라질 때까지 필터 컬럼 인덱스를 추가하며 계획을 다시 확인합니다."""
+        suggestions = []
+        plan = self._plan(conn, query)
+        for _ in range(len(aliases) + 1):
+            candidates = [
+                t for t in self._scanned_tables(plan, aliases)
+                if t in predicates and (predicates[t]["eq"] or predicates[t]["range"])
+                and t not in {s["table"] for s in suggestions}
+            ]
+            if not candidates:
+                break
+            for table in candidates:
+                columns = (predicates[table]["eq"] + predicates[table]["range"][:1])[:3]
+                name = f"idx_{table}_{'_'.join(columns)}"
+                quoted = ", ".join(quote_identifier(c) for c in columns)
+                sqlite_ddl = f"CREATE INDEX {quote_identifier(name)} ON {quote_identifier(table)} ({quoted})"
+                conn.execute(sqlite_ddl)
+                suggestions.append({
+                    "name": name,
+                    "table": table,
+                    "columns": columns,
+                    "sqlite_ddl": sqlite_ddl,
+                    "ddl": f"CREATE INDEX {name} ON {table} ({', '.join(columns)});"
+                })
+            conn.execute("ANALYZE")
+            plan = self._plan(conn, query)
+        return suggestions, plan
+
+    def analyze(self, query: str, context: str = "") -> Dict[str, Any]:
+        """
+        쿼리 계획을 분석합니다. 같은 (query, context) 결과는 캐시에서 반환합니다.
+
+        Returns:
+            {"data_scale", "findings", "plan_before", "plan_after", "suggested_indexes",
+             "measurements": [{"rows", "before_ms", "after_ms"}], "answer": 결정적 답변 또는 None}
+
+        Raises:
+            SQLExecutionUnsupported: 스키마가 없거나 SQLite에서 분석할 수 없는 쿼리
+        """
+        key = hashlib.sha256(f"{query}\0{context}".encode("utf-8")).hexdigest()
+        analysis = self.cache.get(key)
+        if analysis is None:
+            analysis = self._analyze(query, context)
+            self.cache.put(key, analysis)
+        return analysis
+
+    def _analyze(self, query: str, context: str) -> Dict[str, Any]:
+        statements = split_statements(query)
+        if len(statements) != 1 or not re.match(r"^\s*(SELECT|WITH)\b", statements[0], re.IGNORECASE):
+            raise SQLExecutionUnsupported("단일 SELECT 문만 로컬 분석을 지원합니다")
+        sql = translate_mysql(statements[0])
+        deadline = QueryDeadline(self.timeout_ms)
+
+        conn, tables = self._build_schema(context, deadline)
+        try:
+            table_columns = {t: {c[0].lower() for c in self._columns(conn, t)} for t in tables}
+            aliases = self._aliases(sql, tables)
+            predicates = self._predicates(sql, aliases, table_columns)
+            literals = self._literals(sql, aliases, table_columns)
+            try:
+                plan_before = self._plan(conn, sql)
+            except sqlite3.Error as e:
+                raise SQLExecutionUnsupported(str(e)) from e
+
+            measurements = []
+            suggestions: List[Dict[str, Any]] = []
+            plan_after = plan_before
+            for index, rows in enumerate(self.scales):
+                if deadline.expired:
+                    break
+                try:
+                    for table in tables:
+                        conn.execute(f"DELETE FROM {quote_identifier(table)}")
+                    for suggestion in suggestions:
+                        conn.execute(f"DROP INDEX IF EXISTS {quote_identifier(suggestion['name'])}")
+                    self._populate(conn, tables, rows, literals)
+                    if index == 0:
+                        plan_before = self._plan(conn, sql)
+                    before_ms = self._measure(conn, sql, deadline)
+                    if index == 0:
+                        suggestions, plan_after = self._suggest_indexes(conn, sql, aliases, predicates)
+                    else:
+                        for suggestion in suggestions:
+                            conn.execute(suggestion["sqlite_ddl"])
+                    after_ms = self._measure(conn, sql, deadline) if suggestions else before_ms
+                except sqlite3.OperationalError as e:
+                    # 합성 데이터 생성 / 인덱스 작성 중 시간 제한(interrupted) 또는 DB 크기 상한(full) 도달
+                    if not deadline.timed_out and "full" not in str(e):
+                        raise
+                    break
+                measurements.append({"rows": rows, "before_ms": before_ms, "after_ms": after_ms})
+        finally:
+            conn.close()
+
+        findings = self._findings(plan_before, aliases, predicates, suggestions)
+        analysis = {
+            "data_scale": ",".join(_scale_label(m["rows"]) for m in measurements) or self.data_scale,
+            "findings": findings,
+            "plan_before": plan_before,
+            "plan_after": plan_after,
+            "suggested_indexes": [s["ddl"] for s in suggestions],
+            "measurements": measurements,
+        }
+        analysis["answer"] = self._deterministic_answer(sql, analysis, aliases)
+        return analysis
+
+    def _findings(self, plan, aliases, predicates, suggestions) -> List[Dict[str, Any]]:
+        findings = []
+        suggested_tables = {s["table"] for s in suggestions}
+        for table in self._scanned_tables(plan, aliases):
+            if table in suggested_tables:
+                columns = next(s["columns"] for s in suggestions if s["table"] == table)
+                findings.append({
+                    "type": "MISSING_INDEX",
+                    "table": table,
+                    "description": f"Full table scan on {table}; filter/join columns ({', '.join(columns)}) have no usable index"
+                })
+            else:
+                findings.append({"type": "FULL_SCAN", "table": table, "description": f"Full table scan on {table}"})
+        for table, bucket in predicates.items():
+            for column in bucket["blocked"]:
+                findings.append({
+                    "type": "NON_SARGABLE",
+                    "table": table,
+                    "description": f"Predicate on {table}.{column} wraps the column in a function or uses a leading wildcard, so no index can be used"
+                })
+        for detail in plan:
+            if "TEMP B-TREE" in detail:
+                findings.append({"type": "TEMP_SORT", "table": None, "description": f"Query plan uses a temporary sort structure ({detail})"})
+        return findings
+
+    def _deterministic_answer(self, query: str, analysis: Dict[str, Any], aliases) -> Optional[Dict[str, Any]]:
+        """누락 인덱스만으로 설명되고 실측 개선이 충분할 때만 LLM 없이 답변을 구성합니다."""
+        findings = analysis["findings"]
+        measurements = [m for m in analysis["measurements"] if m["before_ms"] is not None and m["after_ms"] is not None]
+        if not findings or any(f["type"] != "MISSING_INDEX" for f in findings) or not measurements:
+            return None
+        if self._scanned_tables(analysis["plan_after"], aliases):
+            return None
+        largest = measurements[-1]
+        if largest["before_ms"] < largest["after_ms"] * self.min_speedup:
+            return None
+
+        estimated = {f"{_scale_label(m['rows'])}_rows": f"{m['after_ms']}ms" for m in measurements}
+        return {
+            "performance_analysis": {
+                "current_complexity": plan_complexity(analysis["plan_before"]),
+                "bottlenecks": [f["description"] for f in findings],
+                "estimated_execution_time": estimated
+            },
+            "optimization_suggestions": [
+                {
+                    "type": "INDEX",
+                    "description": f"{ddl} (measured {largest['before_ms']}ms -> {largest['after_ms']}ms at {_scale_label(largest['rows'])} rows)",
+                    "impact": "HIGH"
+                }
+                for ddl in analysis["suggested_indexes"]
+            ],
+            "optimized_query": query,
+            "monitoring_suggestions": [
+                "Confirm with EXPLAIN on the target database that the new index is chosen",
+                "Track write latency on the indexed tables after adding the index"
+            ]
+        }
+
+    async def analyze_async(self, query: str, context: str = "") -> Dict[str, Any]:
+        """이벤트 루프를 막지 않도록 전용 워커 스레드에서 analyze를 실행합니다."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.analyze, query, context)
+
+
+def format_analysis_for_prompt(analysis: Optional[Dict[str, Any]]) -> str:
+    """분석 결과를 LLM 프롬프트에 첨부할 평문으로 변환합니다."""
+    if not analysis:
+        return "Not available (no schema in context or query not analyzable locally)"
+    lines = [f"Plan: {' | '.join(analysis['plan_before'])}"]
+    lines += [f"Finding: {f['description']}" for f in analysis["findings"]]
+    if analysis["suggested_indexes"]:
+        lines.append(f"Indexes tested: {' '.join(analysis['suggested_indexes'])}")
+    for m in analysis["measurements"]:
+        lines.append(f"{_scale_label(m['rows'])} rows: {m['before_ms']}ms before, {m['after_ms']}ms after")
+    return "; ".join(lines)
+
+
+query_analyzer = QueryPlanAnalyzer(
+    scales=[int(s) for s in settings.SQL_ANALYZER_SCALES.split(",") if s.strip()],
+    timeout_ms=settings.SQL_ANALYZER_TIMEOUT_MS,
+    cache_size=settings.SQL_ANALYZER_CACHE_SIZE,
+    max_db_bytes=settings.SQL_ANALYZER_MAX_DB_MB * 1024 * 1024
+)
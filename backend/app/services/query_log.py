@@ -0,0 +1,129 @@
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_input(value: Any) -> Any:
+    """공백 차이만 있는 입력을 같은 항목으로 집계하기 위한 정규화"""
+    if isinstance(value, str):
+        return _WHITESPACE.sub(" ", value).strip()
+    if isinstance(value, dict):
+        return {k: normalize_input(v) for k, v in value.items()}
+    return value
+
+
+class QueryLog:
+    """
+    /blog/search, /tools/sql/* 입력을 JSONL로 기록하고, 캐시 예열 대상(최근 빈도 상위 입력)을 계산합니다.
+
+    - 기본은 기록하지 않음 (QUERY_LOG_PATH 를 설정해야 원문 입력이 디스크에 남음)
+    - record 는 큐에 넣기만 하고, 파일 열기 / 회전 / 기록은 writer 스레드가 모아서 처리 (이벤트 루프에서 파일 I/O 없음)
+    - 큐가 가득 차면(max_pending) 그 줄은 버림 (디스크가 느려도 요청은 기다리지 않음)
+    - 파일이 max_bytes 를 넘으면 <path>.1 로 회전 (직전 파일 1개만 보관)
+    - 여러 워커가 같은 파일에 O_APPEND 로 한 줄씩 기록
+    - 마지막 실시간 요청 시각을 기록해 예열 작업이 실시간 트래픽과 겹치지 않게 함
+    """
+
+    def __init__(self, path: str, max_bytes: int, max_pending: int = 10000, batch_size: int = 256):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[bytes]" = queue.Queue(maxsize=max_pending)
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self.dropped = 0
+        self.last_live_request = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def record(self, endpoint: str, inputs: Dict[str, Any]):
+        self.last_live_request = time.monotonic()
+        if not self.enabled:
+            return
+        line = orjson.dumps({"ts": time.time(), "endpoint": endpoint, "input": inputs}) + b"\n"
+        if self._writer is None:
+            self._start_writer()
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start_writer(self):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="query-log-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            lines = [self._queue.get()]
+            while len(lines) < self.batch_size:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._rotate_if_needed()
+                with open(self.path, "ab") as f:
+                    f.write(b"".join(lines))
+            except OSError as e:
+                logger.warning(f"쿼리 로그 기록 실패: {e}")
+
+    def _rotate_if_needed(self):
+        try:
+            if os.path.getsize(self.path) >= self.max_bytes:
+                os.replace(self.path, self.path + ".1")
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+    def _read_entries(self, since: Optional[float]) -> Iterable[Dict[str, Any]]:
+        for path in (self.path + ".1", self.path):
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        entry = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        continue  # 동시 기록/회전 중 잘린 줄
+                    if since is None or entry.get("ts", 0) >= since:
+                        yield entry
+
+    def top(self, limit: int, endpoints: Optional[Iterable[str]] = None,
+            since: Optional[float] = None) -> List[Tuple[str, Dict[str, Any], int]]:
+        """
+        빈도 순 상위 입력을 반환합니다.
+
+        Returns:
+            [(endpoint, input, count), ...]
+        """
+        if not self.enabled:
+            return []
+        allowed = set(endpoints) if endpoints else None
+        counts: Counter = Counter()
+        for entry in self._read_entries(since):
+            endpoint = entry.get("endpoint")
+            if allowed is not None and endpoint not in allowed:
+                continue
+            key = (endpoint, orjson.dumps(normalize_input(entry.get("input") or {}), option=orjson.OPT_SORT_KEYS))
+            counts[key] += 1
+        return [(endpoint, orjson.loads(inputs), count) for (endpoint, inputs), count in counts.most_common(limit)]
+
+
+query_log = QueryLog(settings.QUERY_LOG_PATH, settings.QUERY_LOG_MAX_BYTES)
@@ -1,76 +1,521 @@
+import asyncio
+import contextlib
+import logging
 import os
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import orjson
 from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_groq import ChatGroq
-from langchain_core.runnables import RunnablePassthrough, RunnableLambda
+from langchain_core.runnables import Runnable, RunnableConfig, RunnablePassthrough, RunnableLambda
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
 from app.core.config import settings
+from app.core.llm_scheduler import llm_limit, llm_scheduler
+from app.services.doc_metadata import build_where
+from app.services.embedding_service import CachedQueryEmbeddings, RemoteRetriever, create_embeddings, get_service_client
+from app.services.index_snapshots import SnapshotError, SnapshotStore, prefault, release_store
+from app.services.query_log import normalize_input
+from app.services.summary_index import (
+    SUMMARY_COLLECTION, SUMMARY_MARKER, marker_collection, read_marker, summary_indexer
+)
+from app.utils.cache import LRUCache
 from app.utils.prompt_loader import get_prompt
+from app.utils.traffic_recorder import create_upstream_async_http_client, create_upstream_http_client
+
+
+logger = logging.getLogger(__name__)
+
+
+def scheduled(llm: Runnable) -> Runnable:
+    """LLM 호출을 llm_scheduler 슬롯 안에서 실행 (우선순위 / 클라이언트는 호출 측 컨텍스트 기준)"""
+    def invoke(messages, config: RunnableConfig):
+        with llm_scheduler.slot():
+            return llm.invoke(messages, config)
+
+    async def ainvoke(messages, config: RunnableConfig):
+        async with llm_scheduler.aslot():
+            return await llm.ainvoke(messages, config)
+
+    return RunnableLambda(invoke, afunc=ainvoke, name="scheduled_llm")
 
 
 class BlogRAGService:
-    def __init__(self, data_dir: str = "backend/data/blog_posts", persist_directory: str = "backend/data/chroma_db"):
+    def __init__(self, data_dir: str = "backend/data/blog_posts", persist_directory: str = "backend/data/chroma_db",
+                 embeddings: Embeddings = None, name: str = "blog", shared: "BlogRAGService" = None):
+        """
+        Args:
+            name: 코퍼스 이름 (/blog/search 의 corpus 값)
+            shared: 다른 코퍼스와 임베딩 모델 / LLM 클라이언트 / 질의 임베딩 캐시를 공유할 때 기준 인스턴스
+        """
+        self.name = name
         self.data_dir = data_dir
         self.persist_directory = persist_directory
-        self.embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+        self._shared = shared
+        # 임베딩 모델은 첫 사용(또는 preload) 시 로드
+        self._embeddings = embeddings
         self.vector_store = None
-        self.llm = ChatGroq(
+        self.load_ms = None
+        # 버전별 스냅샷 (persist_directory 아래 snapshots/<version>, CURRENT 포인터)
+        self.snapshots = SnapshotStore(
+            persist_directory, keep=settings.INDEX_SNAPSHOT_KEEP, grace_s=settings.INDEX_SNAPSHOT_PRUNE_GRACE_S
+        )
+        self.index_version = None
+        self._pointer_mtime = 0
+        self._last_check = 0.0
+        self._open_lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        self._reloading = threading.Lock()
+        # 버전별 진행 중인 검색 수 / 교체·축출됐지만 검색이 끝나지 않아 해제를 미룬 스토어
+        self._leases: Dict[str, int] = {}
+        self._retired: Dict[str, Any] = {}
+        # 요약 컬렉션 (version, store | None, 확인 시각, 컬렉션 이름) - 마커가 가리키는 컬렉션을 엶
+        self._summary_store = None
+        # 벡터 스토어를 처음 연 직후 호출 (코퍼스 레지스트리의 로드 시간 기록 / LRU 축출용)
+        self.on_open = None
+        # 검색 결과 / 답변 캐시 (재인덱싱 시 무효화)
+        self.retrieval_cache = LRUCache(settings.CACHE_RETRIEVAL_SIZE)
+        self.answer_cache = LRUCache(settings.CACHE_ANSWER_SIZE)
+        if shared is not None:
+            self.service_client = shared.service_client
+            self.query_embedding_cache = shared.query_embedding_cache
+            self.llm = shared.llm
+            return
+        # EMBEDDING_SERVICE_SOCKET 설정 시 모델과 인덱스는 임베딩 서비스 프로세스가 소유
+        self.service_client = get_service_client() if embeddings is None else None
+        # 질의 임베딩 캐시 (모델 기준이므로 코퍼스 간 공유)
+        self.query_embedding_cache = LRUCache(settings.CACHE_EMBEDDING_SIZE)
+        self.llm = scheduled(ChatGroq(
             temperature=0,
             model_name="llama-3.1-8b-instant",
-            api_key=settings.GROQ_API_KEY
-        )
+            api_key=settings.GROQ_API_KEY,
+            http_client=create_upstream_http_client(settings.RECORDER_ENABLED, llm_limit),
+            http_async_client=create_upstream_async_http_client(settings.RECORDER_ENABLED, llm_limit)
+        ))
+
+    @property
+    def embeddings(self) -> Embeddings:
+        if self._shared is not None:
+            return self._shared.embeddings
+        if self._embeddings is None:
+            self._embeddings = create_embeddings()
+        if not isinstance(self._embeddings, CachedQueryEmbeddings):
+            self._embeddings = CachedQueryEmbeddings(self._embeddings, self.query_embedding_cache)
+        return self._embeddings
+
+    def preload(self):
+        """
+        임베딩 모델을 미리 로드합니다.
+        gunicorn preload_app 마스터에서 fork 전에 호출하면 워커들이 모델 메모리를 copy-on-write로 공유합니다.
+        Chroma 클라이언트는 fork 이후 각 워커에서 열도록 여기서 열지 않습니다.
+        """
+        return self.embeddings
 
     def load_and_index(self):
         """
-        마크다운 파일을 로드하고 ChromaDB에 인덱싱합니다.
+        마크다운 파일을 로드해 새 버전 스냅샷으로 인덱싱하고, 완성되면 리더를 새 버전으로 교체합니다.
 
         프로세스:
         1. 디렉터리에서 .md 파일 로드
         2. 청크로 분할 (1000자씩, 200자 겹침)
-        3. 각 청크를 벡터로 변환하여 ChromaDB에 저장
+        3. 새 스냅샷 디렉터리에 ChromaDB 빌드 + manifest(체크섬) 기록
+        4. 체크섬 검증 후 CURRENT 포인터 교체, 리더 교체 (빌드 중에도 기존 버전으로 검색)
+        5. 오래된 스냅샷 정리 (INDEX_SNAPSHOT_KEEP 개 보관)
         """
-        if not os.path.exists(self.data_dir):
-            os.makedirs(self.data_dir)
-            # Create a dummy file if empty to avoid errors
-            with open(os.path.join(self.data_dir, "welcome.md"), "w", encoding="utf-8") as f:
-                f.write("# Welcome to the Blog\n\nThis is a sample blog post to initialize the RAG system.")
+        if self.service_client is not None:
+            # 인덱스는 임베딩 서비스가 소유하므로 재인덱싱도 서비스에서 수행
+            self.service_client.request({"op": "index", "corpus": self.name})
+            self.invalidate_caches()
+            return
 
-        loader = DirectoryLoader(self.data_dir, glob="**/*.md", loader_cls=TextLoader, loader_kwargs={"encoding": "utf-8"})
-        docs = loader.load()
+        # 스냅샷 빌드(전체 / 증분) → 활성화는 워커 간에도 하나씩 (증분은 활성 버전을 기준으로 하므로)
+        with self.snapshots.build_lock():
+            version, vector_store = self.snapshots.build(self.data_dir, self.embeddings, settings.EMBEDDING_MODEL)
+            if version is None:
+                print("No documents found to index.")
+                return
+            self._activate_built(version, vector_store)
 
-        if not docs:
-            print("No documents found to index.")
+    def index_files(self, paths: List[str]):
+        """
+        지정한 파일만 증분 인덱싱합니다 (업로드 직후).
+        활성 스냅샷을 복사한 새 버전에서 해당 파일의 청크만 교체 / 추가하고 리더를 교체합니다.
+        활성 스냅샷이 없으면 전체 인덱싱합니다.
+        """
+        if self.service_client is not None:
+            self.service_client.request({"op": "index_files", "corpus": self.name, "paths": paths})
+            self.invalidate_caches()
             return
 
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        splits = text_splitter.split_documents(docs)
+        with self.snapshots.build_lock():
+            base = self.snapshots.current()
+            if base is None:
+                self.load_and_index()
+                return
+            version, vector_store = self.snapshots.build_incremental(
+                base, self.data_dir, paths, self.embeddings, settings.EMBEDDING_MODEL, exclude=(SUMMARY_MARKER,)
+            )
+            self._activate_built(version, vector_store)
+
+    def _activate_built(self, version: str, vector_store):
+        # 방금 같은 스토어로 체크섬을 계산했으므로 재검증 없이 활성화 (CLI/CI 빌드본은 activate 시 검증)
+        self.snapshots.activate(version, verify=False)
+        self._swap(vector_store, version, load_ms=None)
+        self.snapshots.prune()
+        if settings.SUMMARY_ENABLED:
+            # 요약은 새 버전으로 서비스를 시작한 뒤 백그라운드에서 생성 (끝나기 전까지는 청크 검색)
+            summary_indexer.schedule(self)
+
+    def rollback(self, version: str = None) -> str:
+        """이전(또는 지정한) 스냅샷으로 즉시 되돌립니다."""
+        if self.service_client is not None:
+            version = self.service_client.request({"op": "rollback", "corpus": self.name, "version": version})
+            self.invalidate_caches()
+            return version
+
+        version = version or self.snapshots.previous()
+        if version is None:
+            raise SnapshotError("no previous snapshot to roll back to")
+        # 보관 중인 버전은 처음 활성화할 때 검증했으므로 즉시 전환
+        self.snapshots.activate(version, verify=False)
+        vector_store, load_ms = self._open_version(version)
+        self._swap(vector_store, version, load_ms)
+        return version
+
+    def snapshot_info(self) -> dict:
+        if self.service_client is not None:
+            return self.service_client.request({"op": "snapshots", "corpus": self.name})
+        return {**self.snapshots.describe(), "serving": self.index_version}
+
+    def invalidate_caches(self):
+        """인덱스가 바뀌면 검색 결과/답변 캐시를 비웁니다 (질의 임베딩은 모델이 같으므로 유지)."""
+        self.retrieval_cache.clear()
+        self.answer_cache.clear()
+
+    def _open_version(self, version: str):
+        """스냅샷을 열고 첫 검색까지 미리 실행해 둡니다 (교체 직후 지연 시간 튐 방지)."""
+        path = self.snapshots.path(version)
+        started = time.perf_counter()
+        prefault(path)
+        vector_store = Chroma(persist_directory=path, embedding_function=self.embeddings)
+        try:
+            vector_store.similarity_search("warmup", k=1)
+        except Exception as e:
+            logger.warning(f"스냅샷 예열 검색 실패 ({self.name}/{version}): {e}")
+        return vector_store, round((time.perf_counter() - started) * 1000, 1)
+
+    def _swap(self, vector_store, version: str, load_ms):
+        """리더 교체: 참조 교체 한 번이므로 진행 중인 검색은 기존 스토어로 끝까지 실행됨 (lease 참고)"""
+        with self._swap_lock:
+            # 해제 대기 중인 버전을 다시 열었으면 (롤백 등) 해제를 취소 - 같은 경로의 Chroma System 을 공유함
+            self._retired.pop(version, None)
+            released = None
+            if self.index_version != version:
+                # 이전 버전은 진행 중인 검색이 끝나면 해제 (남겨 두면 교체할 때마다 인덱스 하나씩 누적)
+                released = self._retire(self.index_version, self.vector_store)
+            self.vector_store = vector_store
+            self.index_version = version
+            self._summary_store = None
+            self._pointer_mtime = self.snapshots.pointer_mtime()
+            if load_ms is not None:
+                self.load_ms = load_ms
+            self.invalidate_caches()
+        if released is not None:
+            release_store(released)
+        logger.info(f"인덱스 리더 교체: {self.name} -> {version}")
+        if self.on_open is not None:
+            self.on_open(self)
+
+    def open(self):
+        """활성 스냅샷을 엽니다 (스냅샷이 없으면 인덱싱)."""
+        if self.vector_store is not None:
+            self._check_for_new_snapshot()
+            return self.vector_store
+        with self._open_lock:
+            if self.vector_store is None:
+                version = self.snapshots.current()
+                if version is None:
+                    self.load_and_index()
+                else:
+                    vector_store, load_ms = self._open_version(version)
+                    self._swap(vector_store, version, load_ms)
+        return self.vector_store
+
+    def close(self):
+        """
+        벡터 스토어와 검색/답변 캐시를 해제합니다 (다음 사용 시 다시 열림).
+        진행 중인 검색이 있으면 인덱스 메모리는 마지막 검색이 끝날 때 해제됩니다.
+        """
+        with self._swap_lock:
+            released = self._retire(self.index_version, self.vector_store)
+            self.vector_store = None
+            self.index_version = None
+            self._summary_store = None
+            self.invalidate_caches()
+        if released is not None:
+            release_store(released)
+
+    def _retire(self, version: Optional[str], vector_store):
+        """_swap_lock 안에서 호출: 대여 중인 버전이면 해제를 미루고, 아니면 지금 해제할 스토어를 반환"""
+        if vector_store is None:
+            return None
+        if self._leases.get(version):
+            self._retired[version] = vector_store
+            return None
+        return vector_store
+
+    @contextlib.contextmanager
+    def lease(self):
+        """
+        검색하는 동안 현재 스냅샷을 빌립니다 → (version, vector_store).
+        그 사이 리더가 교체되거나 코퍼스가 축출되어도 스토어는 마지막 대여가 끝난 뒤에 해제됩니다.
+        임베딩 서비스 모드에서는 (None, None).
+        """
+        if self.service_client is not None:
+            yield None, None
+            return
+        while True:
+            self.open()
+            with self._swap_lock:
+                version, vector_store = self.index_version, self.vector_store
+                if vector_store is not None:
+                    self._leases[version] = self._leases.get(version, 0) + 1
+                    break
+        try:
+            yield version, vector_store
+        finally:
+            released = None
+            with self._swap_lock:
+                self._leases[version] -= 1
+                if self._leases[version] == 0:
+                    del self._leases[version]
+                    released = self._retired.pop(version, None)
+            if released is not None:
+                release_store(released)
+
+    @property
+    def is_open(self) -> bool:
+        return self.vector_store is not None
+
+    @property
+    def index_path(self) -> str:
+        """현재 검색 중인 스냅샷 디렉터리"""
+        if self.index_version is None:
+            return self.persist_directory
+        return self.snapshots.path(self.index_version)
+
+    def _check_for_new_snapshot(self):
+        """
+        다른 프로세스(CLI / 다른 워커)가 CURRENT 를 바꿨는지 주기적으로 확인하고,
+        바뀌었으면 백그라운드 스레드에서 새 버전을 열어 교체합니다 (요청 스레드는 기다리지 않음).
+        """
+        now = time.monotonic()
+        if self.vector_store is None or now - self._last_check < settings.INDEX_SNAPSHOT_CHECK_INTERVAL_S:
+            return
+        self._last_check = now
+        mtime = self.snapshots.pointer_mtime()
+        if mtime == self._pointer_mtime or self._reloading.locked():
+            return
+        version = self.snapshots.current()
+        if version is None or version == self.index_version:
+            self._pointer_mtime = mtime
+            return
+        threading.Thread(target=self._reload, args=(version,), name=f"index-reload-{self.name}", daemon=True).start()
 
-        self.vector_store = Chroma.from_documents(
-            documents=splits,
-            embedding=self.embeddings,
-            persist_directory=self.persist_directory
-        )
+    def _reload(self, version: str):
+        if not self._reloading.acquire(blocking=False):
+            return
+        try:
+            vector_store, load_ms = self._open_version(version)
+            self._swap(vector_store, version, load_ms)
+        except Exception as e:
+            logger.exception(f"스냅샷 교체 실패 ({self.name}/{version}): {e}")
+        finally:
+            self._reloading.release()
+
+    def get_retriever(self, k: int = None, where: Optional[Dict[str, Any]] = None, vector_store=None):
+        """
+        k / where 는 벡터 검색 단계로 전달됩니다 (HNSW 탐색 중 메타데이터 조건 적용).
+        검색 후 걸러내면 선택적인 필터에서 결과가 k 개보다 적어지므로 사후 필터링은 하지 않습니다.
+
+        Args:
+            vector_store: lease() 로 빌린 스토어 (기본값은 현재 스토어)
+        """
+        k = k or settings.RAG_DEFAULT_K
+        if self.service_client is not None:
+            return RemoteRetriever(client=self.service_client, corpus=self.name, k=k, where=where)
+        search_kwargs: Dict[str, Any] = {"k": k}
+        if where:
+            search_kwargs["filter"] = where
+        if vector_store is None:
+            vector_store = self.open()
+        return vector_store.as_retriever(search_kwargs=search_kwargs)
+
+    @staticmethod
+    def _clamp_k(k: Optional[int]) -> int:
+        return min(k or settings.RAG_DEFAULT_K, settings.RAG_MAX_K)
+
+    @staticmethod
+    def _filter_key(filters: Optional[Dict[str, Any]]) -> Optional[bytes]:
+        return orjson.dumps(filters, option=orjson.OPT_SORT_KEYS) if filters else None
+
+    def retrieve(self, query: str, k: int = None, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """
+        검색 결과를 (질의, k, 필터) 기준으로 캐시합니다.
 
-    def get_retriever(self):
-        if not self.vector_store:
-            # Try to load existing DB
-            if os.path.exists(self.persist_directory):
-                self.vector_store = Chroma(persist_directory=self.persist_directory, embedding_function=self.embeddings)
+        Args:
+            k: 결과 수 (기본 RAG_DEFAULT_K, 상한 RAG_MAX_K)
+            filters: {"post", "tags", "lang", "date_from", "date_to"} (doc_metadata.build_where 참고)
+        """
+        k = self._clamp_k(k)
+        key = (normalize_input(query), k, self._filter_key(filters))
+        docs = self.retrieval_cache.get(key)
+        if docs is None:
+            where = build_where(filters)
+            with self.lease() as (version, vector_store):
+                docs = None
+                if settings.RAG_SUMMARY_FIRST:
+                    docs = self._retrieve_summary_first(query, k, where, version, vector_store)
+                if docs is None:
+                    docs = self.get_retriever(k, where, vector_store).invoke(query)
+            self.retrieval_cache.put(key, docs)
+        return docs
+
+    def _retrieve_summary_first(self, query: str, k: int, where: Optional[Dict[str, Any]],
+                                version: Optional[str] = None, vector_store=None) -> Optional[List[Document]]:
+        """
+        글 / 섹션 요약 k 개를 먼저 검색하고, 가장 관련 높은 RAG_SUMMARY_EXPAND_POSTS 개 글만 원문 청크를
+        RAG_SUMMARY_EXPAND_K 개씩 덧붙입니다 (여러 글에 걸친 질문은 요약만으로 답해 프롬프트 토큰을 줄임).
+        요약 인덱스가 아직 없으면 None (청크 검색으로 대체).
+        """
+        summaries = self.search_summaries(query, k, where, version)
+        if not summaries:
+            return None
+        chunks: List[Document] = []
+        posts = list(dict.fromkeys(doc.metadata.get("post") for doc in summaries))
+        for post in posts[:settings.RAG_SUMMARY_EXPAND_POSTS]:
+            clause = {"post": {"$eq": post}}
+            chunk_where = {"$and": [where, clause]} if where else clause
+            chunks.extend(self.get_retriever(settings.RAG_SUMMARY_EXPAND_K, chunk_where, vector_store).invoke(query))
+        return summaries + chunks
+
+    def search_summaries(self, query: str, k: int, where: Optional[Dict[str, Any]] = None,
+                         version: Optional[str] = None) -> List[Document]:
+        """
+        Args:
+            version: lease() 로 빌린 버전 (없으면 여기서 빌림)
+        """
+        if self.service_client is not None:
+            return RemoteRetriever(
+                client=self.service_client, corpus=self.name, k=k, where=where, collection=SUMMARY_COLLECTION
+            ).invoke(query)
+        if version is None:
+            with self.lease() as (version, _):
+                return self.search_summaries(query, k, where, version)
+        store = self.summary_store(version)
+        if store is None:
+            return []
+        return store.similarity_search(query, k=k, filter=where)
+
+    def summary_store(self, version: Optional[str] = None):
+        """
+        스냅샷의 요약 컬렉션 (요약 배치가 끝나기 전이면 None, INDEX_SNAPSHOT_CHECK_INTERVAL_S 마다 다시 확인)
+
+        Args:
+            version: lease() 로 빌린 버전 (기본값은 활성 버전)
+        """
+        self.open()
+        version = version or self.index_version
+        cached = self._summary_store
+        if cached is not None and cached[0] == version and \
+                time.monotonic() - cached[2] < settings.INDEX_SNAPSHOT_CHECK_INTERVAL_S:
+            return cached[1]
+        path = self.snapshots.path(version)
+        marker = read_marker(path)
+        collection = marker_collection(marker) if marker else None
+        if cached is not None and cached[0] == version and cached[3] == collection:
+            store = cached[1]
+        elif collection:
+            # 마커가 가리키는 컬렉션 (요약 배치마다 새 이름으로 기록되므로 여는 동안 바뀌지 않음)
+            store = Chroma(collection_name=collection, persist_directory=path, embedding_function=self.embeddings)
+            # 요약 없이(또는 이전 요약으로) 캐시된 검색 결과를 버림
+            self.invalidate_caches()
+        else:
+            store = None
+        if version == self.index_version:
+            self._summary_store = (version, store, time.monotonic(), collection)
+        return store
+
+    def refresh_summaries(self):
+        """요약 배치가 끝난 뒤 호출 (같은 프로세스는 바로, 다른 워커는 확인 주기 안에 새 컬렉션을 엶)"""
+        self._summary_store = None
+        self.invalidate_caches()
+
+    def build_summaries(self) -> bool:
+        """활성 스냅샷의 요약 생성을 백그라운드로 시작합니다 (이미 실행 중이면 False)."""
+        if self.service_client is not None:
+            return self.service_client.request({"op": "summarize", "corpus": self.name})
+        return summary_indexer.schedule(self)
+
+    def summary_status(self) -> dict:
+        if self.service_client is not None:
+            return self.service_client.request({"op": "summary_status", "corpus": self.name})
+        self.open()
+        active = read_marker(self.index_path)
+        return {"index_version": self.index_version, "active": active, "batch": summary_indexer.status.get(self.name)}
+
+    def answer(self, user_query: str, mode: str = "sources", k: int = None, filters: Optional[Dict[str, Any]] = None):
+        """
+        /blog/search 응답 생성 (CACHE_ANSWER_SIZE > 0 이면 답변 캐시)
+
+        Args:
+            mode: "sources"(출처 포함) | "plain" | "test"
+            k, filters: retrieve 참고
+        """
+        k = self._clamp_k(k)
+        key = (mode, normalize_input(user_query), k, self._filter_key(filters))
+        answer = self.answer_cache.get(key)
+        if answer is None:
+            if mode == "test":
+                answer = self._test_chain(k, filters).invoke(user_query)
+            elif mode == "sources":
+                answer = self.query_with_sources(user_query, k, filters)
             else:
-                self.load_and_index()
+                answer = self._rag_chain("blog_search", k, filters).invoke(user_query)
+            self.answer_cache.put(key, answer)
+        return answer
+
+    async def aanswer(self, user_query: str, mode: str = "sources", k: int = None,
+                      filters: Optional[Dict[str, Any]] = None):
+        """
+        answer 의 비동기 버전 (/blog/search).
+        task 가 취소되면(클라이언트 연결 끊김) 진행 중인 LLM 호출이 중단되고 캐시에 저장하지 않습니다.
+        """
+        k = self._clamp_k(k)
+        key = (mode, normalize_input(user_query), k, self._filter_key(filters))
+        answer = self.answer_cache.get(key)
+        if answer is None:
+            if mode == "test":
+                answer = await self._test_chain(k, filters).ainvoke(user_query)
+            elif mode == "sources":
+                answer = await self.aquery_with_sources(user_query, k, filters)
+            else:
+                answer = await self._rag_chain("blog_search", k, filters).ainvoke(user_query)
+            self.answer_cache.put(key, answer)
+        return answer
 
-        return self.vector_store.as_retriever()
+    def _retrieve_context(self, k: int = None, filters: Optional[Dict[str, Any]] = None):
+        return RunnableLambda(lambda query: self.retrieve(query, k, filters)) | RunnableLambda(self.format_docs)
 
     def format_docs(self, docs):
         return "\n\n".join(d.page_content for d in docs)
 
-    def query_test(self, user_query: str) -> str:
-        retriever = self.get_retriever()
-
+    def _test_chain(self, k: int = None, filters: Optional[Dict[str, Any]] = None):
         # Create a proper ChatPromptTemplate
         prompt = ChatPromptTemplate.from_messages([
             ("system",
@@ -84,9 +529,9 @@ class BlogRAGService:
         ])
 
         # Wrap the static method in RunnableLambda
-        rag_chain = (
+        return (
             {
-                "context": retriever | RunnableLambda(self.format_docs),
+                "context": self._retrieve_context(k, filters),
                 "question": RunnablePassthrough()
             }
             | prompt
@@ -94,22 +539,7 @@ class BlogRAGService:
             | StrOutputParser()
         )
 
-        result = rag_chain.invoke(user_query)
-        return result
-
-    def query(self, user_query: str, prompt_section: str = "blog_search") -> str:
-        """
-        RAG 기반 질문 응답
-
-        Args:
-            user_query: 사용자 질문
-            prompt_section: YAML에서 사용할 프롬프트 섹션
-
-        Returns:
-            LLM 생성 답변
-        """
-        retriever = self.get_retriever()
-
+    def _rag_chain(self, prompt_section: str, k: int = None, filters: Optional[Dict[str, Any]] = None):
         # YAML에서 프롬프트 로드
         prompt_data = get_prompt("blog_rag_prompts.yaml", prompt_section)
         system_prompt = prompt_data.get("system", "")
@@ -122,9 +552,9 @@ class BlogRAGService:
         ])
 
         # RAG 체인 구성
-        rag_chain = (
+        return (
             {
-                "context": retriever | RunnableLambda(self.format_docs),
+                "context": self._retrieve_context(k, filters),
                 "question": RunnablePassthrough()
             }
             | prompt
@@ -132,52 +562,39 @@ class BlogRAGService:
             | StrOutputParser()
         )
 
-        result = rag_chain.invoke(user_query)
-        return result
-
+    def query_test(self, user_query: str) -> str:
+        return self._test_chain().invoke(user_query)
 
-    def query_with_sources(self, user_query: str) -> dict:
+    def query(self, user_query: str, prompt_section: str = "blog_search") -> str:
         """
-        출처 포함 응답 (어떤 문서에서 정보를 가져왔는지 표시)
+        RAG 기반 질문 응답
+
+        Args:
+            user_query: 사용자 질문
+            prompt_section: YAML에서 사용할 프롬프트 섹션
 
         Returns:
-            {"answer": str, "sources": [{"content": str, "metadata": dict}]}
+            LLM 생성 답변
         """
-        retriever = self.get_retriever()
-
-        # 관련 문서 검색
-        docs = retriever.invoke(user_query)
-
-        if not docs:
-            return {
-                "answer": "검색된 관련 문서가 없습니다. 질문을 다시 확인해주세요.",
-                "sources": [],
-                "context_used": ""
-            }
+        return self._rag_chain(prompt_section).invoke(user_query)
 
+    def _sources_chain(self):
         # 프롬프트 로드
         prompt_data = get_prompt("blog_rag_prompts.yaml", "blog_search")
         system_prompt = prompt_data.get("system", "")
         user_template = prompt_data.get("user", "")
 
-        # 문맥 생성
-        context = self.format_docs(docs)
-
         # ChatPromptTemplate - LangChain이 자동으로 변수를 치환하므로 수동 렌더링 불필요
         prompt = ChatPromptTemplate.from_messages([
             ("system", system_prompt),
             ("human", user_template)
         ])
 
-        # LLM 체인 실행
-        chain = prompt | self.llm | StrOutputParser()
-
-        # invoke에 dict 형태로 변수 전달
-        answer = chain.invoke({
-            "context": context,
-            "question": user_query
-        })
+        # LLM 체인
+        return prompt | self.llm | StrOutputParser()
 
+    @staticmethod
+    def _with_sources(answer: str, docs: List[Document], context: str) -> dict:
         # 출처 정보 추출
         sources = []
         for doc in docs:
@@ -194,6 +611,96 @@ class BlogRAGService:
             "context_used": context[:500] + "..." if len(context) > 500 else context
         }
 
+    _NO_DOCUMENTS = {
+        "answer": "검색된 관련 문서가 없습니다. 질문을 다시 확인해주세요.",
+        "sources": [],
+        "context_used": ""
+    }
+
+    def query_with_sources(self, user_query: str, k: int = None, filters: Optional[Dict[str, Any]] = None) -> dict:
+        """
+        출처 포함 응답 (어떤 문서에서 정보를 가져왔는지 표시)
+
+        Returns:
+            {"answer": str, "sources": [{"content": str, "metadata": dict}]}
+        """
+        # 관련 문서 검색
+        docs = self.retrieve(user_query, k, filters)
+        if not docs:
+            return dict(self._NO_DOCUMENTS)
+
+        # 문맥 생성
+        context = self.format_docs(docs)
+
+        # invoke에 dict 형태로 변수 전달
+        answer = self._sources_chain().invoke({
+            "context": context,
+            "question": user_query
+        })
+        return self._with_sources(answer, docs, context)
+
+    async def aquery_with_sources(self, user_query: str, k: int = None,
+                                  filters: Optional[Dict[str, Any]] = None) -> dict:
+        """query_with_sources 의 비동기 버전 (검색은 스레드에서, LLM 호출은 비동기 클라이언트로)"""
+        docs = await asyncio.to_thread(self.retrieve, user_query, k, filters)
+        if not docs:
+            return dict(self._NO_DOCUMENTS)
+
+        context = self.format_docs(docs)
+        answer = await self._sources_chain().ainvoke({
+            "context": context,
+            "question": user_query
+        })
+        return self._with_sources(answer, docs, context)
+
+    def query_with_history(self, user_query: str, history: str, summary: str, retrieval_query: str = None) -> dict:
+        """
+        대화 이력을 포함한 RAG 응답 (mochachat 세션용)
+
+        Args:
+            user_query: 현재 질문
+            history: 토큰 예산 안에서 선택된 최근 대화
+            summary: 오래된 대화의 요약
+            retrieval_query: 검색에 사용할 질의 (후속 질문 보강용, 기본값은 user_query)
+
+        Returns:
+            {"answer": str, "sources": [{"source_file": str, "content": str}]}
+        """
+        docs = self.retrieve(retrieval_query or user_query)
+
+        prompt_data = get_prompt("blog_rag_prompts.yaml", "chat_conversation")
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", prompt_data.get("system", "")),
+            ("human", prompt_data.get("user", ""))
+        ])
+        chain = prompt | self.llm | StrOutputParser()
+
+        answer = chain.invoke({
+            "summary": summary or "(none)",
+            "history": history or "(none)",
+            "context": self.format_docs(docs),
+            "question": user_query
+        })
+
+        sources = [
+            {
+                "source_file": doc.metadata.get("source", "Unknown"),
+                "content": doc.page_content[:300] + "..." if len(doc.page_content) > 300 else doc.page_content
+            }
+            for doc in docs
+        ]
+        return {"answer": answer, "sources": sources}
+
+    def summarize_conversation(self, summary: str, turns: str) -> str:
+        """기존 요약과 새로 밀려난 대화 턴을 합쳐 새 요약을 생성합니다."""
+        prompt_data = get_prompt("blog_rag_prompts.yaml", "chat_summary")
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", prompt_data.get("system", "")),
+            ("human", prompt_data.get("user", ""))
+        ])
+        chain = prompt | self.llm | StrOutputParser()
+        return chain.invoke({"summary": summary or "(none)", "turns": turns})
+
 
 # Singleton instance or dependency injection could be used
 rag_service = BlogRAGService()
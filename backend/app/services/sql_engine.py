@@ -0,0 +1,397 @@
+import asyncio
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Any, Dict, List
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class SQLExecutionUnsupported(Exception):
+    """로컬(SQLite)에서 실행할 수 없는 쿼리. 호출 측은 LLM 시뮬레이션으로 대체합니다."""
+
+
+# ===== MariaDB/MySQL -> SQLite 방언 변환 =====
+_STRING_LITERAL = re.compile(r"('(?:[^'\\]|\\.|'')*')")
+_ENUM_TYPE = re.compile(r"\b(?:ENUM|SET)\s*\((?:\s*'(?:[^'\\]|\\.|'')*'\s*,?)*\)", re.IGNORECASE)
+_COMMENT_CLAUSE = re.compile(r"\bCOMMENT\s*=?\s*'(?:[^'\\]|\\.|'')*'", re.IGNORECASE)
+_AUTO_INCREMENT_COLUMN = re.compile(
+    r"\b(?:TINY|SMALL|MEDIUM|BIG)?INT(?:EGER)?(?:\s*\(\d+\))?(?:\s+UNSIGNED)?([^,()]*?)\s+AUTO_INCREMENT\b",
+    re.IGNORECASE
+)
+_DIALECT_RULES = [
+    (re.compile(r"`"), '"'),
+    (re.compile(r"\b(?:ENGINE|AUTO_INCREMENT|ROW_FORMAT)\s*=\s*\w+", re.IGNORECASE), ""),
+    (re.compile(r"\b(?:DEFAULT\s+)?(?:CHARSET|CHARACTER\s+SET)\s*=?\s*\w+", re.IGNORECASE), ""),
+    (re.compile(r"\bCOLLATE\s*=?\s*\w+", re.IGNORECASE), ""),
+    (re.compile(r"\bUNSIGNED\b", re.IGNORECASE), ""),
+    (re.compile(r"\bON\s+UPDATE\s+CURRENT_TIMESTAMP(?:\(\))?", re.IGNORECASE), ""),
+    # 인라인 인덱스 정의는 expand_inline_indexes에서 별도 CREATE INDEX로 생성
+    (re.compile(r",\s*(?:UNIQUE\s+|FULLTEXT\s+|SPATIAL\s+)?(?:KEY|INDEX)\s+[\w\"]*\s*\((?:[^()]|\(\d+\))*\)", re.IGNORECASE), ""),
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.IGNORECASE), "INSERT OR IGNORE"),
+    (re.compile(r"\bLIMIT\s+(\d+)\s*,\s*(\d+)", re.IGNORECASE), r"LIMIT \2 OFFSET \1"),
+    (re.compile(r"\bLAST_INSERT_ID\s*\(\s*\)", re.IGNORECASE), "last_insert_rowid()"),
+]
+_SKIPPED_STATEMENTS = re.compile(
+    r"^\s*(?:SET|USE|LOCK|UNLOCK|CREATE\s+DATABASE|CREATE\s+SCHEMA|DROP\s+DATABASE|START\s+TRANSACTION|COMMIT|BEGIN)\b",
+    re.IGNORECASE
+)
+_SETUP_STATEMENTS = re.compile(r"^\s*(?:CREATE|INSERT|REPLACE|ALTER|DROP\s+TABLE)\b", re.IGNORECASE)
+
+
+def translate_mysql(sql: str) -> str:
+    """자주 쓰이는 MariaDB/MySQL 문법을 SQLite에서 실행 가능한 형태로 변환합니다."""
+    sql = _ENUM_TYPE.sub("TEXT", sql)
+    sql = _COMMENT_CLAUSE.sub("", sql)
+    sql = _AUTO_INCREMENT_COLUMN.sub(r"INTEGER\1", sql)
+
+    parts = _STRING_LITERAL.split(sql)
+    for i, part in enumerate(parts):
+        if i % 2:
+            # 문자열 리터럴: MySQL 백슬래시 이스케이프만 SQLite 방식으로 변환
+            parts[i] = part.replace("\\'", "''")
+            continue
+        for pattern, repl in _DIALECT_RULES:
+            part = pattern.sub(repl, part)
+        parts[i] = part
+    return "".join(parts)
+
+
+def split_statements(sql: str) -> List[str]:
+    """세미콜론 기준으로 완결된 SQL 문장 목록을 반환합니다 (문자열 내부 세미콜론 고려)."""
+    statements = []
+    buffer = ""
+    for piece in sql.split(";"):
+        buffer += piece + ";"
+        if sqlite3.complete_statement(buffer):
+            statement = buffer.strip().rstrip(";").strip()
+            if statement:
+                statements.append(statement)
+            buffer = ""
+    tail = buffer.rstrip(";").strip()
+    if tail:
+        statements.append(tail)
+    return statements
+
+
+_CREATE_TABLE_NAME = re.compile(r"^\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?[`\"]?(\w+)[`\"]?", re.IGNORECASE)
+_INLINE_INDEX = re.compile(
+    r",\s*(UNIQUE\s+)?(?:KEY|INDEX)\s+[`\"]?(\w*)[`\"]?\s*\(([^()]*(?:\(\d+\)[^()]*)*)\)",
+    re.IGNORECASE
+)
+
+
+def expand_inline_indexes(statement: str) -> List[str]:
+    """
+    CREATE TABLE 안의 MySQL 인라인 KEY/INDEX 정의를 별도의 CREATE INDEX 문장으로 변환합니다.
+    (SQLite는 인라인 인덱스를 지원하지 않으므로 translate_mysql에서는 제거됩니다)
+    """
+    match = _CREATE_TABLE_NAME.match(statement)
+    if not match:
+        return []
+    table = match.group(1)
+    indexes = []
+    for unique, name, columns in _INLINE_INDEX.findall(_COMMENT_CLAUSE.sub("", statement)):
+        columns = re.sub(r"\(\d+\)", "", columns).replace("`", '"')
+        index_name = f"{table}_{name or 'idx'}_{len(indexes)}"
+        indexes.append(f'CREATE {"UNIQUE " if unique else ""}INDEX "{index_name}" ON "{table}" ({columns})')
+    return indexes
+
+
+def extract_setup_statements(context: str) -> List[str]:
+    """context에서 스키마(DDL)와 시드 데이터(INSERT) 문장만 추출합니다."""
+    statements = []
+    for statement in split_statements(context or ""):
+        # 문장 앞에 섞인 설명 문구는 첫 SQL 키워드부터 잘라냅니다.
+        match = re.search(r"\b(CREATE|INSERT|REPLACE|ALTER|DROP)\b", statement, re.IGNORECASE)
+        if not match:
+            continue
+        statement = statement[match.start():]
+        if _SKIPPED_STATEMENTS.match(statement) or not _SETUP_STATEMENTS.match(statement):
+            continue
+        statements.append(statement)
+    return statements
+
+
+# ===== MySQL 함수 호환 =====
+def _concat(*args):
+    if any(arg is None for arg in args):
+        return None
+    return "".join(str(arg) for arg in args)
+
+
+def _concat_ws(sep, *args):
+    if sep is None:
+        return None
+    return str(sep).join(str(arg) for arg in args if arg is not None)
+
+
+def _date_part(index: int):
+    def extract(value):
+        if value is None:
+            return None
+        try:
+            return int(str(value)[:10].split("-")[index])
+        except (ValueError, IndexError):
+            return None
+    return extract
+
+
+_MYSQL_FUNCTIONS = [
+    ("NOW", 0, lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+    ("CURDATE", 0, lambda: date.today().isoformat()),
+    ("CONCAT", -1, _concat),
+    ("CONCAT_WS", -1, _concat_ws),
+    ("YEAR", 1, _date_part(0)),
+    ("MONTH", 1, _date_part(1)),
+    ("DAY", 1, _date_part(2)),
+]
+
+# 연결별 SQLite 한도 (사용자 SQL 이 API 프로세스 메모리를 과도하게 쓰지 않도록)
+_CONNECTION_LIMITS = [
+    ("SQLITE_LIMIT_LENGTH", 1_000_000),          # 문자열 / BLOB / 행 하나의 최대 바이트
+    ("SQLITE_LIMIT_SQL_LENGTH", 1_000_000),
+    ("SQLITE_LIMIT_COLUMN", 200),
+    ("SQLITE_LIMIT_EXPR_DEPTH", 200),
+    ("SQLITE_LIMIT_COMPOUND_SELECT", 100),
+    ("SQLITE_LIMIT_FUNCTION_ARG", 32),
+    ("SQLITE_LIMIT_ATTACHED", 0),
+    ("SQLITE_LIMIT_LIKE_PATTERN_LENGTH", 1000),
+    ("SQLITE_LIMIT_VARIABLE_NUMBER", 1000),
+    ("SQLITE_LIMIT_TRIGGER_DEPTH", 10),
+]
+
+
+def create_connection() -> sqlite3.Connection:
+    """MySQL 호환 함수가 등록되고 길이 / 깊이 한도가 적용된 인메모리 SQLite 연결을 생성합니다."""
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    for name, num_args, func in _MYSQL_FUNCTIONS:
+        conn.create_function(name, num_args, func)
+    if hasattr(conn, "setlimit"):  # Python 3.11+
+        for name, value in _CONNECTION_LIMITS:
+            conn.setlimit(getattr(sqlite3, name), value)
+    return conn
+
+
+def limit_database_size(conn: sqlite3.Connection, max_bytes: int):
+    """
+    main / temp DB 의 페이지 수 상한 (초과 시 SQLITE_FULL).
+    deserialize 는 main DB 를 교체하므로 그 뒤에 호출하고, PRAGMA 를 막는 authorizer 보다 먼저 호출합니다.
+    """
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    pages = max(1, max_bytes // page_size)
+    for schema in ("main", "temp"):
+        conn.execute(f"PRAGMA {schema}.max_page_count = {pages}")
+
+
+class QueryDeadline:
+    """progress handler 로 거는 실행 시간 제한 (초과하면 SQLite 가 interrupted 로 중단)"""
+
+    def __init__(self, timeout_ms: int):
+        self.deadline = time.perf_counter() + timeout_ms / 1000
+        self.timed_out = False
+
+    def __call__(self) -> int:
+        if time.perf_counter() > self.deadline:
+            self.timed_out = True
+            return 1
+        return 0
+
+    @property
+    def expired(self) -> bool:
+        return time.perf_counter() > self.deadline
+
+
+# 샌드박스: 다른 DB 파일 접근 및 PRAGMA 변경 차단
+_DENIED_ACTIONS = {sqlite3.SQLITE_ATTACH, sqlite3.SQLITE_DETACH, sqlite3.SQLITE_PRAGMA}
+
+
+def _authorizer(action, arg1, arg2, db_name, trigger):
+    if action in _DENIED_ACTIONS:
+        return sqlite3.SQLITE_DENY
+    if action == sqlite3.SQLITE_FUNCTION and arg2 and arg2.lower() == "load_extension":
+        return sqlite3.SQLITE_DENY
+    return sqlite3.SQLITE_OK
+
+
+def _to_json_value(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+
+class SQLExecutionEngine:
+    """
+    context의 DDL/INSERT로 인메모리 SQLite DB를 만들어 사용자 쿼리를 실제로 실행합니다.
+
+    - 스키마/시드가 적용된 DB 이미지는 context 해시 기준 LRU로 캐시 (개수와 총 바이트 모두 제한)
+    - 요청마다 이미지를 복제한 연결에서 실행하므로 DML이 캐시를 오염시키지 않음
+    - 전용 워커 스레드에서 행 수/시간 제한과 authorizer를 걸고 실행
+    """
+
+    def __init__(self, cache_size: int = 64, row_limit: int = 1000, timeout_ms: int = 2000, max_workers: int = 4,
+                 max_db_bytes: int = 64 * 1024 * 1024, cache_bytes: int = 256 * 1024 * 1024):
+        self.cache_size = cache_size
+        self.cache_bytes = cache_bytes
+        self.row_limit = row_limit
+        self.timeout_ms = timeout_ms
+        self.max_db_bytes = max_db_bytes
+        self._images: "OrderedDict[str, bytes]" = OrderedDict()
+        self._image_bytes = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sql-engine")
+
+    def _sandbox(self, conn: sqlite3.Connection) -> QueryDeadline:
+        """DB 크기 상한 → authorizer → 시간 제한 순으로 겁니다 (context 문장과 사용자 쿼리 모두 이 상태에서 실행)."""
+        conn.set_authorizer(None)
+        limit_database_size(conn, self.max_db_bytes)
+        deadline = QueryDeadline(self.timeout_ms)
+        conn.set_authorizer(_authorizer)
+        conn.set_progress_handler(deadline, 1000)
+        return deadline
+
+    def _build(self, context: str) -> sqlite3.Connection:
+        conn = create_connection()
+        deadline = self._sandbox(conn)
+        for statement in extract_setup_statements(context):
+            for sql in [translate_mysql(statement)] + expand_inline_indexes(statement):
+                try:
+                    conn.execute(sql)
+                except sqlite3.Error as e:
+                    logger.debug(f"context 문장 적용 실패, 건너뜀: {e} | {sql[:80]}")
+                if deadline.timed_out:
+                    conn.close()
+                    raise SQLExecutionUnsupported(f"context setup exceeded the {self.timeout_ms}ms execution limit")
+        conn.commit()
+        return conn
+
+    def _get_connection(self, context: str) -> sqlite3.Connection:
+        """
+        context 해시로 캐시된 DB 이미지를 복제해 새 연결을 반환합니다.
+
+        Raises:
+            SQLExecutionUnsupported: context 문장이 시간 제한을 넘김 (캐시하지 않음)
+        """
+        if not context or not hasattr(sqlite3.Connection, "serialize"):
+            return self._build(context)
+
+        key = hashlib.sha256((context or "").encode("utf-8")).hexdigest()
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+
+        if image is None:
+            conn = self._build(context)
+            # serialize 가 내부적으로 쓰는 PRAGMA 를 authorizer 가 막으므로 잠시 해제 (execute 에서 다시 겁니다)
+            conn.set_authorizer(None)
+            try:
+                image = conn.serialize()
+            except sqlite3.OperationalError:
+                # context에 적용된 스키마가 없으면 직렬화할 페이지도 없습니다.
+                return conn
+            self._cache_image(key, image)
+            return conn
+
+        conn = create_connection()
+        conn.deserialize(image)
+        return conn
+
+    def _cache_image(self, key: str, image: bytes):
+        """이미지를 캐시에 넣고 개수 / 총 바이트 상한을 넘는 만큼 오래된 것부터 버립니다."""
+        if len(image) > self.cache_bytes:
+            # 혼자서 예산을 넘는 이미지는 다른 이미지를 모두 밀어내므로 캐시하지 않음
+            return
+        with self._lock:
+            previous = self._images.pop(key, None)
+            if previous is not None:
+                self._image_bytes -= len(previous)
+            self._images[key] = image
+            self._image_bytes += len(image)
+            while len(self._images) > self.cache_size or self._image_bytes > self.cache_bytes:
+                _, evicted = self._images.popitem(last=False)
+                self._image_bytes -= len(evicted)
+
+    def warm(self, context: str) -> bool:
+        """context DB 이미지를 미리 만들어 캐시에 넣습니다 (캐시 예열용)."""
+        if not context:
+            return False
+        try:
+            self._get_connection(context).close()
+        except SQLExecutionUnsupported:
+            return False
+        return True
+
+    def execute(self, query: str, context: str = "") -> Dict[str, Any]:
+        """
+        쿼리를 로컬에서 실행하고 결과를 반환합니다.
+
+        Raises:
+            SQLExecutionUnsupported: SQLite에서 실행할 수 없는 쿼리 (LLM 대체 필요)
+        """
+        statements = [translate_mysql(s) for s in split_statements(query)]
+        if not statements:
+            raise SQLExecutionUnsupported("실행할 SQL 문장이 없습니다")
+
+        conn = self._get_connection(context)
+        # context 적용과 별개로 사용자 쿼리에 새 시간 제한 (복제한 연결은 DB 크기 상한도 다시 걸어야 함)
+        deadline = self._sandbox(conn)
+        started = time.perf_counter()
+        try:
+            cursor = None
+            for statement in statements:
+                cursor = conn.execute(statement)
+            rows = cursor.fetchmany(self.row_limit + 1) if cursor.description else []
+            columns = [col[0] for col in cursor.description] if cursor.description else []
+            affected = cursor.rowcount if not cursor.description else None
+        except sqlite3.Error as e:
+            if deadline.timed_out:
+                return {
+                    "success": False,
+                    "data": [],
+                    "row_count": 0,
+                    "execution_time_ms": self.timeout_ms,
+                    "query_explanation": f"Query exceeded the {self.timeout_ms}ms execution limit"
+                }
+            raise SQLExecutionUnsupported(str(e)) from e
+        finally:
+            conn.close()
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+        truncated = len(rows) > self.row_limit
+        rows = rows[:self.row_limit]
+        result = {
+            "success": True,
+            "data": [{col: _to_json_value(val) for col, val in zip(columns, row)} for row in rows],
+            "row_count": len(rows) if columns else max(affected or 0, 0),
+            "execution_time_ms": elapsed_ms,
+            "query_explanation": "Executed locally on an in-memory SQLite database built from the provided context",
+            "columns": columns,
+        }
+        if truncated:
+            result["truncated"] = True
+        return result
+
+    async def execute_async(self, query: str, context: str = "") -> Dict[str, Any]:
+        """이벤트 루프를 막지 않도록 전용 워커 스레드에서 execute를 실행합니다."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.execute, query, context)
+
+
+sql_engine = SQLExecutionEngine(
+    cache_size=settings.SQL_ENGINE_CACHE_SIZE,
+    row_limit=settings.SQL_ENGINE_ROW_LIMIT,
+    timeout_ms=settings.SQL_ENGINE_TIMEOUT_MS,
+    max_workers=settings.SQL_ENGINE_WORKERS,
+    max_db_bytes=settings.SQL_ENGINE_MAX_DB_MB * 1024 * 1024,
+    cache_bytes=settings.SQL_ENGINE_CACHE_MB * 1024 * 1024
+)
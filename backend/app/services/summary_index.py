@@ -0,0 +1,264 @@
+"""
+글 / 섹션 단위 요약 인덱스 (summary-first 검색용).
+
+- 활성 스냅샷의 원본 글마다 blog_summary 프롬프트로 요약을 만들고, 긴 섹션(SUMMARY_SECTION_MIN_CHARS 이상)은 섹션별로도 요약
+- 요약은 (단위, 제목, 본문) sha256 기준으로 <persist_directory>/summaries.sqlite3 에 캐시 → 재인덱싱 시 바뀐 글만 다시 생성
+- LLM 호출은 background 우선순위로, 초당 SUMMARY_RATE_PER_S 개 이하로 실행 (실시간 요청과 경쟁하지 않음)
+- 모두 끝나면 스냅샷 디렉터리에 배치마다 새 이름의 컬렉션(summaries_<batch>)을 기록하고 summaries.json 마커에 이름을 남김
+  → 각 워커는 마커가 가리키는 컬렉션을 열며, 읽고 있는 컬렉션은 고쳐 쓰지 않으므로 검색 중에 바뀌지 않음
+  → 기록 / 마커 교체는 코퍼스 빌드 잠금(SnapshotStore.build_lock) 안에서 실행 (증분 빌드의 스냅샷 복사와 겹치지 않음)
+  → 직전 배치의 컬렉션은 다른 워커가 아직 읽을 수 있으므로 다음 배치까지 남기고, 그보다 오래된 것만 삭제
+
+CLI:
+    python -m app.services.summary_index [--corpus blog]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from app.core.config import settings
+from app.core.groq_client import call_groq_with_yaml
+from app.core.llm_scheduler import BACKGROUND, llm_priority
+from app.services.doc_metadata import headings_index
+from app.services.index_snapshots import hnsw_metadata, load_posts
+from app.utils.prompt_loader import get_prompt
+from app.utils.token_counter import render_prompt_within_budget
+
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_COLLECTION = "summaries"
+SUMMARY_MARKER = "summaries.json"
+
+
+def read_marker(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(path, SUMMARY_MARKER), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def marker_collection(marker: Dict[str, Any]) -> Optional[str]:
+    """마커가 가리키는 요약 컬렉션 이름 (요약이 0개면 None, 이름이 없는 이전 형식의 마커는 고정 이름)"""
+    if "collection" in marker:
+        return marker["collection"]
+    return SUMMARY_COLLECTION
+
+
+def summary_units(posts: List[Document], section_min_chars: int) -> List[Document]:
+    """요약할 단위: 글 전체 + 긴 섹션 (메타데이터는 글의 것을 그대로 복사해 필터가 요약에도 적용되도록 함)"""
+    units = []
+    for post in posts:
+        body = post.page_content.strip()
+        if not body:
+            continue
+        units.append(Document(page_content=body, metadata={**post.metadata, "level": "post"}))
+        headings = headings_index(post.page_content)
+        if len(headings) < 2:
+            continue
+        bounds = [start for start, _ in headings] + [len(post.page_content)]
+        for (start, title), end in zip(headings, bounds[1:]):
+            section = post.page_content[start:end].strip()
+            if len(section) >= section_min_chars:
+                units.append(Document(page_content=section, metadata={**post.metadata, "level": "section", "heading": title}))
+    return units
+
+
+def unit_key(unit: Document) -> str:
+    digest = hashlib.sha256()
+    for part in (unit.metadata["level"], unit.metadata.get("heading") or "", unit.page_content):
+        digest.update(part.encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    """내용 해시 → 요약 (스냅샷 버전과 무관하게 재사용)"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, summary TEXT, created_at REAL)")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, summary: str):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, created_at) VALUES (?, ?, ?)", (key, summary, time.time())
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def summarize(content: str) -> str:
+    prompt_data = get_prompt("blog_rag_prompts.yaml", "blog_summary")
+    system_prompt = prompt_data.get("system", "")
+    user_prompt, estimated_tokens = render_prompt_within_budget(
+        "blog_summary", system_prompt, prompt_data.get("user", ""), {"content": content}, truncatable=("content",)
+    )
+    result = call_groq_with_yaml(
+        system_prompt, user_prompt,
+        estimated_tokens=estimated_tokens,
+        section="blog_summary",
+        generation=prompt_data.get("generation")
+    )
+    return (result if isinstance(result, str) else json.dumps(result, ensure_ascii=False)).strip()
+
+
+def summary_document(unit: Document, summary: str) -> Document:
+    title = unit.metadata.get("title") or unit.metadata.get("post")
+    label = f"{title} > {unit.metadata['heading']}" if unit.metadata["level"] == "section" else title
+    return Document(page_content=f"[요약] {label}\n{summary}", metadata={**unit.metadata, "summary": True})
+
+
+class SummaryIndexer:
+    """코퍼스별 요약 생성 배치 (코퍼스당 한 번에 하나, 백그라운드 스레드)"""
+
+    def __init__(self, rate_per_s: float, section_min_chars: int):
+        self.rate_per_s = rate_per_s
+        self.section_min_chars = section_min_chars
+        self._lock = threading.Lock()
+        self._running: Dict[str, threading.Thread] = {}
+        self.status: Dict[str, Dict[str, Any]] = {}
+
+    def schedule(self, corpus) -> bool:
+        """요약 배치를 백그라운드로 시작합니다. 이미 실행 중이면 False."""
+        with self._lock:
+            thread = self._running.get(corpus.name)
+            if thread is not None and thread.is_alive():
+                return False
+            thread = threading.Thread(target=self._run_safely, args=(corpus,), name=f"summary-{corpus.name}", daemon=True)
+            self._running[corpus.name] = thread
+        thread.start()
+        return True
+
+    def _run_safely(self, corpus):
+        try:
+            self.run(corpus)
+        except Exception as e:
+            logger.exception(f"요약 인덱스 생성 실패 ({corpus.name}): {e}")
+            self.status[corpus.name] = {**self.status.get(corpus.name, {}), "state": "failed", "error": str(e)}
+
+    def run(self, corpus) -> Dict[str, Any]:
+        # 배치 동안 대상 버전을 빌려 둠 (그 사이 리더가 교체되어도 기록이 끝날 때까지 인덱스를 해제하지 않음)
+        with corpus.lease() as (version, _):
+            return self._run(corpus, version)
+
+    def _run(self, corpus, version: str) -> Dict[str, Any]:
+        from langchain_chroma import Chroma
+
+        path = corpus.snapshots.path(version)
+        units = summary_units(load_posts(corpus.data_dir), self.section_min_chars)
+        status = {
+            "state": "running", "version": version, "units": len(units),
+            "generated": 0, "reused": 0, "failed": 0, "started_at": time.time(),
+        }
+        self.status[corpus.name] = status
+
+        cache = SummaryCache(os.path.join(corpus.persist_directory, "summaries.sqlite3"))
+        interval = 1 / self.rate_per_s if self.rate_per_s > 0 else 0
+        documents = []
+        try:
+            for unit in units:
+                key = unit_key(unit)
+                summary = cache.get(key)
+                if summary is not None:
+                    status["reused"] += 1
+                else:
+                    started = time.monotonic()
+                    try:
+                        with llm_priority(BACKGROUND, client="summary-indexer"):
+                            summary = summarize(unit.page_content)
+                        cache.put(key, summary)
+                        status["generated"] += 1
+                    except Exception as e:
+                        status["failed"] += 1
+                        logger.warning(f"요약 생성 실패 ({unit.metadata.get('post')}): {e}")
+                    time.sleep(max(0.0, interval - (time.monotonic() - started)))
+                if summary:
+                    documents.append(summary_document(unit, summary))
+        finally:
+            cache.close()
+
+        collection = f"{SUMMARY_COLLECTION}_{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        with corpus.snapshots.build_lock():
+            if corpus.snapshots.manifest(version) is None and path != corpus.persist_directory:
+                # 배치 중에 정리(prune)된 버전
+                status.update(state="skipped", finished_at=time.time())
+                logger.info(f"요약 인덱스 기록 건너뜀 ({corpus.name}/{version}): 스냅샷이 삭제됨")
+                return status
+            if documents:
+                # 읽는 중인 컬렉션을 건드리지 않도록 새 이름으로 기록한 뒤 마커만 교체
+                Chroma.from_documents(
+                    documents=documents, embedding=corpus.embeddings, persist_directory=path,
+                    collection_name=collection, collection_metadata=hnsw_metadata()
+                )
+            previous = read_marker(path)
+            status.update(
+                state="done", summaries=len(documents), finished_at=time.time(),
+                collection=collection if documents else None,
+            )
+            tmp = os.path.join(path, SUMMARY_MARKER + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(status, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, os.path.join(path, SUMMARY_MARKER))
+            keep = {collection, marker_collection(previous) if previous else None}
+            self._drop_stale(path, keep)
+        corpus.refresh_summaries()
+        logger.info(f"요약 인덱스 생성 완료 ({corpus.name}/{version}): {status}")
+        return status
+
+    @staticmethod
+    def _drop_stale(path: str, keep: set):
+        """
+        새 컬렉션과 직전 컬렉션을 제외한 요약 컬렉션을 삭제합니다
+        (이전 배치 / 증분 빌드로 기준 버전에서 복사되어 온 것).
+        """
+        import chromadb
+
+        client = chromadb.PersistentClient(path=path)
+        for item in client.list_collections():
+            name = getattr(item, "name", item)
+            if name.startswith(SUMMARY_COLLECTION) and name not in keep:
+                try:
+                    client.delete_collection(name)
+                except Exception as e:
+                    logger.warning(f"이전 요약 컬렉션 삭제 실패 ({path}/{name}): {e}")
+
+
+summary_indexer = SummaryIndexer(
+    rate_per_s=settings.SUMMARY_RATE_PER_S,
+    section_min_chars=settings.SUMMARY_SECTION_MIN_CHARS,
+)
+
+
+def main():
+    from app.services.corpus_registry import corpus_registry
+
+    parser = argparse.ArgumentParser(description="Generate per-post / per-section summaries for the active snapshot")
+    parser.add_argument("--corpus", default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(summary_indexer.run(corpus_registry.get(args.corpus)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
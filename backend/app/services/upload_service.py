@@ -0,0 +1,633 @@
+"""
+블로그 글 업로드: 스트리밍 저장 → 검증 → 내용 해시 중복 제거 → 업로드한 문서만 증분 인덱싱.
+
+- 요청 바디(raw 또는 multipart/form-data)를 buffer_bytes 단위로 모아 스테이징 파일에 바로 기록
+  (바디 전체를 메모리에 두지 않음, 디스크 기록 / sha256 / multipart 파싱은 스레드 풀에서 실행)
+- 지원 형식: .md / .markdown 파일, .zip / .tar / .tar.gz / .tgz 아카이브 (아카이브 안의 마크다운만 사용)
+- 검증: 확장자, UTF-8, 빈 파일, 요청 / 파일당 / 압축 해제 총량 크기, 파일 수, 아카이브 항목 수, 아카이브 경로 탈출(../, 숨김 경로) 차단
+- 중복 제거: 코퍼스 data_dir 의 기존 글과 sha256 이 같으면 건너뜀
+  (기존 글 해시는 <persist_directory>/uploads.sqlite3 에 크기 / mtime 기준으로 캐시 → 바뀐 파일만 다시 계산)
+- 같은 경로의 기존 글은 overwrite=True 일 때만 교체, 인덱싱은 추가 / 교체된 파일만 (BlogRAGService.index_files)
+- 중복 검사 → 저장 → 인덱싱은 코퍼스별로 워커 간에도 하나씩 (<persist_directory>/.upload.lock flock)
+  인덱싱이 실패하면 옮긴 글을 지우고 교체한 글을 복원하며, 해시는 인덱싱이 끝난 글만 기록
+- 메모리 사용량은 업로드 크기와 무관 (버퍼 1개 + 파일 복사 청크 + zip 목차(max_entries 이하)),
+  tar 는 항목을 하나씩 읽고 버리며, 거절 항목은 처음 REJECTED_SAMPLE 개만 응답에 담고 나머지는 개수만 셈
+"""
+import asyncio
+import codecs
+import contextlib
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+MARKDOWN_SUFFIXES = (".md", ".markdown")
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz")
+_COPY_CHUNK = 1024 * 1024
+_MAX_PART_HEADER_BYTES = 16 * 1024
+UPLOAD_LOCK = ".upload.lock"
+REJECTED_SAMPLE = 100
+
+
+class UploadError(Exception):
+    """업로드 거절 (status_code: 400 잘못된 요청, 413 크기 / 개수 초과, 415 지원하지 않는 형식)"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class Rejections:
+    """거절된 파일 / 아카이브 항목: 처음 limit 개만 보관하고 나머지는 개수만 셈"""
+
+    def __init__(self, limit: int = REJECTED_SAMPLE):
+        self.limit = limit
+        self.sample: List[Dict[str, str]] = []
+        self.count = 0
+
+    def add(self, name: str, reason: str):
+        self.count += 1
+        if len(self.sample) < self.limit:
+            self.sample.append({"name": name, "reason": reason})
+
+
+def file_kind(name: str) -> Optional[str]:
+    lower = name.lower()
+    if lower.endswith(MARKDOWN_SUFFIXES):
+        return "markdown"
+    if lower.endswith(ARCHIVE_SUFFIXES):
+        return "archive"
+    return None
+
+
+def safe_relpath(name: str) -> Optional[str]:
+    """아카이브 / 클라이언트가 준 경로를 data_dir 기준 상대 경로로 정규화 (탈출 / 숨김 경로면 None)"""
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".")]
+    if not parts or any(part == ".." or part.startswith(".") or part == "__MACOSX" for part in parts):
+        return None
+    if ":" in parts[0]:
+        return None
+    return "/".join(parts)
+
+
+def markdown_target(relpath: str) -> str:
+    """인덱서는 **/*.md 만 읽으므로 .markdown 은 .md 로 저장"""
+    root, ext = os.path.splitext(relpath)
+    return root + ".md" if ext.lower() in MARKDOWN_SUFFIXES else relpath
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_COPY_CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StagedFile:
+    """스테이징 디렉터리에 기록된 파일 하나"""
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = path
+        self.size = 0
+        self.sha256 = ""
+
+
+class _StagingWriter:
+    """청크를 스테이징 파일에 기록하며 크기 제한 / sha256 / (마크다운이면) UTF-8 검증"""
+
+    def __init__(self, staging_dir: str, name: str, max_bytes: int, text: bool):
+        fd, path = tempfile.mkstemp(dir=staging_dir, suffix=".part")
+        self.file = os.fdopen(fd, "wb")
+        self.staged = StagedFile(name, path)
+        self.max_bytes = max_bytes
+        self._digest = hashlib.sha256()
+        self._decoder = codecs.getincrementaldecoder("utf-8")() if text else None
+
+    def write(self, data: bytes):
+        self.staged.size += len(data)
+        if self.staged.size > self.max_bytes:
+            raise UploadError(f"file too large: {self.staged.name} (limit {self.max_bytes} bytes)", 413)
+        if self._decoder is not None:
+            try:
+                self._decoder.decode(data)
+            except UnicodeDecodeError:
+                raise UploadError(f"not UTF-8 text: {self.staged.name}", 400)
+        self._digest.update(data)
+        self.file.write(data)
+
+    def close(self) -> StagedFile:
+        self.file.close()
+        if self._decoder is not None:
+            try:
+                self._decoder.decode(b"", final=True)
+            except UnicodeDecodeError:
+                raise UploadError(f"not UTF-8 text: {self.staged.name}", 400)
+            if self.staged.size == 0:
+                raise UploadError(f"empty file: {self.staged.name}", 400)
+        self.staged.sha256 = self._digest.hexdigest()
+        return self.staged
+
+    def abort(self):
+        self.file.close()
+        _remove(self.staged.path)
+
+
+@contextlib.contextmanager
+def _file_lock(path: str):
+    """프로세스 간 배타 잠금 (워커마다 따로인 threading 잠금만으로는 중복 검사 → 저장이 겹칠 수 있음)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class UploadReceiver:
+    """
+    요청 바디 청크를 스테이징 파일로 기록합니다 (feed / finish / discard 는 한 번에 한 스레드에서 순서대로 호출).
+    - multipart/form-data: filename 이 있는 파트만 파일로 저장 (일반 필드는 무시)
+    - 그 외: 바디 전체가 filename 파일 하나
+    """
+
+    def __init__(self, content_type: str, filename: Optional[str], staging_dir: str,
+                 max_bytes: int, max_file_bytes: int, max_files: int):
+        self.staging_dir = staging_dir
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.received = 0
+        self.files: List[StagedFile] = []
+        self.rejected = Rejections()
+        self._writer: Optional[_StagingWriter] = None
+        self._parser: Optional[MultipartParser] = None
+
+        mime, params = parse_options_header(content_type or "")
+        if mime == b"multipart/form-data":
+            boundary = params.get(b"boundary")
+            if not boundary:
+                raise UploadError("missing multipart boundary", 400)
+            self._headers: Dict[bytes, bytes] = {}
+            self._field = b""
+            self._value = b""
+            self._header_bytes = 0
+            self._parser = MultipartParser(boundary, {
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+            })
+        else:
+            if not filename:
+                raise UploadError("filename query parameter is required for non-multipart uploads", 400)
+            name = os.path.basename(filename.replace("\\", "/"))
+            if file_kind(name) is None:
+                raise UploadError(f"unsupported file type: {name}", 415)
+            self._open(name)
+
+    def _open(self, name: str):
+        if len(self.files) >= self.max_files:
+            raise UploadError(f"too many files (limit {self.max_files})", 413)
+        kind = file_kind(name)
+        max_bytes = self.max_bytes if kind == "archive" else self.max_file_bytes
+        self._writer = _StagingWriter(self.staging_dir, name, max_bytes, text=kind == "markdown")
+
+    # ---- multipart callbacks ----
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._header_bytes = 0
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._field += data[start:end]
+        self._count_header(end - start)
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._value += data[start:end]
+        self._count_header(end - start)
+
+    def _count_header(self, size: int):
+        self._header_bytes += size
+        if self._header_bytes > _MAX_PART_HEADER_BYTES:
+            raise UploadError("multipart part headers too large", 400)
+
+    def _on_header_end(self):
+        self._headers[self._field.lower()] = self._value
+        self._field = b""
+        self._value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        filename = options.get(b"filename")
+        if not filename:
+            self._writer = None
+            return
+        name = os.path.basename(filename.decode("utf-8", errors="replace").replace("\\", "/"))
+        if file_kind(name) is None:
+            self.rejected.add(name, "unsupported file type")
+            self._writer = None
+            return
+        self._open(name)
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._writer is None:
+            return
+        try:
+            self._writer.write(data[start:end])
+        except UploadError as e:
+            if file_kind(self._writer.staged.name) == "archive":
+                raise
+            # 마크다운 파트 하나의 문제는 그 파일만 거절하고 나머지 파트는 계속 받음
+            self.rejected.add(self._writer.staged.name, str(e))
+            self._writer.abort()
+            self._writer = None
+
+    def _on_part_end(self):
+        if self._writer is None:
+            return
+        writer, self._writer = self._writer, None
+        try:
+            self.files.append(writer.close())
+        except UploadError as e:
+            self.rejected.add(writer.staged.name, str(e))
+            _remove(writer.staged.path)
+
+    # ---- 스트림 ----
+
+    def feed(self, data: bytes):
+        self.received += len(data)
+        if self.received > self.max_bytes:
+            raise UploadError(f"request body too large (limit {self.max_bytes} bytes)", 413)
+        if self._parser is not None:
+            try:
+                self._parser.write(data)
+            except MultipartParseError as e:
+                raise UploadError(f"invalid multipart body: {e}", 400)
+        elif self._writer is not None:
+            self._writer.write(data)
+
+    def finish(self) -> List[StagedFile]:
+        if self._parser is not None:
+            try:
+                self._parser.finalize()
+            except MultipartParseError as e:
+                raise UploadError(f"invalid multipart body: {e}", 400)
+            if self._writer is not None:
+                raise UploadError("truncated multipart body", 400)
+        elif self._writer is not None:
+            writer, self._writer = self._writer, None
+            self.files.append(writer.close())
+        return self.files
+
+    def discard(self):
+        """남아 있는 스테이징 파일 삭제 (성공 시 data_dir 로 옮겨진 파일은 이미 없음)"""
+        if self._writer is not None:
+            self._writer.abort()
+            self._writer = None
+        for staged in self.files:
+            _remove(staged.path)
+
+
+class ContentHashIndex:
+    """data_dir 아래 마크다운의 상대 경로 → (크기, mtime, sha256) 캐시"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT)"
+        )
+        self._db.commit()
+
+    def scan(self, data_dir: str) -> Dict[str, str]:
+        """현재 글들의 sha256 → 상대 경로 (크기 / mtime 이 그대로인 파일은 다시 읽지 않음)"""
+        cached = {row[0]: row[1:] for row in self._db.execute("SELECT path, size, mtime_ns, sha256 FROM files")}
+        hashes: Dict[str, str] = {}
+        seen = set()
+        for root, dirs, names in os.walk(data_dir):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in names:
+                if not name.endswith(".md"):
+                    continue
+                full = os.path.join(root, name)
+                relpath = os.path.relpath(full, data_dir).replace(os.sep, "/")
+                stat = os.stat(full)
+                row = cached.get(relpath)
+                if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+                    sha256 = row[2]
+                else:
+                    sha256 = file_sha256(full)
+                    self.put(relpath, full, sha256)
+                seen.add(relpath)
+                hashes.setdefault(sha256, relpath)
+        missing = [(path,) for path in cached if path not in seen]
+        if missing:
+            self._db.executemany("DELETE FROM files WHERE path = ?", missing)
+        self._db.commit()
+        return hashes
+
+    def put(self, relpath: str, full: str, sha256: str):
+        stat = os.stat(full)
+        self._db.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+            (relpath, stat.st_size, stat.st_mtime_ns, sha256)
+        )
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+
+class UploadService:
+    def __init__(self, staging_dir: str, max_bytes: int, max_file_bytes: int, max_files: int,
+                 max_expanded_bytes: int, buffer_bytes: int, max_entries: int = 50000):
+        """
+        Args:
+            max_entries: 아카이브 하나의 항목 수 상한 (디렉터리 / 거절되는 항목 포함)
+        """
+        self.staging_dir = staging_dir
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.max_expanded_bytes = max_expanded_bytes
+        self.max_entries = max_entries
+        self.buffer_bytes = buffer_bytes
+        # 코퍼스별로 중복 검사 → 저장 → 인덱싱을 하나씩 (같은 내용이 동시에 두 번 들어오지 않도록, 프로세스 간은 _file_lock)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, name: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(name, threading.Lock())
+
+    async def upload(self, corpus, stream: AsyncIterator[bytes], content_type: str, filename: Optional[str] = None,
+                     directory: Optional[str] = None, overwrite: bool = False,
+                     content_length: Optional[int] = None) -> Dict[str, Any]:
+        """
+        요청 바디를 스트리밍으로 받아 코퍼스에 추가하고 업로드한 글만 인덱싱합니다.
+
+        Args:
+            directory: data_dir 아래 저장할 하위 디렉터리 (아카이브는 내부 경로를 그 아래에 유지)
+            overwrite: 같은 경로에 다른 내용의 글이 있으면 교체 (기본은 거절)
+        """
+        if content_length is not None and content_length > self.max_bytes:
+            raise UploadError(f"request body too large (limit {self.max_bytes} bytes)", 413)
+        prefix = ""
+        if directory:
+            prefix = safe_relpath(directory)
+            if prefix is None:
+                raise UploadError(f"invalid directory: {directory}", 400)
+
+        started = time.perf_counter()
+        os.makedirs(self.staging_dir, exist_ok=True)
+        receiver = UploadReceiver(
+            content_type, filename, self.staging_dir, self.max_bytes, self.max_file_bytes, self.max_files
+        )
+        try:
+            buffer = bytearray()
+            async for chunk in stream:
+                buffer += chunk
+                if len(buffer) >= self.buffer_bytes:
+                    data, buffer = bytes(buffer), bytearray()
+                    await asyncio.to_thread(receiver.feed, data)
+            if buffer:
+                await asyncio.to_thread(receiver.feed, bytes(buffer))
+            staged = await asyncio.to_thread(receiver.finish)
+            received_ms = round((time.perf_counter() - started) * 1000, 1)
+            result = await asyncio.to_thread(self._ingest, corpus, staged, prefix, overwrite, receiver.rejected)
+        finally:
+            await asyncio.to_thread(receiver.discard)
+
+        result.update(received_bytes=receiver.received, received_ms=received_ms)
+        logger.info(
+            f"업로드 ({corpus.name}): {receiver.received} bytes, added={len(result['added'])} "
+            f"updated={len(result['updated'])} duplicates={len(result['duplicates'])} rejected={result['rejected_count']}"
+        )
+        return result
+
+    # ---- 압축 해제 / 검증 (스레드 풀) ----
+
+    def _archive_members(self, staged: StagedFile) -> Iterator[Tuple[str, int, Any]]:
+        """
+        (이름, 선언된 크기, 파일 객체를 여는 함수) - 일반 파일만.
+        항목 수가 max_entries 를 넘으면 413 (zip 은 목차를 읽기 전에 끝 레코드의 항목 수로 확인).
+        """
+        entries = 0
+
+        def count():
+            nonlocal entries
+            entries += 1
+            if entries > self.max_entries:
+                raise UploadError(f"too many archive entries (limit {self.max_entries})", 413)
+
+        if staged.name.lower().endswith(".zip"):
+            with open(staged.path, "rb") as f:
+                end = zipfile._EndRecData(f)
+            if end is None:
+                raise zipfile.BadZipFile("end of central directory not found")
+            if end[zipfile._ECD_ENTRIES_TOTAL] > self.max_entries:
+                raise UploadError(f"too many archive entries (limit {self.max_entries})", 413)
+            with zipfile.ZipFile(staged.path) as archive:
+                for info in archive.infolist():
+                    count()
+                    if not info.is_dir():
+                        yield info.filename, info.file_size, lambda info=info: archive.open(info)
+        else:
+            with tarfile.open(staged.path, "r:*") as archive:
+                # 반복자(for member in archive)는 지나간 TarInfo 를 archive.members 에 모두 쌓으므로 next() 로 하나씩
+                while True:
+                    member = archive.next()
+                    if member is None:
+                        break
+                    archive.members = []
+                    count()
+                    if member.isfile():
+                        yield member.name, member.size, lambda member=member: archive.extractfile(member)
+
+    def _copy_member(self, name: str, source: BinaryIO, limit: int) -> StagedFile:
+        writer = _StagingWriter(self.staging_dir, name, limit, text=True)
+        try:
+            for block in iter(lambda: source.read(_COPY_CHUNK), b""):
+                writer.write(block)
+            return writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+
+    def _expand(self, staged: List[StagedFile], prefix: str, extracted: List[StagedFile],
+                rejected: Rejections) -> List[StagedFile]:
+        """업로드 파일 → 저장할 마크다운 목록 (name 은 data_dir 기준 상대 경로)"""
+        documents = []
+        budget = self.max_expanded_bytes
+        count = 0
+        for item in staged:
+            if file_kind(item.name) == "markdown":
+                item.name = markdown_target("/".join(filter(None, (prefix, item.name))))
+                documents.append(item)
+                continue
+            try:
+                for name, size, opener in self._archive_members(item):
+                    relpath = safe_relpath(name)
+                    if relpath is None:
+                        rejected.add(name, "unsafe or hidden path")
+                        continue
+                    if file_kind(relpath) != "markdown":
+                        rejected.add(name, "unsupported file type")
+                        continue
+                    count += 1
+                    if count > self.max_files:
+                        raise UploadError(f"too many files (limit {self.max_files})", 413)
+                    if size > self.max_file_bytes:
+                        rejected.add(name, f"file too large (limit {self.max_file_bytes} bytes)")
+                        continue
+                    if size > budget:
+                        raise UploadError(f"archive expands beyond {self.max_expanded_bytes} bytes", 413)
+                    target = markdown_target("/".join(filter(None, (prefix, relpath))))
+                    try:
+                        with opener() as source:
+                            # 선언된 크기는 믿지 않고 실제 복사량으로 제한 (압축 폭탄)
+                            document = self._copy_member(target, source, min(self.max_file_bytes, budget))
+                    except UploadError as e:
+                        if e.status_code == 413 and budget < self.max_file_bytes:
+                            raise UploadError(f"archive expands beyond {self.max_expanded_bytes} bytes", 413)
+                        rejected.add(name, str(e))
+                        continue
+                    budget -= document.size
+                    extracted.append(document)
+                    documents.append(document)
+            except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+                rejected.add(item.name, f"invalid archive: {e}")
+        return documents
+
+    # ---- 중복 제거 / 저장 / 인덱싱 (스레드 풀) ----
+
+    def _ingest(self, corpus, staged: List[StagedFile], prefix: str, overwrite: bool,
+                rejected: Rejections) -> Dict[str, Any]:
+        extracted: List[StagedFile] = []
+        try:
+            documents = self._expand(staged, prefix, extracted, rejected)
+            with self._lock(corpus.name), _file_lock(os.path.join(corpus.persist_directory, UPLOAD_LOCK)):
+                hashes = ContentHashIndex(os.path.join(corpus.persist_directory, "uploads.sqlite3"))
+                try:
+                    result, moved = self._store(corpus, hashes, documents, overwrite, rejected)
+                    paths = result.pop("paths")
+                    if paths:
+                        try:
+                            corpus.index_files(paths)
+                        except BaseException:
+                            # 인덱싱되지 않은 글이 남아 재시도 시 중복으로 처리되지 않도록 되돌림
+                            self._rollback(moved)
+                            raise
+                    # 해시는 인덱싱이 끝난 글만 기록
+                    for document, target, backup in moved:
+                        hashes.put(document.name, target, document.sha256)
+                        if backup is not None:
+                            _remove(backup)
+                finally:
+                    hashes.close()
+        finally:
+            for document in extracted:
+                _remove(document.path)
+        result["index_version"] = corpus.index_version
+        return result
+
+    def _store(self, corpus, hashes: "ContentHashIndex", documents: List[StagedFile], overwrite: bool,
+               rejected: Rejections) -> Tuple[Dict[str, Any], List[Tuple[StagedFile, str, Optional[str]]]]:
+        """
+        중복이 아닌 글을 data_dir 로 옮깁니다.
+        교체되는 기존 글은 인덱싱이 끝날 때까지 스테이징 디렉터리에 보관합니다 (실패 시 _rollback 으로 복원).
+        """
+        added, updated, duplicates, paths = [], [], [], []
+        moved: List[Tuple[StagedFile, str, Optional[str]]] = []
+        existing = hashes.scan(corpus.data_dir)
+        try:
+            for document in documents:
+                duplicate = existing.get(document.sha256)
+                if duplicate is not None:
+                    duplicates.append({"name": document.name, "existing": duplicate})
+                    continue
+                target = os.path.join(corpus.data_dir, document.name)
+                exists = os.path.exists(target)
+                if exists and not overwrite:
+                    rejected.add(document.name, "already exists (use overwrite=true)")
+                    continue
+                backup = None
+                if exists:
+                    fd, backup = tempfile.mkstemp(dir=self.staging_dir, suffix=".orig")
+                    os.close(fd)
+                    shutil.move(target, backup)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.chmod(document.path, 0o644)
+                shutil.move(document.path, target)
+                moved.append((document, target, backup))
+                existing[document.sha256] = document.name
+                (updated if exists else added).append(document.name)
+                # 인덱스의 source 와 같은 형식 (DirectoryLoader 가 만드는 경로)
+                paths.append(str(Path(corpus.data_dir, document.name)))
+        except BaseException:
+            self._rollback(moved)
+            raise
+        result = {
+            "corpus": corpus.name,
+            "files": len(documents),
+            "added": added,
+            "updated": updated,
+            "duplicates": duplicates,
+            "rejected": rejected.sample,
+            "rejected_count": rejected.count,
+            "indexed": len(paths),
+            "paths": paths,
+        }
+        return result, moved
+
+    def _rollback(self, moved: List[Tuple[StagedFile, str, Optional[str]]]):
+        """옮긴 글을 지우고 교체했던 기존 글을 복원합니다."""
+        for _, target, backup in reversed(moved):
+            try:
+                if backup is not None:
+                    shutil.move(backup, target)
+                else:
+                    _remove(target)
+            except OSError as e:
+                logger.error(f"업로드 되돌리기 실패 ({target}): {e}")
+
+
+upload_service = UploadService(
+    staging_dir=settings.UPLOAD_STAGING_DIR,
+    max_bytes=settings.UPLOAD_MAX_BYTES,
+    max_file_bytes=settings.UPLOAD_MAX_FILE_BYTES,
+    max_files=settings.UPLOAD_MAX_FILES,
+    max_expanded_bytes=settings.UPLOAD_MAX_EXPANDED_BYTES,
+    buffer_bytes=settings.UPLOAD_BUFFER_BYTES,
+    max_entries=settings.UPLOAD_MAX_ARCHIVE_ENTRIES,
+)
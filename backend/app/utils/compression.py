@@ -0,0 +1,207 @@
+import gzip
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+# 압축 대상 content-type (이미지/압축 파일 등은 제외)
+_COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+
+
+def _build_encoders(gzip_level: int, brotli_quality: int, zstd_level: int) -> Dict[str, Callable[[bytes], bytes]]:
+    """서버 선호 순서대로 사용 가능한 인코더를 반환합니다."""
+    encoders: Dict[str, Callable[[bytes], bytes]] = {}
+    if zstandard is not None:
+        # ZstdCompressor는 스레드 간 공유가 안전하지 않으므로 호출마다 생성
+        encoders["zstd"] = lambda body: zstandard.ZstdCompressor(level=zstd_level).compress(body)
+    if brotli is not None:
+        encoders["br"] = lambda body: brotli.compress(body, quality=brotli_quality)
+    encoders["gzip"] = lambda body: gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    return encoders
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Accept-Encoding 헤더를 {encoding: q} 로 파싱합니다."""
+    accepted: Dict[str, float] = {}
+    for item in header.split(","):
+        parts = item.strip().split(";")
+        name = parts[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+class CompressionStats:
+    """압축 처리량과 이벤트 루프 점유 시간을 누적합니다."""
+
+    def __init__(self):
+        self.responses = 0
+        self.offloaded = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.loop_seconds = 0.0
+        self.compress_seconds = 0.0
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "responses": self.responses,
+            "offloaded": self.offloaded,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else 0.0,
+            "compress_mb_per_s": round(self.bytes_in / self.compress_seconds / 1e6, 2) if self.compress_seconds else 0.0,
+            "loop_ms_per_response": round(self.loop_seconds * 1000 / self.responses, 4) if self.responses else 0.0,
+        }
+
+
+class CompressionMiddleware:
+    """
+    Accept-Encoding 협상 기반 응답 압축 미들웨어 (zstd / br / gzip).
+
+    - 스트리밍 응답(첫 body 메시지에 more_body=True)은 압축 없이 그대로 전달
+    - minimum_size 미만 응답은 압축하지 않음
+    - offload_size 이상 응답은 스레드 풀에서 압축하여 이벤트 루프를 막지 않음
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        offload_size: int = 64 * 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+        self.encoders = _build_encoders(gzip_level, brotli_quality, zstd_level)
+        self.stats = compression_stats
+
+    def select_encoding(self, accept_encoding: str) -> Optional[str]:
+        if not accept_encoding:
+            return None
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        best: Optional[Tuple[float, str]] = None
+        for name in self.encoders:
+            q = accepted.get(name, wildcard)
+            if q > 0 and (best is None or q > best[0]):
+                best = (q, name)
+        return best[1] if best else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self.select_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.start_message is None:
+            await self._send(message)
+            return
+
+        headers = Headers(raw=self.start_message["headers"])
+        body = message.get("body", b"")
+        content_type = headers.get("content-type", "")
+        if (
+            message.get("more_body", False)
+            or "content-encoding" in headers
+            or len(body) < self.middleware.minimum_size
+            or not content_type.startswith(_COMPRESSIBLE_TYPES)
+        ):
+            # 스트리밍/이미 인코딩됨/작은 바디/비압축 타입은 그대로 전달
+            self.passthrough = True
+            await self._send(self.start_message)
+            await self._send(message)
+            return
+
+        compressed = await self._compress(body)
+
+        new_headers = MutableHeaders(raw=self.start_message["headers"])
+        new_headers["Content-Encoding"] = self.encoding
+        new_headers["Content-Length"] = str(len(compressed))
+        new_headers.add_vary_header("Accept-Encoding")
+        await self._send(self.start_message)
+        await self._send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+    async def _compress(self, body: bytes) -> bytes:
+        stats = self.middleware.stats
+        encoder = self.middleware.encoders[self.encoding]
+
+        if len(body) >= self.middleware.offload_size:
+            timings: List[float] = []
+
+            def run() -> bytes:
+                started = time.perf_counter()
+                result = encoder(body)
+                timings.append(time.perf_counter() - started)
+                return result
+
+            # 스레드에서 압축하는 동안 이벤트 루프는 다른 요청을 처리
+            compressed = await anyio.to_thread.run_sync(run)
+            compress_seconds = timings[0]
+            stats.offloaded += 1
+        else:
+            started = time.perf_counter()
+            compressed = encoder(body)
+            compress_seconds = time.perf_counter() - started
+            stats.loop_seconds += compress_seconds
+
+        stats.responses += 1
+        stats.bytes_in += len(body)
+        stats.bytes_out += len(compressed)
+        stats.compress_seconds += compress_seconds
+        return compressed
+
+
+compression_stats = CompressionStats()
@@ -0,0 +1,72 @@
+"""
+클라이언트 연결 끊김 시 진행 중인 작업 취소.
+
+요청 바디를 다 읽은 뒤에는 ASGI receive() 가 http.disconnect 가 올 때까지 대기하므로,
+핸들러 작업과 receive() 를 경쟁시켜 연결이 먼저 끊기면 작업 task 를 취소합니다.
+- 비동기 LLM 호출(AsyncGroq / ChatGroq ainvoke)은 취소 시 HTTP 요청이 닫혀 업스트림 생성도 중단
+- 작업 안의 async with 세마포어/리미터 슬롯은 취소 전파로 즉시 반납
+- 스레드에서 실행 중인 동기 구간(Chroma 검색 등)은 끝까지 실행되지만 결과는 버려짐
+"""
+import asyncio
+import threading
+from collections import Counter
+from typing import Any, Awaitable, Dict
+
+from starlette.requests import Request
+
+
+class ClientDisconnected(Exception):
+    """작업이 끝나기 전에 클라이언트 연결이 끊김"""
+
+
+class CancellationStats:
+    """엔드포인트별 연결 끊김으로 취소된 요청 수"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+
+    def record(self, endpoint: str):
+        with self._lock:
+            self._counts[endpoint] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+cancellation_stats = CancellationStats()
+
+
+async def wait_for_disconnect(request: Request):
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def cancel_on_disconnect(request: Request, work: Awaitable[Any], endpoint: str) -> Any:
+    """
+    work 를 실행하다가 클라이언트 연결이 끊기면 취소하고 ClientDisconnected 를 발생시킵니다.
+    요청 바디를 이미 읽은 뒤(FastAPI 바디 파라미터 파싱 이후)에 호출해야 합니다.
+    """
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+
+    if task in done:
+        return task.result()
+
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass
+    cancellation_stats.record(endpoint)
+    raise ClientDisconnected(endpoint)
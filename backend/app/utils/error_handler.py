@@ -1,10 +1,8 @@
 from fastapi import Request
-from fastapi.responses import ORJSONResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from fastapi.exceptions import RequestValidationError
 
 from app.schemas.ret_result import ResponseResult
-from app.schemas.ret_result import retResponseResult
 
 
 def setup_exception_handlers(app):
@@ -18,36 +16,27 @@ def setup_exception_handlers(app):
         combined = f"{field}: {message}"
 
         # result_code는 400, result_msg에 조합된 메시지
-        resp = await ResponseResult.error(
+        return ResponseResult.error(
             result_code=400,
             result_msg=combined,
             data=None
         )
-        if isinstance(resp, ORJSONResponse):
-            return resp
-        return retResponseResult(resp)
 
     @app.exception_handler(StarletteHTTPException)
     async def http_exception_handler(request: Request, exc: StarletteHTTPException):
         """ FastAPI HTTPException 처리 핸들러 """
         # exc.status_code 를 그대로 쓰고, 기본 메시지는 exc.detail
-        resp = await ResponseResult.error(
+        return ResponseResult.error(
             result_code=exc.status_code,
             result_msg=str(exc.detail),
             data=None
         )
-        if isinstance(resp, ORJSONResponse):
-            return resp
-        return retResponseResult(resp)
 
     @app.exception_handler(404)
     async def not_found_exception_handler(request: Request, exc):
         """ 404 Not Found 처리 핸들러 """
-        resp = await ResponseResult.error(
+        return ResponseResult.error(
             result_code=404,
             result_msg="Resource not found",
             data=None
         )
-        if isinstance(resp, ORJSONResponse):
-            return resp
-        return retResponseResult(resp)
@@ -0,0 +1,297 @@
+"""
+이벤트 루프 지연(lag) 측정 / 블로킹 호출 탐지 / 지연 기반 부하 차단.
+
+- 측정: 루프 위의 태스크가 interval 마다 sleep 하고, 예정 시각보다 늦게 깨어난 만큼을 lag 로 히스토그램에 기록
+- 탐지: 별도 watchdog 스레드가 heartbeat 를 감시하다가 block_threshold 이상 멈춰 있으면
+  그 순간 루프 스레드의 스택(sys._current_frames)과 실행 중인 태스크의 라우트를 로그로 남김
+  (블로킹이 끝난 뒤의 slow-callback 로그와 달리, 멈춰 있는 바로 그 코드 위치가 찍힘)
+- 차단: shed_lag_ms 가 설정되면 lag 가 그 이상인 동안 새 요청에 503 + Retry-After 로 즉시 응답
+- 루프 스레드에서 하는 일은 interval 당 sleep 한 번 + 요청당 dict 갱신 한 번뿐
+"""
+import asyncio
+import contextvars
+import logging
+import math
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.schemas.ret_result import ResponseStatus, envelope_response
+
+
+logger = logging.getLogger(__name__)
+
+# lag 히스토그램 버킷 상한 (ms)
+LAG_BUCKETS_MS: Tuple[float, ...] = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# 현재 요청의 ASGI scope (자식 태스크에도 복사됨 → 스트리밍 응답 등에서 라우트 식별)
+_request_scope: contextvars.ContextVar[Optional[Scope]] = contextvars.ContextVar("loop_request_scope", default=None)
+
+
+def route_label(scope: Optional[Scope]) -> str:
+    """라우팅 이후에는 경로 템플릿(/blog/{id}), 이전에는 실제 경로"""
+    if scope is None:
+        return "background"
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path", "")
+    return f"{scope.get('method', '')} {path}".strip()
+
+
+class LoopMonitor:
+    def __init__(self, interval_ms: float, block_threshold_ms: float, shed_lag_ms: float = 0,
+                 retry_after_s: float = 2.0, max_reports: int = 20, stack_limit: int = 40,
+                 smoothing: float = 0.3, window: int = 600):
+        self.interval = interval_ms / 1000
+        self.block_threshold = block_threshold_ms / 1000
+        self.shed_lag = shed_lag_ms / 1000
+        self.retry_after_s = retry_after_s
+        self.stack_limit = stack_limit
+        self.smoothing = smoothing
+        self.reports: Deque[Dict[str, Any]] = deque(maxlen=max_reports)
+        self._recent: Deque[float] = deque(maxlen=window)
+        self._buckets = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._max = 0.0
+        self._ewma = 0.0
+        self._heartbeat = time.monotonic()
+        self._pending: Optional[Dict[str, Any]] = None
+        self._tasks: Dict[asyncio.Task, Scope] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._ticker: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.blocked = 0
+        self.shed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._ticker is not None
+
+    def start(self):
+        """실행 중인 이벤트 루프에서 호출 (lifespan startup)"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._ticker = self._loop.create_task(self._tick(), name="loop-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._stop.set()
+        self._ticker.cancel()
+        try:
+            await self._ticker
+        except asyncio.CancelledError:
+            pass
+        self._ticker = None
+        await asyncio.to_thread(self._watchdog.join)
+        self._watchdog = None
+
+    # ---- 측정 (루프 스레드) ----
+
+    async def _tick(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            self._observe(max(0.0, now - expected))
+
+    def _observe(self, lag: float):
+        lag_ms = lag * 1000
+        index = 0
+        while index < len(LAG_BUCKETS_MS) and lag_ms > LAG_BUCKETS_MS[index]:
+            index += 1
+        self._buckets[index] += 1
+        self._sum += lag
+        self._count += 1
+        self._max = max(self._max, lag)
+        self._ewma += self.smoothing * (lag - self._ewma)
+        self._recent.append(lag)
+
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            pending["blocked_ms"] = round(lag_ms, 1)
+            logger.warning(f"이벤트 루프 블로킹 종료: {lag_ms:.0f} ms ({pending['route']})")
+
+    def current_lag(self) -> float:
+        """최근 lag 추정치 (초): 평활값과 지금 멈춰 있는 시간 중 큰 값"""
+        stalled = time.monotonic() - self._heartbeat - self.interval
+        return max(self._ewma, stalled)
+
+    def overloaded(self) -> bool:
+        return self.shed_lag > 0 and self.running and self.current_lag() >= self.shed_lag
+
+    # ---- 탐지 (watchdog 스레드) ----
+
+    def _watch(self):
+        check = max(0.005, min(self.block_threshold / 4, 0.05))
+        reported = None
+        while not self._stop.wait(check):
+            beat = self._heartbeat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled >= self.block_threshold and beat != reported:
+                reported = beat
+                try:
+                    self._report(stalled)
+                except Exception as e:
+                    logger.debug(f"블로킹 스택 수집 실패: {e}")
+
+    def _blocking_task(self) -> Optional[asyncio.Task]:
+        try:
+            return asyncio.current_task(self._loop)
+        except RuntimeError:
+            return None
+
+    def _task_scope(self, task: Optional[asyncio.Task]) -> Optional[Scope]:
+        if task is None:
+            return None
+        scope = self._tasks.get(task)
+        if scope is None and hasattr(task, "get_context"):
+            # Python 3.12+: 요청 태스크가 띄운 자식 태스크 (StreamingResponse 등)
+            scope = task.get_context().get(_request_scope)
+        return scope
+
+    def _report(self, stalled: float):
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return
+        stack = traceback.format_list(traceback.extract_stack(frame)[-self.stack_limit:])
+        task = self._blocking_task()
+        report = {
+            "at": time.time(),
+            "route": route_label(self._task_scope(task)),
+            "task": task.get_name() if task is not None else None,
+            "blocked_ms": round(stalled * 1000, 1),
+            "stack": "".join(stack),
+        }
+        self.blocked += 1
+        self.reports.append(report)
+        self._pending = report
+        logger.warning(
+            f"이벤트 루프가 {report['blocked_ms']:.0f} ms 이상 블로킹됨 ({report['route']}, task={report['task']})\n"
+            + report["stack"]
+        )
+
+    # ---- 요청 추적 (미들웨어) ----
+
+    def enter(self, scope: Scope) -> Tuple[Optional[asyncio.Task], contextvars.Token]:
+        task = asyncio.current_task()
+        if task is not None:
+            self._tasks[task] = scope
+        return task, _request_scope.set(scope)
+
+    def exit(self, task: Optional[asyncio.Task], token: contextvars.Token):
+        if task is not None:
+            self._tasks.pop(task, None)
+        _request_scope.reset(token)
+
+    # ---- 내보내기 ----
+
+    def percentile(self, q: float) -> Optional[float]:
+        recent = sorted(self._recent)
+        if not recent:
+            return None
+        return recent[min(len(recent) - 1, int(len(recent) * q))]
+
+    def snapshot(self, include_stacks: bool = True) -> Dict[str, Any]:
+        cumulative, buckets = 0, {}
+        for bound, count in zip(LAG_BUCKETS_MS + (math.inf,), self._buckets):
+            cumulative += count
+            buckets["+Inf" if bound == math.inf else str(bound)] = cumulative
+        quantiles = {f"p{int(q * 100)}": self.percentile(q) for q in (0.5, 0.95, 0.99)}
+        reports = list(self.reports)
+        if not include_stacks:
+            reports = [{key: value for key, value in report.items() if key != "stack"} for report in reports]
+        return {
+            "pid": os.getpid(),
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "block_threshold_ms": self.block_threshold * 1000,
+            "shed_lag_ms": self.shed_lag * 1000,
+            "lag_ms": {
+                "current": round(self.current_lag() * 1000, 1) if self.running else None,
+                "ewma": round(self._ewma * 1000, 1),
+                "max": round(self._max * 1000, 1),
+                **{key: round(value * 1000, 1) if value is not None else None for key, value in quantiles.items()},
+            },
+            "histogram_ms": {"buckets": buckets, "count": self._count, "sum": round(self._sum * 1000, 1)},
+            "in_flight_requests": len(self._tasks),
+            "blocked": self.blocked,
+            "shed": self.shed,
+            "reports": reports,
+        }
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition (워커별: pid 라벨)"""
+        pid = os.getpid()
+        lines = ["# TYPE event_loop_lag_seconds histogram"]
+        cumulative = 0
+        for bound, count in zip(LAG_BUCKETS_MS + (math.inf,), self._buckets):
+            cumulative += count
+            le = "+Inf" if bound == math.inf else repr(bound / 1000)
+            lines.append(f'event_loop_lag_seconds_bucket{{pid="{pid}",le="{le}"}} {cumulative}')
+        lines.append(f'event_loop_lag_seconds_sum{{pid="{pid}"}} {self._sum}')
+        lines.append(f'event_loop_lag_seconds_count{{pid="{pid}"}} {self._count}')
+        lines.append("# TYPE event_loop_blocked_total counter")
+        lines.append(f'event_loop_blocked_total{{pid="{pid}"}} {self.blocked}')
+        lines.append("# TYPE event_loop_shed_total counter")
+        lines.append(f'event_loop_shed_total{{pid="{pid}"}} {self.shed}')
+        return "\n".join(lines) + "\n"
+
+
+class LoopMonitorMiddleware:
+    """
+    요청 태스크 ↔ 라우트 매핑을 기록하고 (블로킹 보고용),
+    lag 가 shed_lag_ms 이상이면 503 + Retry-After 로 즉시 응답합니다 (exempt_prefixes 제외).
+    """
+
+    def __init__(self, app: ASGIApp, monitor: LoopMonitor, exempt_prefixes: Tuple[str, ...] = ("/health",)):
+        self.app = app
+        self.monitor = monitor
+        self.exempt_prefixes = exempt_prefixes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.monitor.running:
+            await self.app(scope, receive, send)
+            return
+
+        if self.monitor.overloaded() and not scope.get("path", "").startswith(self.exempt_prefixes):
+            self.monitor.shed += 1
+            lag_ms = round(self.monitor.current_lag() * 1000, 1)
+            response = envelope_response(
+                ResponseStatus.ERROR, 503, "Server is overloaded (event loop lag)", data={"lag_ms": lag_ms}
+            )
+            response.headers["Retry-After"] = str(math.ceil(self.monitor.retry_after_s))
+            await response(scope, receive, send)
+            return
+
+        task, token = self.monitor.enter(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.monitor.exit(task, token)
+
+
+loop_monitor = LoopMonitor(
+    interval_ms=settings.LOOP_MONITOR_INTERVAL_MS,
+    block_threshold_ms=settings.LOOP_BLOCK_THRESHOLD_MS,
+    shed_lag_ms=settings.LOOP_LAG_SHED_MS,
+    retry_after_s=settings.LOOP_LAG_SHED_RETRY_AFTER_S,
+    max_reports=settings.LOOP_BLOCK_REPORTS,
+)
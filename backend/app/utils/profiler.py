@@ -0,0 +1,188 @@
+"""
+워커 단위 온디맨드 샘플링 프로파일러.
+
+- 스택 샘플링: 별도 스레드가 interval 마다 sys._current_frames() 로 모든 스레드의 스택을 읽어
+  collapsed-stack 형식(`thread;frame;frame count`)으로 집계 → flamegraph.pl / speedscope 에 바로 입력
+- 메모리: tracemalloc 시작/종료 스냅샷을 비교해 할당 위치별 증가량 상위 N개
+- 세션은 지정 시간 또는 지정 요청 수(ProfilerMiddleware 가 집계)에 도달하면 종료
+- 세션이 없을 때는 미들웨어의 속성 확인 한 번 외에 비용 없음
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+# 유휴 대기 중인 스레드의 스택 (기본적으로 집계에서 제외)
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("base_events.py", "_run_once"),
+}
+
+
+class ProfilerBusyError(Exception):
+    """이미 다른 프로파일링 세션이 실행 중"""
+
+
+class ProfileSession:
+    def __init__(self, duration_s: float, max_requests: Optional[int], interval_ms: float,
+                 memory: bool, memory_frames: int, include_idle: bool):
+        self.duration_s = duration_s
+        self.max_requests = max_requests
+        self.interval = interval_ms / 1000
+        self.memory = memory
+        self.memory_frames = memory_frames
+        self.include_idle = include_idle
+        self.requests = 0
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self.sampler_cpu_s = 0.0
+        self.done = threading.Event()
+        self._labels: Dict[Any, str] = {}
+
+    def request_finished(self):
+        self.requests += 1
+        if self.max_requests is not None and self.requests >= self.max_requests:
+            self.done.set()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def sample_loop(self):
+        own = threading.get_ident()
+        names = {}
+        started_cpu = time.thread_time()
+        deadline = time.monotonic() + self.duration_s
+        while not self.done.is_set():
+            if time.monotonic() >= deadline:
+                break
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                code = frame.f_code
+                if not self.include_idle and (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                    continue
+                stack: List[str] = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            self.done.wait(self.interval)
+        self.sampler_cpu_s = time.thread_time() - started_cpu
+        self.done.set()
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+class SamplingProfiler:
+    """현재 워커 프로세스의 프로파일링 세션 관리 (동시에 한 세션만)"""
+
+    def __init__(self):
+        self.session: Optional[ProfileSession] = None
+        self._lock = threading.Lock()
+
+    async def profile(self, duration_s: float, max_requests: Optional[int] = None, interval_ms: float = 5.0,
+                      memory: bool = True, memory_frames: int = 1, top: int = 30,
+                      include_idle: bool = False) -> Dict[str, Any]:
+        session = ProfileSession(duration_s, max_requests, interval_ms, memory, memory_frames, include_idle)
+        with self._lock:
+            if self.session is not None:
+                raise ProfilerBusyError("profiling session already running on this worker")
+            self.session = session
+
+        started_tracing = False
+        before = None
+        try:
+            if memory:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(memory_frames)
+                    started_tracing = True
+                # 스냅샷은 추적 중인 할당 수에 비례해 오래 걸리므로 이벤트 루프 밖(스레드 풀)에서 생성
+                before = await asyncio.to_thread(tracemalloc.take_snapshot)
+
+            started = time.monotonic()
+            sampler = threading.Thread(target=session.sample_loop, name="profiler-sampler", daemon=True)
+            sampler.start()
+            while not session.done.is_set():
+                await asyncio.sleep(0.05)
+            await asyncio.to_thread(sampler.join)
+            elapsed = time.monotonic() - started
+
+            allocations = []
+            if memory:
+                after = await asyncio.to_thread(tracemalloc.take_snapshot)
+                allocations = await asyncio.to_thread(self._top_allocations, before, after, top)
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            with self._lock:
+                self.session = None
+
+        return {
+            "pid": os.getpid(),
+            "duration_s": round(elapsed, 3),
+            "requests": session.requests,
+            "interval_ms": interval_ms,
+            "samples": session.samples,
+            "sampler_cpu_ms": round(session.sampler_cpu_s * 1000, 1),
+            "collapsed": session.collapsed(),
+            "allocations": allocations,
+        }
+
+    @staticmethod
+    def _top_allocations(before, after, top: int) -> List[Dict[str, Any]]:
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ]
+        before = before.filter_traces(filters)
+        after = after.filter_traces(filters)
+        result = []
+        for stat in after.compare_to(before, "lineno")[:top]:
+            frame = stat.traceback[0]
+            result.append({
+                "site": f"{frame.filename}:{frame.lineno}",
+                "size_kb": round(stat.size / 1024, 1),
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "count": stat.count,
+                "count_diff": stat.count_diff,
+            })
+        return result
+
+
+profiler = SamplingProfiler()
+
+
+class ProfilerMiddleware:
+    """프로파일링 세션 중 완료된 HTTP 요청 수를 집계합니다 (요청 수 기준 종료용)."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or profiler.session is None:
+            await self.app(scope, receive, send)
+            return
+        session = profiler.session
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session.request_finished()
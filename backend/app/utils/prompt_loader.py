@@ -1,4 +1,5 @@
 import yaml
+from functools import lru_cache
 from pathlib import Path
 import re
 import logging
@@ -7,8 +8,9 @@ from typing import Dict, Any, Optional
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=None)
 def load_all_prompts(file_name: str) -> dict:
-    """YAML 프롬프트 파일을 로드합니다."""
+    """YAML 프롬프트 파일을 로드합니다. (프로세스당 1회, 반환값은 수정하지 말 것)"""
     try:
         path = Path(__file__).resolve().parent.parent / "config" / file_name
         with open(path, "r", encoding="utf-8") as f:
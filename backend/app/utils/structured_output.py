@@ -0,0 +1,149 @@
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+
+from pydantic import TypeAdapter, ValidationError
+
+from app.schemas.sql_tutor import OUTPUT_SCHEMAS
+from app.utils.json_utils import parse_json_response, validate_json_structure
+
+
+logger = logging.getLogger(__name__)
+
+# 스키마별 TypeAdapter를 import 시점에 한 번만 생성 (요청마다 core schema 빌드 방지)
+_ADAPTERS: Dict[str, TypeAdapter] = {name: TypeAdapter(model) for name, model in OUTPUT_SCHEMAS.items()}
+_JSON_SCHEMAS: Dict[str, Dict[str, Any]] = {name: adapter.json_schema() for name, adapter in _ADAPTERS.items()}
+
+
+def get_output_adapter(schema_name: str) -> TypeAdapter:
+    """output_schema 이름에 해당하는 사전 컴파일된 TypeAdapter를 반환합니다."""
+    try:
+        return _ADAPTERS[schema_name]
+    except KeyError:
+        raise KeyError(f"등록되지 않은 출력 스키마입니다: {schema_name}")
+
+
+def get_response_format(schema_name: Optional[str], mode: str) -> Optional[Dict[str, Any]]:
+    """
+    Groq chat completion의 response_format 인자를 생성합니다.
+
+    Args:
+        schema_name: 프롬프트 섹션의 output_schema
+        mode: "json_schema" | "json_object" | "off"
+
+    Returns:
+        response_format 딕셔너리 (구조화 출력을 쓰지 않으면 None)
+    """
+    if not schema_name or mode == "off":
+        return None
+    if mode == "json_object":
+        return {"type": "json_object"}
+    get_output_adapter(schema_name)
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": schema_name, "schema": _JSON_SCHEMAS[schema_name]}
+    }
+
+
+def parse_structured_output(schema_name: str, content: Any) -> Dict[str, Any]:
+    """
+    LLM 응답을 output_schema로 한 번에 검증합니다.
+    구조화 출력 모드에서는 첫 검증이 성공하므로 정규식 정리는 실패 시에만 수행됩니다.
+    """
+    return validate_structured_output(schema_name, content)[0]
+
+
+def validate_structured_output(schema_name: str, content: Any) -> Tuple[Dict[str, Any], bool]:
+    """
+    parse_structured_output 과 같지만 응답 자체가 TypeAdapter 검증을 통과했는지 함께 반환합니다.
+    정규식 정리 / 기본값 보정으로 만든 결과는 False (생성 통계의 parse_failures 집계용,
+    스키마 필드에 기본값이 있어 보정 결과는 거의 항상 검증을 통과하므로 첫 검증만 성공으로 셈).
+    """
+    adapter = get_output_adapter(schema_name)
+
+    if isinstance(content, (str, bytes)):
+        try:
+            return adapter.validate_json(content).model_dump(), True
+        except ValidationError as e:
+            logger.warning(f"구조화 출력 검증 실패({schema_name}), 레거시 파싱으로 재시도: {e.error_count()}건")
+
+    legacy = parse_json_response(content if content is not None else "")
+    try:
+        return adapter.validate_python(legacy).model_dump(), False
+    except ValidationError:
+        required_fields = list(OUTPUT_SCHEMAS[schema_name].model_fields)
+        return validate_json_structure(legacy, required_fields), False
+
+
+class IncrementalJSONParser:
+    """
+    스트리밍되는 최상위 JSON 객체를 받아, 각 필드 값이 완성되는 즉시 (key, value)로 반환합니다.
+
+    Example:
+        parser = IncrementalJSONParser()
+        for chunk in stream:
+            for key, value in parser.feed(chunk):
+                ...
+    """
+
+    def __init__(self):
+        self._buf: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        fields: List[Tuple[str, Any]] = []
+        buf = self._buf
+
+        for ch in chunk:
+            if self.done:
+                break
+
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                buf.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                buf.append(ch)
+            elif ch == "{" or ch == "[":
+                self._depth += 1
+                buf.append(ch)
+            elif ch == "}" or ch == "]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._flush(fields)
+                    self.done = True
+                else:
+                    buf.append(ch)
+            elif ch == "," and self._depth == 1:
+                self._flush(fields)
+            else:
+                buf.append(ch)
+
+        return fields
+
+    def _flush(self, fields: List[Tuple[str, Any]]):
+        member = "".join(self._buf).strip()
+        self._buf.clear()
+        if not member:
+            return
+        try:
+            fields.extend(json.loads("{" + member + "}").items())
+        except ValueError:
+            logger.debug(f"증분 파싱 중 필드 해석 실패: {member[:80]}")
@@ -0,0 +1,134 @@
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+from app.core.config import settings
+from app.utils.prompt_loader import render_prompt
+
+
+logger = logging.getLogger(__name__)
+
+_PLACEHOLDER = re.compile(r"\{\{\s*(.*?)\s*\}\}|\{(\w+)\}")
+_TRUNCATION_MARKER = "\n...(truncated)...\n"
+
+
+class TokenBudgetExceeded(Exception):
+    """프롬프트가 엔드포인트 토큰 예산을 넘어 LLM 호출 전에 거절해야 하는 경우"""
+
+    def __init__(self, section: str, tokens: int, budget: int):
+        self.section = section
+        self.tokens = tokens
+        self.budget = budget
+        super().__init__(f"Prompt too large for '{section}': {tokens} tokens exceeds budget of {budget}")
+
+
+def _heuristic_counter(text: str) -> int:
+    # ASCII는 약 4자당 1토큰, 한글 등 비 ASCII 문자는 글자당 약 1토큰으로 추정
+    non_ascii = (len(text.encode("utf-8")) - len(text)) // 2
+    return (len(text) - non_ascii) // 4 + non_ascii + 1
+
+
+@lru_cache(maxsize=1)
+def get_token_counter() -> Callable[[str], int]:
+    """
+    설정된 토크나이저로 토큰 수를 세는 함수를 반환합니다 (프로세스당 1회 로드).
+
+    TOKENIZER 설정:
+        "heuristic"            - 문자 수 기반 추정 (기본, 추가 의존성 없음)
+        "hf:<path or name>"    - HuggingFace tokenizers (로컬 tokenizer.json 경로 권장, tokenizers 는 의존성에 포함)
+        "tiktoken:<encoding>"  - tiktoken 인코딩 (예: tiktoken:o200k_base, tiktoken 을 별도로 설치해야 함)
+    """
+    name = settings.TOKENIZER
+    try:
+        if name.startswith("tiktoken:"):
+            import tiktoken
+            encoding = tiktoken.get_encoding(name.split(":", 1)[1])
+            return lambda text: len(encoding.encode_ordinary(text))
+        if name.startswith("hf:"):
+            from tokenizers import Tokenizer
+            source = name.split(":", 1)[1]
+            tokenizer = Tokenizer.from_file(source) if os.path.exists(source) else Tokenizer.from_pretrained(source)
+            return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+    except Exception as e:
+        logger.warning(f"토크나이저 로드 실패({name}), 추정치 사용: {e}")
+    return _heuristic_counter
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return get_token_counter()(text)
+
+
+@lru_cache(maxsize=512)
+def count_static_tokens(text: str) -> int:
+    """시스템 프롬프트처럼 고정된 문자열의 토큰 수 (결과 캐시)"""
+    return count_tokens(text)
+
+
+@lru_cache(maxsize=64)
+def section_static_tokens(system_prompt: str, user_template: str) -> int:
+    """프롬프트 섹션에서 변수를 제외한 고정 부분의 토큰 수 (섹션별 1회 계산)"""
+    return count_static_tokens(system_prompt) + count_tokens(_PLACEHOLDER.sub("", user_template))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """앞부분 70%, 뒷부분 30%를 남기고 가운데를 잘라 max_tokens 이하로 줄입니다."""
+    if max_tokens <= 0:
+        return ""
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    keep = int(len(text) * max_tokens / tokens)
+    while keep > 0:
+        head = int(keep * 0.7)
+        candidate = text[:head] + _TRUNCATION_MARKER + text[len(text) - (keep - head):]
+        if count_tokens(candidate) <= max_tokens:
+            return candidate
+        keep = int(keep * 0.9)
+    return ""
+
+
+def get_token_budget(section: str) -> int:
+    return settings.PROMPT_TOKEN_BUDGETS.get(section, settings.PROMPT_TOKEN_BUDGET_DEFAULT)
+
+
+def render_prompt_within_budget(
+    section: str,
+    system_prompt: str,
+    user_template: str,
+    variables: Dict[str, Any],
+    truncatable: Iterable[str] = ("context",),
+) -> Tuple[str, int]:
+    """
+    LLM 호출 전에 프롬프트 토큰 수를 추정하고 섹션별 예산을 적용해 user 프롬프트를 렌더링합니다.
+
+    예산 초과 시 truncatable 변수(기본: context)를 잘라 맞추고,
+    그래도 넘으면(혹은 TOKEN_BUDGET_MODE=reject) TokenBudgetExceeded를 발생시킵니다.
+
+    Returns:
+        (렌더링된 user 프롬프트, 추정 프롬프트 토큰 수)
+    """
+    budget = get_token_budget(section)
+    variable_tokens = {key: count_tokens(str(value)) for key, value in variables.items() if value is not None}
+    total = section_static_tokens(system_prompt, user_template) + sum(variable_tokens.values())
+
+    if total > budget:
+        if settings.TOKEN_BUDGET_MODE == "reject":
+            raise TokenBudgetExceeded(section, total, budget)
+        variables = dict(variables)
+        for key in truncatable:
+            if total <= budget or key not in variable_tokens:
+                continue
+            allowed = variable_tokens[key] - (total - budget)
+            variables[key] = truncate_to_tokens(str(variables[key]), allowed)
+            truncated_tokens = count_tokens(variables[key])
+            total -= variable_tokens[key] - truncated_tokens
+            logger.info(f"[tokens] {section}: '{key}' truncated {variable_tokens[key]} -> {truncated_tokens} tokens")
+        if total > budget:
+            raise TokenBudgetExceeded(section, total, budget)
+
+    logger.info(f"[tokens] {section}: estimated prompt tokens={total} budget={budget}")
+    return render_prompt(user_template, variables), total
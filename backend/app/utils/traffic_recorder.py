@@ -0,0 +1,409 @@
+"""
+실제 트래픽 기록 / 재생 지원.
+
+- TrafficRecorderMiddleware: 샘플링된 요청(메서드, 경로, 바디), 응답 상태/크기/지연 시간과
+  해당 요청 중에 발생한 LLM 업스트림 호출(요청 JSON, 응답 바디, 지연 시간)을 회전 JSONL 파일에 기록
+- RecordingTransport / AsyncRecordingTransport: Groq SDK / langchain-groq 의 httpx 전송 계층에서 업스트림 호출을 복사
+- ReplayTransport: 재생 시 기록된 업스트림 응답을 요청 내 호출 순서대로 반환하는 로컬 스텁
+
+비밀 값(Authorization/Cookie 헤더, password/token/api_key 류 필드, Groq API 키 패턴)은 기록 전에 제거합니다.
+재생 도구: python -m benchmarks.replay_traffic
+"""
+import base64
+import contextvars
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional
+
+import anyio
+import httpx
+import orjson
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+logger = logging.getLogger(__name__)
+
+_SENSITIVE_HEADERS = {"authorization", "proxy-authorization", "cookie", "set-cookie", "x-api-key", "x-auth-token"}
+_RECORDED_HEADERS = {"content-type", "accept", "accept-encoding", "accept-language", "user-agent"}
+# 키 이름 전체가 일치할 때만 제거 (max_completion_tokens, usage.*_tokens 같은 수치 필드는 유지)
+_SENSITIVE_KEY = re.compile(
+    r"^(?:x[_-])?(?:(?:access|refresh|id|auth|session|csrf|bearer)[_-]?)?token$"
+    r"|^(?:[a-z]+[_-])?(?:password|passwd|secret|api[_-]?key|credentials?)$"
+    r"|^(?:proxy[_-])?authorization$",
+    re.IGNORECASE,
+)
+_SECRET_VALUE = re.compile(r"gsk_[A-Za-z0-9]{16,}|Bearer\s+[A-Za-z0-9._\-]+|sk-[A-Za-z0-9]{16,}")
+_REDACTED = "[REDACTED]"
+
+# 현재 요청의 업스트림 호출 기록 목록 (기록 대상 요청일 때만 설정)
+_capture: contextvars.ContextVar[Optional[List[Dict[str, Any]]]] = contextvars.ContextVar("traffic_capture", default=None)
+# 재생 중인 요청에 대해 반환할 업스트림 응답 큐
+_replay: contextvars.ContextVar[Optional[Deque[Dict[str, Any]]]] = contextvars.ContextVar("traffic_replay", default=None)
+
+
+# ===== 비밀 값 제거 =====
+
+def _is_sensitive(key: Any, value: Any) -> bool:
+    # 숫자 / 불리언 값은 비밀이 아님 (사용량 / 파라미터 필드가 재생 시 깨지지 않도록)
+    if isinstance(value, (int, float, bool)) or value is None:
+        return False
+    return bool(_SENSITIVE_KEY.search(str(key)))
+
+
+def redact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: (_REDACTED if _is_sensitive(k, v) else redact(v)) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(v) for v in value]
+    if isinstance(value, str):
+        return _SECRET_VALUE.sub(_REDACTED, value)
+    return value
+
+
+def _encode_body(body: bytes, content_type: str) -> Dict[str, Any]:
+    """JSON 바디는 비밀 값을 제거한 객체로, 텍스트는 문자열로, 그 외는 base64 로 기록합니다."""
+    if not body:
+        return {}
+    if "json" in content_type:
+        try:
+            return {"body_json": redact(orjson.loads(body))}
+        except orjson.JSONDecodeError:
+            pass
+    if content_type.startswith("text/") or "json" in content_type or "x-ndjson" in content_type:
+        return {"body": redact(body.decode("utf-8", errors="replace"))}
+    return {"body_b64": base64.b64encode(body).decode("ascii")}
+
+
+def decode_body(entry: Dict[str, Any]) -> bytes:
+    if "body_json" in entry:
+        return orjson.dumps(entry["body_json"])
+    if "body" in entry:
+        return entry["body"].encode("utf-8")
+    if "body_b64" in entry:
+        return base64.b64decode(entry["body_b64"])
+    return b""
+
+
+# ===== 회전 JSONL =====
+
+class RotatingJSONLWriter:
+    def __init__(self, path: str, max_bytes: int, backup_count: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def write(self, record: Dict[str, Any]):
+        line = orjson.dumps(record) + b"\n"
+        with self._lock:
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                self._rotate()
+            with open(self.path, "ab") as f:
+                f.write(line)
+
+    def _rotate(self):
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+def load_recordings(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    """기록 파일들을 읽어 시작 시각 순으로 정렬해 반환합니다."""
+    records = []
+    for path in paths:
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    records.append(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    continue
+    return sorted(records, key=lambda r: r.get("ts", 0))
+
+
+# ===== 업스트림 (httpx 전송 계층) =====
+
+class _TeeStream(httpx.SyncByteStream):
+    """응답 스트림을 그대로 전달하면서 바디를 복사해 두었다가 종료 시 기록합니다."""
+
+    def __init__(self, stream: httpx.SyncByteStream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+        self._chunks: List[bytes] = []
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self._stream:
+            self._chunks.append(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._on_close(b"".join(self._chunks))
+
+
+class RecordingTransport(httpx.BaseTransport):
+    """기록 대상 요청 중에 발생한 업스트림 호출을 현재 요청의 기록에 추가합니다."""
+
+    def __init__(self, inner: httpx.BaseTransport):
+        self.inner = inner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        capture = _capture.get()
+        if capture is None:
+            return self.inner.handle_request(request)
+
+        started = time.perf_counter()
+        request_body = request.read()
+        response = self.inner.handle_request(request)
+        entry: Dict[str, Any] = {
+            "method": request.method,
+            "url": str(request.url.copy_with(query=None)),
+            "request": _encode_body(request_body, request.headers.get("content-type", "")),
+            "status": response.status_code,
+            "content_type": response.headers.get("content-type", ""),
+        }
+
+        def on_close(body: bytes):
+            entry["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            entry["response"] = _encode_body(body, entry["content_type"])
+            capture.append(entry)
+
+        if isinstance(response.stream, httpx.ByteStream):
+            # 메모리에 이미 있는 바디 (스트림이 소비되지 않을 수 있으므로 즉시 기록)
+            on_close(response.read())
+        else:
+            response.stream = _TeeStream(response.stream, on_close)
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+class _AsyncTeeStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+        self._chunks: List[bytes] = []
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._chunks.append(chunk)
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._on_close(b"".join(self._chunks))
+
+
+class AsyncRecordingTransport(httpx.AsyncBaseTransport):
+    """RecordingTransport 의 비동기 버전 (AsyncGroq / ChatGroq 비동기 호출용)"""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        capture = _capture.get()
+        if capture is None:
+            return await self.inner.handle_async_request(request)
+
+        started = time.perf_counter()
+        request_body = await request.aread()
+        response = await self.inner.handle_async_request(request)
+        entry: Dict[str, Any] = {
+            "method": request.method,
+            "url": str(request.url.copy_with(query=None)),
+            "request": _encode_body(request_body, request.headers.get("content-type", "")),
+            "status": response.status_code,
+            "content_type": response.headers.get("content-type", ""),
+        }
+
+        def on_close(body: bytes):
+            entry["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            entry["response"] = _encode_body(body, entry["content_type"])
+            capture.append(entry)
+
+        if isinstance(response.stream, httpx.ByteStream):
+            on_close(await response.aread())
+        else:
+            response.stream = _AsyncTeeStream(response.stream, on_close)
+        return response
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    재생용 업스트림 스텁: 현재 재생 중인 요청에 기록된 업스트림 응답을 순서대로 반환합니다.
+    delay=True 면 기록된 업스트림 지연 시간만큼 대기합니다.
+    """
+
+    def __init__(self, delay: bool = False):
+        self.delay = delay
+        self.missing = 0
+
+    def _next(self) -> Optional[Dict[str, Any]]:
+        queue = _replay.get()
+        if not queue:
+            self.missing += 1
+            return None
+        return queue.popleft()
+
+    @staticmethod
+    def _response(entry: Optional[Dict[str, Any]], request: httpx.Request) -> httpx.Response:
+        if entry is None:
+            return httpx.Response(502, json={"error": {"message": "no recorded upstream response"}}, request=request)
+        headers = {"content-type": entry.get("content_type") or "application/json"}
+        return httpx.Response(entry.get("status", 200), headers=headers,
+                              content=decode_body(entry.get("response", {})), request=request)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        entry = self._next()
+        if entry is not None and self.delay and entry.get("duration_ms"):
+            time.sleep(entry["duration_ms"] / 1000)
+        return self._response(entry, request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        entry = self._next()
+        if entry is not None and self.delay and entry.get("duration_ms"):
+            await anyio.sleep(entry["duration_ms"] / 1000)
+        return self._response(entry, request)
+
+
+_upstream_override: Optional[httpx.BaseTransport] = None
+
+
+def install_replay(transport: ReplayTransport):
+    """app 모듈을 import 하기 전에 호출하면 LLM 클라이언트가 재생 스텁을 사용합니다."""
+    global _upstream_override
+    _upstream_override = transport
+
+
+def set_replay_upstream(entries: List[Dict[str, Any]]) -> contextvars.Token:
+    return _replay.set(deque(entries))
+
+
+def create_upstream_http_client(enabled: bool, limit=None) -> Optional[httpx.Client]:
+    """
+    Groq SDK / ChatGroq 에 넘길 httpx 클라이언트.
+    기록/재생이 모두 꺼져 있고 limit(adaptive_limit.AdaptiveLimit)도 없으면 None (SDK 기본 클라이언트 사용, 오버헤드 없음).
+    """
+    if _upstream_override is None and not enabled and limit is None:
+        return None
+    from groq import DefaultHttpxClient
+    transport = _upstream_override or (RecordingTransport(httpx.HTTPTransport()) if enabled else httpx.HTTPTransport())
+    if limit is not None:
+        from app.core.adaptive_limit import LimitObservingTransport
+        transport = LimitObservingTransport(transport, limit)
+    return DefaultHttpxClient(transport=transport)
+
+
+def create_upstream_async_http_client(enabled: bool, limit=None) -> Optional[httpx.AsyncClient]:
+    """AsyncGroq / ChatGroq 비동기 호출용 (create_upstream_http_client 과 동일한 규칙)"""
+    if _upstream_override is None and not enabled and limit is None:
+        return None
+    from groq import DefaultAsyncHttpxClient
+    transport = _upstream_override or (
+        AsyncRecordingTransport(httpx.AsyncHTTPTransport()) if enabled else httpx.AsyncHTTPTransport()
+    )
+    if limit is not None:
+        from app.core.adaptive_limit import AsyncLimitObservingTransport
+        transport = AsyncLimitObservingTransport(transport, limit)
+    return DefaultAsyncHttpxClient(transport=transport)
+
+
+# ===== 요청 기록 미들웨어 =====
+
+class TrafficRecorderMiddleware:
+    """
+    sample_rate 비율로 요청을 골라 요청/응답 메타데이터와 업스트림 호출을 기록합니다.
+    응답 바디는 기록하지 않고 크기만 기록합니다. 파일 쓰기는 스레드에서 수행합니다.
+    """
+
+    def __init__(self, app: ASGIApp, path: str, sample_rate: float = 0.05, max_bytes: int = 64 * 1024 * 1024,
+                 backup_count: int = 5, max_body_bytes: int = 1024 * 1024, path_prefix: str = "/api/"):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.max_body_bytes = max_body_bytes
+        self.path_prefix = path_prefix
+        self.writer = RotatingJSONLWriter(path, max_bytes, backup_count)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not scope["path"].startswith(self.path_prefix)
+            or random.random() >= self.sample_rate
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        started_wall = time.time()
+        started = time.perf_counter()
+        body_chunks: List[bytes] = []
+        body_size = 0
+        response: Dict[str, Any] = {"status": None, "bytes": 0, "first_byte_ms": None}
+
+        async def recording_receive() -> Message:
+            nonlocal body_size
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                body_size += len(chunk)
+                if body_size <= self.max_body_bytes:
+                    body_chunks.append(chunk)
+            return message
+
+        async def recording_send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["first_byte_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        upstream: List[Dict[str, Any]] = []
+        token = _capture.set(upstream)
+        try:
+            await self.app(scope, recording_receive, recording_send)
+        finally:
+            _capture.reset(token)
+            duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            headers = {}
+            for key, value in scope.get("headers", []):
+                name = key.decode("latin-1").lower()
+                if name in _RECORDED_HEADERS and name not in _SENSITIVE_HEADERS:
+                    headers[name] = value.decode("latin-1")
+            record = {
+                "id": uuid.uuid4().hex,
+                "ts": started_wall,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query_string": redact(scope.get("query_string", b"").decode("latin-1")),
+                "headers": headers,
+                "body_truncated": body_size > self.max_body_bytes,
+                "request": _encode_body(b"".join(body_chunks), headers.get("content-type", "")),
+                "status": response["status"],
+                "response_bytes": response["bytes"],
+                "first_byte_ms": response["first_byte_ms"],
+                "duration_ms": duration_ms,
+                "upstream": upstream,
+            }
+            try:
+                await anyio.to_thread.run_sync(self.writer.write, record)
+            except Exception as e:
+                logger.warning(f"트래픽 기록 실패: {e}")
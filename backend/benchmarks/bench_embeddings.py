@@ -0,0 +1,143 @@
+"""
+임베딩 백엔드 정확도 / 지연 / 메모리 벤치마크
+
+실행 (backend 디렉터리에서):
+    python -m benchmarks.bench_embeddings [--onnx-path backend/data/models/minilm-onnx] [--k 4] [--queries queries.txt]
+
+백엔드: huggingface(fp32 기준) / onnx-fp32 / onnx-int8
+측정 항목:
+- recall@k (query swap): 후보 백엔드의 질의 벡터로 기존 fp32 인덱스를 검색했을 때 fp32 top-k 와의 일치율
+- recall@k (reindex):    후보 백엔드로 문서까지 다시 임베딩했을 때 fp32 top-k 와의 일치율
+- 질의 1건 임베딩 지연 p50/p95, 문서 배치 처리량
+- 모델 로드 후 RSS 증가량 (백엔드마다 별도 프로세스에서 측정)
+
+질의 파일을 주지 않으면 각 청크의 첫 줄을 질의로 사용합니다.
+"""
+import argparse
+import multiprocessing
+import statistics
+import time
+from typing import Dict, List
+
+import numpy as np
+
+
+def read_rss_mb() -> float:
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def load_corpus(data_dir: str) -> List[str]:
+    from langchain_community.document_loaders import DirectoryLoader, TextLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    loader = DirectoryLoader(data_dir, glob="**/*.md", loader_cls=TextLoader, loader_kwargs={"encoding": "utf-8"})
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    return [doc.page_content for doc in splitter.split_documents(loader.load())]
+
+
+def default_queries(chunks: List[str], limit: int) -> List[str]:
+    queries = []
+    for chunk in chunks:
+        line = next((l.strip("# ").strip() for l in chunk.splitlines() if l.strip("# ").strip()), "")
+        if line:
+            queries.append(line[:200])
+        if len(queries) >= limit:
+            break
+    return queries
+
+
+def run_backend(name: str, onnx_path: str, chunks: List[str], queries: List[str]) -> Dict:
+    """별도 프로세스에서 실행: 모델 로드 → 문서/질의 임베딩 → 지연/메모리 측정"""
+    rss_before = read_rss_mb()
+    if name == "huggingface":
+        from app.services.embedding_service import create_local_embeddings
+        embeddings = create_local_embeddings("huggingface")
+    else:
+        from app.services.onnx_embeddings import OnnxEmbeddings
+        embeddings = OnnxEmbeddings(onnx_path, quantize=(name == "onnx-int8"))
+    embeddings.embed_query("warmup")
+
+    started = time.perf_counter()
+    doc_vectors = embeddings.embed_documents(chunks)
+    doc_seconds = time.perf_counter() - started
+
+    query_vectors, timings = [], []
+    for query in queries:
+        started = time.perf_counter()
+        query_vectors.append(embeddings.embed_query(query))
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+
+    return {
+        "docs": np.asarray(doc_vectors, dtype=np.float32),
+        "queries": np.asarray(query_vectors, dtype=np.float32),
+        "p50_ms": statistics.median(timings),
+        "p95_ms": timings[int(len(timings) * 0.95) - 1] if len(timings) >= 20 else timings[-1],
+        "docs_per_s": len(chunks) / doc_seconds if doc_seconds else 0.0,
+        "rss_mb": read_rss_mb() - rss_before,
+    }
+
+
+def _worker(args):
+    return run_backend(*args)
+
+
+def top_k(doc_vectors: np.ndarray, query_vectors: np.ndarray, k: int) -> np.ndarray:
+    # 두 백엔드 모두 정규화된 벡터를 내므로 내적 = 코사인 유사도
+    scores = query_vectors @ doc_vectors.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def recall_at_k(reference: np.ndarray, candidate: np.ndarray) -> float:
+    k = reference.shape[1]
+    return float(np.mean([len(set(r) & set(c)) / k for r, c in zip(reference, candidate)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding backend benchmark")
+    parser.add_argument("--data-dir", default="backend/data/blog_posts")
+    parser.add_argument("--onnx-path", default=None, help="defaults to settings.EMBEDDING_ONNX_PATH")
+    parser.add_argument("--queries", default=None, help="file with one query per line")
+    parser.add_argument("--max-queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--backends", default="huggingface,onnx-fp32,onnx-int8")
+    args = parser.parse_args()
+
+    from app.core.config import settings
+    onnx_path = args.onnx_path or settings.EMBEDDING_ONNX_PATH
+
+    chunks = load_corpus(args.data_dir)
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()][:args.max_queries]
+    else:
+        queries = default_queries(chunks, args.max_queries)
+    k = min(args.k, len(chunks))
+    print(f"corpus chunks={len(chunks)} queries={len(queries)} k={k}\n")
+
+    # 백엔드마다 새 프로세스에서 로드해야 RSS 가 서로 섞이지 않음
+    names = [n.strip() for n in args.backends.split(",") if n.strip()]
+    ctx = multiprocessing.get_context("spawn")
+    results: Dict[str, Dict] = {}
+    for name in names:
+        with ctx.Pool(1) as pool:
+            results[name] = pool.apply(_worker, ((name, onnx_path, chunks, queries),))
+
+    reference = results.get("huggingface")
+    ref_top = top_k(reference["docs"], reference["queries"], k) if reference else None
+
+    print(f"{'backend':<12} {'p50_ms':>8} {'p95_ms':>8} {'docs/s':>9} {'rss_mb':>8} {'recall(swap)':>13} {'recall(reindex)':>16}")
+    for name, r in results.items():
+        swap = reindex = "-"
+        if ref_top is not None:
+            swap = f"{recall_at_k(ref_top, top_k(reference['docs'], r['queries'], k)):.4f}"
+            reindex = f"{recall_at_k(ref_top, top_k(r['docs'], r['queries'], k)):.4f}"
+        print(f"{name:<12} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['docs_per_s']:>9.1f} {r['rss_mb']:>8.1f} {swap:>13} {reindex:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+메타데이터 필터 검색 벤치마크 (벡터 검색 단계 필터 vs 검색 후 필터)
+
+실행 (backend 디렉터리에서):
+    python -m benchmarks.bench_filtered_retrieval [--chunks 20000] [--k 4] [--search-ef 10,50,100,200]
+
+합성 코퍼스(무작위 단위 벡터 + post / tags / lang / date_ts 메타데이터)를 Chroma 컬렉션에 넣고,
+선택도가 다른 필터마다 두 방식을 비교합니다.
+- pushdown:    where 조건을 Chroma 질의에 전달 (app.services.doc_metadata.build_where 사용)
+- post-filter: 필터 없이 k * overfetch 개를 가져온 뒤 파이썬에서 거르고 상위 k 개 선택
+측정 항목: 질의 지연 p50/p95, recall@k (numpy 로 구한 필터 적용 정확한 top-k 대비), 결과가 k 개 미만인 비율
+
+search_ef 는 컬렉션 생성 시(hnsw:search_ef) 고정되므로 값마다 컬렉션을 새로 만듭니다.
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.services.doc_metadata import build_where, tag_key
+
+
+TAGS = [f"t{i:02d}" for i in range(50)]
+LANGS = ["ko", "en", "ja"]
+LANG_WEIGHTS = [0.6, 0.3, 0.1]
+EPOCH_2022 = int(datetime(2022, 1, 1, tzinfo=timezone.utc).timestamp())
+EPOCH_2025 = int(datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp())
+
+
+def synthetic_corpus(n: int, dim: int, posts: int, seed: int):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    pick = random.Random(seed)
+    metadatas = []
+    for i in range(n):
+        tags = pick.sample(TAGS, pick.randint(1, 3))
+        metadata: Dict[str, Any] = {
+            "post": f"post-{i % posts:05d}",
+            "lang": pick.choices(LANGS, LANG_WEIGHTS)[0],
+            "date_ts": pick.randint(EPOCH_2022, EPOCH_2025),
+            "tags": ",".join(sorted(tags)),
+        }
+        for tag in tags:
+            metadata[tag_key(tag)] = True
+        metadatas.append(metadata)
+    return vectors, metadatas
+
+
+def scenarios() -> Dict[str, Dict[str, Any]]:
+    """이름 → SearchFilter 형태의 필터 (선택도 높은 순)"""
+    return {
+        "post": {"post": "post-00007"},
+        "tag+lang": {"tags": ["t03"], "lang": "ja"},
+        "tag": {"tags": ["t03"]},
+        "date(90d)": {"date_from": date(2024, 10, 1), "date_to": date(2024, 12, 31)},
+        "tags(any of 5)": {"tags": TAGS[:5]},
+        "lang": {"lang": "ko"},
+    }
+
+
+def matches(metadata: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    """build_where 와 같은 의미를 파이썬으로 평가 (정답 / post-filter 용)"""
+    if "post" in filters and metadata["post"] != filters["post"]:
+        return False
+    if "lang" in filters and metadata["lang"] != filters["lang"]:
+        return False
+    if "tags" in filters and not any(metadata.get(tag_key(t)) for t in filters["tags"]):
+        return False
+    ts = metadata["date_ts"]
+    if "date_from" in filters:
+        start = datetime.combine(filters["date_from"], datetime.min.time(), tzinfo=timezone.utc)
+        if ts < start.timestamp():
+            return False
+    if "date_to" in filters:
+        end = datetime.combine(filters["date_to"], datetime.max.time(), tzinfo=timezone.utc)
+        if ts > end.timestamp():
+            return False
+    return True
+
+
+def exact_top_k(vectors: np.ndarray, mask: np.ndarray, query: np.ndarray, k: int) -> List[int]:
+    candidates = np.flatnonzero(mask)
+    if len(candidates) == 0:
+        return []
+    distances = np.linalg.norm(vectors[candidates] - query, axis=1)
+    order = np.argsort(distances)[:k]
+    return candidates[order].tolist()
+
+
+def build_collection(client, name: str, vectors: np.ndarray, metadatas: List[Dict[str, Any]],
+                     m: int, construction_ef: int, search_ef: int, batch: int = 5000):
+    collection = client.create_collection(name, metadata={
+        "hnsw:space": "l2", "hnsw:M": m, "hnsw:construction_ef": construction_ef, "hnsw:search_ef": search_ef,
+    })
+    for start in range(0, len(vectors), batch):
+        end = min(start + batch, len(vectors))
+        collection.add(
+            ids=[str(i) for i in range(start, end)],
+            embeddings=vectors[start:end].tolist(),
+            metadatas=metadatas[start:end],
+        )
+    return collection
+
+
+def run_scenario(collection, vectors, metadatas, queries, filters, k: int, overfetch: int) -> Dict[str, Dict]:
+    mask = np.array([matches(m, filters) for m in metadatas])
+    where = build_where(filters)
+    result = {}
+    for method in ("pushdown", "post-filter"):
+        latencies, recalls, short = [], [], 0
+        for query in queries:
+            truth = exact_top_k(vectors, mask, query, k)
+            started = time.perf_counter()
+            if method == "pushdown":
+                found = collection.query(query_embeddings=[query.tolist()], n_results=k, where=where, include=[])
+                ids = [int(i) for i in found["ids"][0]]
+            else:
+                found = collection.query(query_embeddings=[query.tolist()], n_results=k * overfetch,
+                                         include=["metadatas"])
+                ids = [int(i) for i, m in zip(found["ids"][0], found["metadatas"][0]) if matches(m, filters)][:k]
+            latencies.append((time.perf_counter() - started) * 1000)
+            if truth:
+                recalls.append(len(set(ids) & set(truth)) / len(truth))
+            short += len(ids) < min(k, len(truth))
+        latencies.sort()
+        result[method] = {
+            "p50_ms": statistics.median(latencies),
+            "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            "recall": statistics.mean(recalls) if recalls else float("nan"),
+            "short_pct": 100 * short / len(queries),
+        }
+    result["selectivity_pct"] = 100 * mask.mean()
+    return result
+
+
+def main():
+    import chromadb
+
+    parser = argparse.ArgumentParser(description="Filtered retrieval benchmark (pushdown vs post-filter)")
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--overfetch", type=int, default=10, help="post-filter fetches k * overfetch")
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--construction-ef", type=int, default=100)
+    parser.add_argument("--search-ef", default="10,50,100,200", help="comma separated hnsw:search_ef values")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors, metadatas = synthetic_corpus(args.chunks, args.dim, args.posts, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    queries = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    print(f"chunks={args.chunks} dim={args.dim} queries={args.queries} k={args.k} M={args.m} "
+          f"construction_ef={args.construction_ef} overfetch={args.overfetch}\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        client = chromadb.PersistentClient(path=tmp)
+        for search_ef in [int(v) for v in args.search_ef.split(",")]:
+            started = time.perf_counter()
+            collection = build_collection(client, f"bench_ef{search_ef}", vectors, metadatas,
+                                          args.m, args.construction_ef, search_ef)
+            print(f"search_ef={search_ef} (build {time.perf_counter() - started:.1f}s)")
+            print(f"{'filter':<16} {'sel%':>6} {'method':<12} {'p50_ms':>8} {'p95_ms':>8} {'recall':>7} {'short%':>7}")
+            for name, filters in scenarios().items():
+                result = run_scenario(collection, vectors, metadatas, queries, filters, args.k, args.overfetch)
+                for method in ("pushdown", "post-filter"):
+                    r = result[method]
+                    print(f"{name:<16} {result['selectivity_pct']:>6.2f} {method:<12} {r['p50_ms']:>8.2f} "
+                          f"{r['p95_ms']:>8.2f} {r['recall']:>7.3f} {r['short_pct']:>7.1f}")
+            client.delete_collection(f"bench_ef{search_ef}")
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+응답 envelope 직렬화 / 압축 벤치마크
+
+실행 (backend 디렉터리에서):
+    python -m benchmarks.bench_response [--sources 20] [--iterations 500]
+
+측정 항목:
+- envelope: pydantic 모델 경로(모델 생성 + model_dump) vs 빠른 경로(envelope_response)의 응답당 시간, bytes/s
+- compression: 인코더별 처리량(MB/s)과 압축률
+- middleware: 인라인 압축 vs 스레드 풀 오프로드 시 응답당 이벤트 루프 점유 시간(최대 lag)
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi.responses import ORJSONResponse
+
+from app.schemas.ret_result import ResponseResult, ResponseStatus, envelope_response
+from app.utils.compression import CompressionMiddleware, CompressionStats
+
+
+def make_rag_payload(sources: int) -> dict:
+    """/blog/search (referer=True) 와 비슷한 크기의 sources 페이로드"""
+    return {
+        "answer": {
+            "answer": "FastAPI에서는 Depends를 사용해 의존성을 주입합니다. " * 5,
+            "sources": [
+                {
+                    "content": "의존성 주입은 경로 함수가 필요로 하는 객체를 선언적으로 받는 방식입니다. " * 6,
+                    "metadata": {"source": f"backend/data/blog_posts/post_{i}.md", "chunk": i},
+                    "source_file": f"backend/data/blog_posts/post_{i}.md",
+                }
+                for i in range(sources)
+            ],
+            "context_used": "context " * 60,
+        }
+    }
+
+
+def bench_envelope(data: dict, iterations: int):
+    def pydantic_path():
+        result = ResponseResult(status=ResponseStatus.SUCCESS, result_code=200, result_msg="ok", data=data)
+        return ORJSONResponse(status_code=result.result_code, content=result.model_dump(exclude_none=True))
+
+    def fast_path():
+        return envelope_response(ResponseStatus.SUCCESS, 200, "ok", data)
+
+    print("== envelope ==")
+    for name, fn in (("pydantic", pydantic_path), ("fast", fast_path)):
+        size = len(fn().body)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - started
+        print(f"{name:>10}: {elapsed / iterations * 1e6:8.1f} us/response  {size * iterations / elapsed / 1e6:8.1f} MB/s  ({size} bytes)")
+
+
+def bench_encoders(body: bytes, iterations: int):
+    print("== compression ==")
+    middleware = CompressionMiddleware(app=None)
+    for name, encoder in middleware.encoders.items():
+        compressed = encoder(body)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            encoder(body)
+        elapsed = time.perf_counter() - started
+        print(f"{name:>10}: {len(body) * iterations / elapsed / 1e6:8.1f} MB/s  ratio {len(compressed) / len(body):.3f}")
+
+
+async def bench_middleware(body: bytes, iterations: int, offload_size: int, encoding: str):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body, "more_body": False})
+
+    async def send(message):
+        pass
+
+    middleware = CompressionMiddleware(app, offload_size=offload_size)
+    middleware.stats = CompressionStats()
+    scope = {"type": "http", "headers": [(b"accept-encoding", encoding.encode())]}
+
+    # 하트비트로 이벤트 루프 지연(lag) 측정
+    max_lag = 0.0
+    running = True
+
+    async def heartbeat():
+        nonlocal max_lag
+        while running:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_lag = max(max_lag, time.perf_counter() - started - 0.001)
+
+    task = asyncio.create_task(heartbeat())
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await middleware(scope, None, send)
+        # 하트비트가 실행될 기회를 주어, 인라인 압축이 루프를 점유한 시간이 lag에 반영되도록 함
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - started
+    running = False
+    await task
+
+    stats = middleware.stats.snapshot()
+    mode = "offload" if offload_size <= len(body) else "inline"
+    print(
+        f"{encoding:>6} {mode:>8}: {len(body) * iterations / elapsed / 1e6:8.1f} MB/s  "
+        f"loop {stats['loop_ms_per_response']:.3f} ms/response  max lag {max_lag * 1000:.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sources", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    data = make_rag_payload(args.sources)
+    bench_envelope(data, args.iterations)
+
+    body = envelope_response(ResponseStatus.SUCCESS, 200, "ok", data).body
+    bench_encoders(body, args.iterations)
+
+    print("== middleware ==")
+    encodings = list(CompressionMiddleware(app=None).encoders)
+    for encoding in encodings:
+        for offload_size in (len(body) + 1, 0):
+            asyncio.run(bench_middleware(body, args.iterations, offload_size, encoding))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+summary-first 검색 vs 청크 검색 프롬프트 토큰 / 응답 지연 벤치마크
+
+실행 (backend 디렉터리에서, 요약 인덱스 생성 후):
+    python -m app.services.summary_index --corpus blog
+    python -m benchmarks.bench_summary_first [--corpus blog] [--queries queries.txt] [--k 4] [--answer]
+
+측정 항목:
+- 질의당 context 토큰 수 (blog_search 프롬프트에 들어가는 검색 결과) 평균 / p50 / p95
+- 검색 지연 p50 / p95
+- --answer: 실제 LLM 응답 지연 p50 / p95 (Groq 호출이 발생하므로 기본은 끔)
+
+질의 파일을 주지 않으면 글 제목으로 "여러 글에 걸친" 질의와 "한 글에 대한" 질의를 반씩 만듭니다.
+"""
+import argparse
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from app.services.corpus_registry import corpus_registry
+from app.services.index_snapshots import load_posts
+from app.utils.token_counter import count_tokens
+
+
+def default_queries(data_dir: str, limit: int) -> List[str]:
+    titles = [post.metadata.get("title") or post.metadata["post"] for post in load_posts(data_dir)]
+    queries = []
+    for i, title in enumerate(titles[:limit]):
+        if i % 2 == 0:
+            queries.append(f"{title}에서 설명하는 핵심 내용은 무엇인가요?")
+        else:
+            queries.append(f"블로그 글들에서 {title}와 관련된 주제를 정리해 주세요.")
+    return queries
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def run(name: str, queries: List[str], retrieve: Callable, corpus, answer: bool) -> Dict[str, float]:
+    tokens, retrieval_ms, answer_ms = [], [], []
+    for query in queries:
+        started = time.perf_counter()
+        docs = retrieve(query)
+        retrieval_ms.append((time.perf_counter() - started) * 1000)
+        context = corpus.format_docs(docs)
+        tokens.append(count_tokens(context))
+        if answer:
+            started = time.perf_counter()
+            corpus._sources_chain().invoke({"context": context, "question": query})
+            answer_ms.append((time.perf_counter() - started) * 1000)
+    row = {
+        "tokens_avg": statistics.mean(tokens),
+        "tokens_p50": percentile(tokens, 0.5),
+        "tokens_p95": percentile(tokens, 0.95),
+        "retrieval_p50_ms": percentile(retrieval_ms, 0.5),
+        "retrieval_p95_ms": percentile(retrieval_ms, 0.95),
+    }
+    if answer_ms:
+        row["answer_p50_ms"] = percentile(answer_ms, 0.5)
+        row["answer_p95_ms"] = percentile(answer_ms, 0.95)
+    print(f"{name:<14} " + "  ".join(f"{key}={value:.1f}" for key, value in row.items()))
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summary-first vs chunk retrieval benchmark")
+    parser.add_argument("--corpus", default=None)
+    parser.add_argument("--queries", default=None, help="file with one query per line")
+    parser.add_argument("--max-queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--answer", action="store_true", help="also measure LLM answer latency")
+    args = parser.parse_args()
+
+    corpus = corpus_registry.get(args.corpus)
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()][:args.max_queries]
+    else:
+        queries = default_queries(corpus.data_dir, args.max_queries)
+    if not corpus.search_summaries("warmup", 1):
+        raise SystemExit("summary index not found: run `python -m app.services.summary_index` first")
+    print(f"corpus={corpus.name} version={corpus.index_version} queries={len(queries)} k={args.k}\n")
+
+    chunks = run("chunks", queries, lambda q: corpus.get_retriever(args.k).invoke(q), corpus, args.answer)
+    summary = run("summary-first", queries, lambda q: corpus._retrieve_summary_first(q, args.k, None), corpus, args.answer)
+    print(f"\ncontext tokens: {summary['tokens_avg'] / chunks['tokens_avg'] * 100:.0f}% of chunk retrieval")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+gunicorn 워커별 메모리 측정 (Linux /proc/<pid>/smaps_rollup 기준)
+
+실행 (backend 디렉터리에서, 서버 기동 후):
+    python -m benchmarks.measure_rss --master <gunicorn master pid> [--service <embedding service pid>]
+
+측정 항목:
+- RSS: 프로세스가 매핑한 물리 메모리 (공유 페이지 포함, 워커 합계는 실제 사용량보다 큼)
+- PSS: 공유 페이지를 공유 프로세스 수로 나눈 값 (합계가 실제 사용량)
+- Private: 해당 프로세스만 사용하는 페이지 (copy-on-write로 복사된 페이지 포함)
+
+비교 방법:
+1. 기본 모드 (preload 없음): GUNICORN_PRELOAD=0 gunicorn app.main:app --config gunicorn_conf.py
+2. preload + gc.freeze:       gunicorn app.main:app --config gunicorn_conf.py
+3. 임베딩 서비스 모드:         EMBEDDING_SERVICE_SOCKET=... 로 서비스와 gunicorn 실행, --service 로 서비스 pid 지정
+각 모드에서 /blog/search 요청을 몇 차례 보낸 뒤 측정해야 워커의 지연 로드까지 반영됩니다.
+"""
+import argparse
+import os
+from typing import Dict, List
+
+
+def read_rollup(pid: int) -> Dict[str, int]:
+    """smaps_rollup 의 kB 값을 읽습니다."""
+    values: Dict[str, int] = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[-1] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "private": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+    }
+
+
+def child_pids(pid: int) -> List[int]:
+    children: List[int] = []
+    task_dir = f"/proc/{pid}/task"
+    for tid in os.listdir(task_dir):
+        path = f"{task_dir}/{tid}/children"
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                children.extend(int(c) for c in f.read().split())
+    return children
+
+
+def main():
+    parser = argparse.ArgumentParser(description="gunicorn worker RSS/PSS")
+    parser.add_argument("--master", type=int, required=True, help="gunicorn master pid")
+    parser.add_argument("--service", type=int, help="embedding service pid (service mode)")
+    args = parser.parse_args()
+
+    rows = [("master", args.master)] + [("worker", pid) for pid in child_pids(args.master)]
+    if args.service:
+        rows.append(("service", args.service))
+
+    print(f"{'role':<8} {'pid':>8} {'rss_mb':>9} {'pss_mb':>9} {'private_mb':>11}")
+    total_rss = total_pss = 0
+    workers = []
+    for role, pid in rows:
+        m = read_rollup(pid)
+        total_rss += m["rss"]
+        total_pss += m["pss"]
+        if role == "worker":
+            workers.append(m)
+        print(f"{role:<8} {pid:>8} {m['rss'] / 1024:>9.1f} {m['pss'] / 1024:>9.1f} {m['private'] / 1024:>11.1f}")
+
+    if workers:
+        avg_private = sum(m["private"] for m in workers) / len(workers) / 1024
+        print(f"\nworkers={len(workers)}  avg private per worker={avg_private:.1f} MB")
+    print(f"sum rss={total_rss / 1024:.1f} MB  sum pss (actual)={total_pss / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
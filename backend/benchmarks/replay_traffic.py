@@ -0,0 +1,181 @@
+"""
+기록된 실제 트래픽 재생 (오프라인 성능 검증)
+
+실행 (backend 디렉터리에서):
+    python -m benchmarks.replay_traffic data/recordings/traffic.jsonl* [--speed 1] [--upstream-delay] [--concurrency 64]
+
+- app.main:app 을 같은 프로세스에서 ASGI 로 직접 호출 (네트워크 / 서버 오버헤드 제외)
+- LLM 업스트림 호출은 기록된 응답을 반환하는 로컬 스텁(ReplayTransport)이 처리
+- --speed 1: 기록 당시 간격 그대로, 10: 10배 가속, 0: 간격 없이 최대 속도
+- --upstream-delay: 스텁이 기록된 LLM 지연 시간만큼 대기 (끄면 앱 자체 처리 시간만 측정)
+- 라우트별 재생 지연 분포(p50/p95/p99/max)와 기록 당시 지연 시간을 함께 출력
+"""
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from app.utils.traffic_recorder import (
+    ReplayTransport,
+    decode_body,
+    install_replay,
+    load_recordings,
+    set_replay_upstream,
+)
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def route_template(app, scope: Dict[str, Any]) -> str:
+    """/mochachat/sessions/{session_id} 처럼 라우트 템플릿 기준으로 묶습니다."""
+    from starlette.routing import Match
+    for route in app.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+    return f"{scope['method']} {scope['path']}"
+
+
+async def replay_one(app, record: Dict[str, Any]) -> Dict[str, Any]:
+    body = decode_body(record.get("request", {}))
+    headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in record.get("headers", {}).items()]
+    headers.append((b"content-length", str(len(body)).encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": record["method"],
+        "scheme": "http",
+        "path": record["path"],
+        "raw_path": record["path"].encode("utf-8"),
+        "query_string": record.get("query_string", "").encode("latin-1"),
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 0),
+        "server": ("replay", 80),
+    }
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()  # 연결 유지 (disconnect 없음)
+
+    status = {"code": None, "first_byte": None}
+    started = time.perf_counter()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+            status["first_byte"] = (time.perf_counter() - started) * 1000
+
+    # 요청마다 새 task 에서 실행되므로 업스트림 재생 큐는 이 요청에만 보임
+    set_replay_upstream(record.get("upstream", []))
+    await app(scope, receive, send)
+    return {
+        "route": route_template(app, scope),
+        "status": status["code"],
+        "duration_ms": (time.perf_counter() - started) * 1000,
+        "first_byte_ms": status["first_byte"],
+        "recorded_ms": record.get("duration_ms"),
+    }
+
+
+async def lifespan(app, phase: str, state: Optional[dict] = None):
+    """app 의 lifespan startup/shutdown 을 실행합니다."""
+    if phase == "startup":
+        queue: asyncio.Queue = asyncio.Queue()
+        done: asyncio.Queue = asyncio.Queue()
+
+        async def receive():
+            return await queue.get()
+
+        async def send(message):
+            await done.put(message)
+
+        task = asyncio.create_task(app({"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}, receive, send))
+        await queue.put({"type": "lifespan.startup"})
+        await done.get()
+        return {"task": task, "queue": queue, "done": done}
+    await state["queue"].put({"type": "lifespan.shutdown"})
+    await state["done"].get()
+    await state["task"]
+
+
+async def run(args):
+    transport = ReplayTransport(delay=args.upstream_delay)
+    install_replay(transport)
+    from app.main import app  # 스텁 설치 후 import 해야 LLM 클라이언트가 스텁을 사용
+
+    records = [r for r in load_recordings(args.files) if not r.get("body_truncated")]
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        print("no replayable records")
+        return
+
+    state = await lifespan(app, "startup") if args.lifespan else None
+    semaphore = asyncio.Semaphore(args.concurrency)
+    results: List[Dict[str, Any]] = []
+
+    async def guarded(record):
+        async with semaphore:
+            try:
+                results.append(await replay_one(app, record))
+            except Exception as e:
+                results.append({"route": f"{record['method']} {record['path']}", "status": 599,
+                                "duration_ms": 0.0, "first_byte_ms": None, "recorded_ms": None, "error": str(e)})
+
+    origin = records[0]["ts"]
+    started = time.perf_counter()
+    tasks = []
+    for record in records:
+        if args.speed > 0:
+            # 기록 당시 도착 간격을 speed 배 가속해 유지
+            wait = (record["ts"] - origin) / args.speed - (time.perf_counter() - started)
+            if wait > 0:
+                await asyncio.sleep(wait)
+        tasks.append(asyncio.create_task(guarded(record)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    if state:
+        await lifespan(app, "shutdown", state)
+
+    by_route: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for r in results:
+        by_route[r["route"]].append(r)
+
+    print(f"replayed {len(results)} requests in {elapsed:.1f}s ({len(results) / elapsed:.1f} req/s), "
+          f"speed={args.speed}, upstream_delay={args.upstream_delay}, missing upstream responses={transport.missing}\n")
+    print(f"{'route':<45} {'n':>5} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'rec_p50':>8} {'rec_p95':>8}")
+    for route, rows in sorted(by_route.items()):
+        durations = [r["duration_ms"] for r in rows]
+        recorded = [r["recorded_ms"] for r in rows if r["recorded_ms"] is not None]
+        errors = sum(1 for r in rows if (r["status"] or 599) >= 500)
+        rec_p50 = f"{percentile(recorded, 0.5):.1f}" if recorded else "-"
+        rec_p95 = f"{percentile(recorded, 0.95):.1f}" if recorded else "-"
+        print(f"{route[:45]:<45} {len(rows):>5} {errors:>4} {percentile(durations, 0.5):>8.1f} "
+              f"{percentile(durations, 0.95):>8.1f} {percentile(durations, 0.99):>8.1f} {max(durations):>8.1f} "
+              f"{rec_p50:>8} {rec_p95:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded traffic against app.main:app")
+    parser.add_argument("files", nargs="+", help="recorded JSONL files (rotated files included)")
+    parser.add_argument("--speed", type=float, default=1.0, help="pace multiplier; 0 = as fast as possible")
+    parser.add_argument("--upstream-delay", action="store_true", help="stub waits the recorded LLM latency")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--no-lifespan", dest="lifespan", action="store_false", help="skip app startup/shutdown")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
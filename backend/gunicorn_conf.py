@@ -0,0 +1,64 @@
+# gunicorn_conf.py
+import gc
+import multiprocessing
+import os
+
+# 실행: gunicorn app.main:app --config gunicorn_conf.py
+
+# ===== 포트 구성 =====
+port = os.getenv("PORT", "8000")
+bind = f"0.0.0.0:{port}"
+backlog = 2048
+
+# ===== 워커 설정 =====
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+worker_connections = 1000
+max_requests = 1000
+max_requests_jitter = 50
+
+# ===== 타임아웃 =====
+timeout = 60
+keepalive = 5
+graceful_timeout = 30
+
+# ===== 로깅 =====
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+# ===== 프로세스 설정 =====
+proc_name = "mochachat_backend"
+# 마스터에서 앱을 import 한 뒤 fork 해야 워커들이 모델 메모리를 copy-on-write로 공유
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+worker_tmp_dir = "/dev/shm"
+
+
+# ===== 임베딩 모델 공유 =====
+def when_ready(server):
+    """
+    fork 전에 마스터에서 임베딩 모델을 로드합니다.
+    EMBEDDING_SERVICE_SOCKET 설정 시에는 모델을 임베딩 서비스가 소유하므로 아무것도 로드하지 않습니다.
+    """
+    if not server.cfg.preload_app:
+        return
+    from app.services.rag_service import rag_service
+    rag_service.preload()
+    # 로드된 객체를 GC 추적 대상에서 제외: 워커의 GC가 객체 헤더를 건드려 공유 페이지가 복사되는 것을 방지
+    gc.freeze()
+    server.log.info("Embedding model preloaded before fork")
+
+
+def post_fork(server, worker):
+    # 워커마다 torch 스레드 풀이 코어 수만큼 생기면 과다 구독되므로 1개로 제한
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+
+# ===== 환경별 설정 =====
+if os.getenv("ENV") == "development":
+    workers = 2
+    loglevel = "debug"
@@ -0,0 +1,42 @@
+import hashlib
+import os
+from typing import List
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+
+class HashEmbeddings(Embeddings):
+    """텍스트 해시로 만든 결정적 벡터 (모델 없이 Chroma 인덱스를 만들기 위한 테스트용)"""
+
+    def __init__(self, dim: int = 64):
+        self.dim = dim
+
+    def _vector(self, text: str) -> List[float]:
+        import numpy as np
+
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        return np.random.default_rng(seed).random(self.dim, dtype=np.float32).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+
+@pytest.fixture
+def hash_embeddings():
+    return HashEmbeddings()
+
+
+def write_posts(directory, count: int, paragraphs: int = 1, prefix: str = "post") -> str:
+    """directory 아래에 마크다운 글 count 개를 만듭니다 (문단 하나가 대략 청크 하나)."""
+    os.makedirs(directory, exist_ok=True)
+    for i in range(count):
+        body = "\n\n".join(f"{prefix} {i} paragraph {j} " + "lorem ipsum " * 70 for j in range(paragraphs))
+        with open(os.path.join(directory, f"{prefix}-{i}.md"), "w", encoding="utf-8") as f:
+            f.write(f"# {prefix} {i}\n\n{body}\n")
+    return str(directory)
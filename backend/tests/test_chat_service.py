@@ -0,0 +1,107 @@
+import random
+import re
+import threading
+import time
+
+from app.services.chat_service import ChatService, SessionStore
+
+
+class FakeRag:
+    """LLM 대신 지연 후 답하는 RAG (요약은 이전 요약에 턴을 그대로 이어 붙임)"""
+
+    def query_with_history(self, message, history, summary, retrieval_query=None):
+        time.sleep(random.random() / 200)
+        return {"answer": f"answer to {message}", "sources": []}
+
+    def summarize_conversation(self, summary, turns):
+        time.sleep(random.random() / 100)
+        return f"{summary}\n{turns}".strip()
+
+
+def _service(store: SessionStore) -> ChatService:
+    return ChatService(store, FakeRag(), history_token_budget=30, max_message_chars=200, max_summary_chars=10 ** 6)
+
+
+def test_concurrent_chat_and_compact_keep_every_turn(tmp_path):
+    store = SessionStore(byte_budget=10 ** 6, max_turns=4)
+    service = _service(store)
+    session_id = service.chat(None, "m-start")["session_id"]
+    errors = []
+
+    def worker(offset: int):
+        try:
+            for i in range(25):
+                service.chat(session_id, f"m-{offset}-{i}")
+                service.compact(session_id)
+        except Exception as e:  # deque mutated during iteration 등
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    service.compact(session_id)
+
+    assert errors == []
+    session = store.get(session_id)
+    # 요약 / 대기 / 최근 턴 어딘가에 모든 사용자 메시지가 남아 있어야 함
+    kept = set(re.findall(r"m-\d+-\d+", "\n".join([session.summary, *(c for _, c in [*session.pending, *session.turns])])))
+    assert kept == {f"m-{n}-{i}" for n in range(6) for i in range(25)}
+    # 세션 크기 변화가 빠짐없이 반영되어야 함
+    session.recalculate_size()
+    assert store.stats()["bytes_in_memory"] == session.size_bytes
+
+
+def _fill(store: SessionStore, session_id: str, text: str = "x" * 1000):
+    session = store.get_or_create(session_id)
+    with session.lock:
+        previous = session.size_bytes
+        session.summary = f"summary of {session_id}"
+        session.append("user", text)
+        session.append("assistant", text)
+        session.recalculate_size()
+        store.update(session, previous)
+    return session
+
+
+def test_byte_budget_evicts_least_recently_used():
+    store = SessionStore(byte_budget=8500, max_turns=4)
+    for name in ("a", "b", "c"):
+        _fill(store, name)
+    store.get("a")
+    _fill(store, "d")
+
+    stats = store.stats()
+    assert stats["bytes_in_memory"] <= store.byte_budget
+    assert stats["sessions_spilled"] == 0
+    # b 가 가장 오래 쓰이지 않았으므로 먼저 폐기
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("d") is not None
+
+
+def test_evicted_sessions_spill_and_reload(tmp_path):
+    store = SessionStore(byte_budget=8500, max_turns=4, spill_path=str(tmp_path / "sessions.sqlite3"))
+    sessions = {name: _fill(store, name, text=f"{name}-" + "y" * 1000) for name in ("a", "b", "c", "d", "e")}
+    stats = store.stats()
+    assert stats["bytes_in_memory"] <= store.byte_budget
+    assert stats["sessions_in_memory"] + stats["sessions_spilled"] == 5
+
+    reloaded = store.get("a")
+    assert reloaded is not sessions["a"]
+    assert reloaded.summary == "summary of a"
+    assert list(reloaded.turns) == list(sessions["a"].turns)
+    # 다시 읽은 세션은 스필 테이블에서 빠지고, 그 대신 다른 세션이 내보내짐
+    assert store.stats()["sessions_spilled"] == stats["sessions_spilled"]
+    assert store.stats()["bytes_in_memory"] == sum(s.size_bytes for s in store._sessions.values())
+
+
+def test_eviction_skips_session_in_use():
+    store = SessionStore(byte_budget=8500, max_turns=4)
+    busy = _fill(store, "busy")
+    for name in ("a", "b"):
+        _fill(store, name)
+    with busy.lock:
+        _fill(store, "c")
+        assert store.get("busy") is busy
+    assert store.get("a") is None
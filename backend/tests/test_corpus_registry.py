@@ -0,0 +1,97 @@
+import ctypes
+import gc
+import multiprocessing
+import pathlib
+import sys
+
+import pytest
+from chromadb.api.shared_system_client import SharedSystemClient
+
+from app.services.corpus_registry import CorpusRegistry
+from app.services.index_snapshots import release_store
+from app.services.rag_service import BlogRAGService
+from conftest import HashEmbeddings, write_posts
+
+
+def _systems(root) -> list:
+    """root 아래 경로로 열려 있는 Chroma System (클래스 수준 캐시)"""
+    return [identifier for identifier in SharedSystemClient._identifier_to_system if identifier.startswith(str(root))]
+
+
+def _rss_bytes() -> int:
+    """해제된 힙을 OS 에 돌려준 뒤의 RSS"""
+    gc.collect()
+    ctypes.CDLL("libc.so.6").malloc_trim(0)
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * 4096
+
+
+def _registry(tmp_path, names, posts: int, paragraphs: int, dim: int, budget_mb: int) -> CorpusRegistry:
+    corpora = {}
+    for name in names:
+        corpora[name] = {
+            "data_dir": write_posts(tmp_path / name / "posts", posts, paragraphs, prefix=name),
+            "persist_directory": str(tmp_path / name / "db"),
+        }
+    first = names[0]
+    default = BlogRAGService(
+        data_dir=corpora[first]["data_dir"], persist_directory=corpora[first]["persist_directory"],
+        embeddings=HashEmbeddings(dim), name=first
+    )
+    return CorpusRegistry(default=default, corpora=corpora, memory_budget_mb=budget_mb)
+
+
+def test_eviction_releases_chroma_system(tmp_path):
+    registry = _registry(tmp_path, ["a", "b", "c"], posts=20, paragraphs=20, dim=64, budget_mb=1)
+    for name in ("a", "b", "c"):
+        corpus = registry.open(name)
+        assert corpus.retrieve(f"{name} 3 paragraph 4", k=2)
+
+    stats = registry.stats()["corpora"]
+    assert [stats[name]["open"] for name in ("a", "b", "c")] == [False, False, True]
+    assert stats["a"]["evictions"] == 1 and stats["b"]["evictions"] == 1
+    # 축출된 코퍼스의 System 이 캐시에 남지 않아야 함 (남으면 인덱스 메모리도 그대로)
+    assert _systems(tmp_path) == [str(tmp_path / "c" / "db" / "snapshots" / registry.get("c").index_version)]
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="RSS / malloc_trim 은 Linux 기준")
+def test_eviction_returns_index_memory(tmp_path):
+    # 앞선 테스트가 남긴 힙 단편화가 RSS 에 섞이지 않도록 새 프로세스에서 측정
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        growth, vector_bytes, systems = pool.apply(_index_memory_growth, (str(tmp_path),))
+    # 예산상 한 번에 하나만 열려 있으므로 거의 늘지 않아야 함 (축출이 메모리를 돌려주지 못하면 인덱스 네 개 분량이 남음)
+    assert growth < 2 * vector_bytes
+    assert systems == 1
+
+
+def _index_memory_growth(root: str):
+    tmp_path = pathlib.Path(root)
+    names = ["a", "b", "c", "d", "e"]
+    posts, paragraphs, dim = 30, 50, 1536
+    registry = _registry(tmp_path, names, posts, paragraphs, dim, budget_mb=1)
+    for name in names:
+        snapshots = registry.get(name).snapshots
+        version, vector_store = snapshots.build(registry.get(name).data_dir, HashEmbeddings(dim))
+        snapshots.activate(version, verify=False)
+        release_store(vector_store)
+
+    # 첫 코퍼스를 연 상태를 기준으로 (Chroma 런타임 초기화 등 한 번만 드는 메모리 제외)
+    registry.open("a").retrieve("a 1 paragraph 1", k=1)
+    baseline = _rss_bytes()
+    for name in names[1:]:
+        registry.open(name).retrieve(f"{name} 1 paragraph 1", k=1)
+    return _rss_bytes() - baseline, posts * paragraphs * dim * 4, len(_systems(tmp_path))
+
+
+def test_close_waits_for_in_flight_search(tmp_path):
+    corpus = BlogRAGService(
+        data_dir=write_posts(tmp_path / "posts", 3), persist_directory=str(tmp_path / "db"),
+        embeddings=HashEmbeddings(), name="blog"
+    )
+    with corpus.lease() as (version, vector_store):
+        corpus.close()
+        assert not corpus.is_open
+        # 빌린 스토어는 검색이 끝날 때까지 사용할 수 있음
+        assert vector_store.similarity_search("post 1", k=1)
+        assert len(_systems(tmp_path)) == 1
+    assert _systems(tmp_path) == []
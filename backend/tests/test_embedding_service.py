@@ -0,0 +1,72 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from app.services.corpus_registry import CorpusRegistry
+from app.services.embedding_service import EmbeddingServer, EmbeddingServiceClient
+from app.services.rag_service import BlogRAGService
+from conftest import HashEmbeddings, write_posts
+
+
+class SlowDocumentEmbeddings(HashEmbeddings):
+    """청크(인덱싱) 임베딩만 느린 모델 - 서버는 질의도 embed_documents 로 배치 처리하므로 길이로 구분"""
+
+    delay = 0.0
+
+    def embed_documents(self, texts):
+        if any(len(text) > 100 for text in texts):
+            time.sleep(self.delay)
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def service(tmp_path):
+    embeddings = SlowDocumentEmbeddings()
+    corpus = BlogRAGService(
+        data_dir=write_posts(tmp_path / "posts", 3), persist_directory=str(tmp_path / "db"),
+        embeddings=embeddings, name="blog"
+    )
+    server = EmbeddingServer(str(tmp_path / "embedding.sock"), CorpusRegistry(corpus, {}, 0))
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(server.serve())
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    for _ in range(200):
+        if os.path.exists(server.socket_path):
+            break
+        time.sleep(0.05)
+    yield server, embeddings
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join(5)
+
+
+def test_reindex_does_not_block_search_or_time_out(service):
+    server, embeddings = service
+    client = EmbeddingServiceClient(server.socket_path, timeout=1.0)
+    embeddings.delay = 2.0
+    done = threading.Event()
+
+    def reindex():
+        # 검색용 타임아웃(1초)보다 오래 걸리는 재인덱싱
+        client.request({"op": "index", "corpus": "blog"})
+        done.set()
+
+    thread = threading.Thread(target=reindex)
+    thread.start()
+    time.sleep(0.3)
+    started = time.monotonic()
+    results = client.request({"op": "search", "query": "post 1", "k": 1})
+    assert results and time.monotonic() - started < 1.0
+    assert not done.is_set()
+    thread.join(10)
+    assert done.is_set()
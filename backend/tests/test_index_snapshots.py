@@ -0,0 +1,103 @@
+import os
+import time
+
+import pytest
+
+from app.services.index_snapshots import SnapshotError, SnapshotStore, release_store
+from conftest import HashEmbeddings, write_posts
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    return write_posts(tmp_path / "posts", 3)
+
+
+def _build(store: SnapshotStore, data_dir: str, activate: bool = True) -> str:
+    version, vector_store = store.build(data_dir, HashEmbeddings())
+    release_store(vector_store)
+    if activate:
+        store.activate(version, verify=False)
+    time.sleep(1.1)  # 버전 이름은 초 단위 타임스탬프 순
+    return version
+
+
+def test_prune_keeps_previously_active_version(tmp_path, data_dir):
+    store = SnapshotStore(str(tmp_path / "db"), keep=0, grace_s=0)
+    first = _build(store, data_dir)
+    second = _build(store, data_dir)
+    third = _build(store, data_dir)
+
+    removed = store.prune()
+    # keep=0 이어도 직전 활성 버전은 다른 워커가 아직 열고 있을 수 있음
+    assert removed == [first]
+    assert store.versions() == [second, third]
+
+
+def test_prune_keeps_versions_retired_within_grace(tmp_path, data_dir):
+    store = SnapshotStore(str(tmp_path / "db"), keep=0, grace_s=3600)
+    versions = [_build(store, data_dir) for _ in range(3)]
+    assert store.prune() == []
+    assert store.versions() == versions
+
+    store.grace_s = 0
+    assert store.prune() == [versions[0]]
+
+
+def test_prune_keeps_previous_after_rollback_to_old_version(tmp_path, data_dir):
+    store = SnapshotStore(str(tmp_path / "db"), keep=1, grace_s=0)
+    first = _build(store, data_dir)
+    second = _build(store, data_dir)
+    third = _build(store, data_dir)
+    store.activate(first, verify=False)
+    fourth = _build(store, data_dir)
+
+    # 최근 keep 개(third)만 남기면 방금까지 활성이던 first 가 지워짐
+    assert sorted(store.prune()) == [second]
+    assert store.versions() == [first, third, fourth]
+
+
+def test_verify_rejects_modified_snapshot(tmp_path, data_dir):
+    from langchain_chroma import Chroma
+
+    store = SnapshotStore(str(tmp_path / "db"), grace_s=0)
+    good = _build(store, data_dir)
+    bad = _build(store, data_dir, activate=False)
+    # 다시 열어도(파일 바이트가 바뀌어도) 내용 체크섬은 그대로
+    assert store.verify(bad)["checksum"] == store.manifest(bad)["checksum"]
+
+    vector_store = Chroma(persist_directory=store.path(bad))
+    vector_store.delete(ids=vector_store.get(include=[])["ids"][:1])
+    release_store(vector_store)
+    with pytest.raises(SnapshotError, match="checksum mismatch"):
+        store.activate(bad)
+    assert store.current() == good
+
+
+def test_activate_swaps_current_pointer(tmp_path, data_dir):
+    store = SnapshotStore(str(tmp_path / "db"), grace_s=0)
+    assert store.current() is None and store.pointer_mtime() == 0
+    first = _build(store, data_dir)
+    mtime = store.pointer_mtime()
+    second = _build(store, data_dir)
+    assert store.current() == second and store.pointer_mtime() > mtime
+    assert store.previous() == first
+    assert store.retired() == {first: pytest.approx(time.time(), abs=5)}
+
+    os.makedirs(store.path("20000101-000000-aborted"))
+    with pytest.raises(SnapshotError, match="incomplete"):
+        store.activate("20000101-000000-aborted", verify=False)
+    assert store.current() == second
+    # 포인터는 임시 파일 교체로만 바뀌므로 남는 임시 파일이 없어야 함
+    assert not [name for name in os.listdir(store.root) if name.endswith(".tmp")]
+
+
+def test_prune_removes_aborted_builds_but_not_in_progress_ones(tmp_path, data_dir):
+    store = SnapshotStore(str(tmp_path / "db"), keep=1, grace_s=0)
+    versions = [_build(store, data_dir) for _ in range(3)]
+    aborted = "20000101-000000-aborted"
+    in_progress = "99991231-235959-running"
+    for name in (aborted, in_progress):
+        os.makedirs(store.path(name))
+
+    assert sorted(store.prune()) == [aborted, versions[0]]
+    assert sorted(os.listdir(store.snapshots_dir)) == [*versions[1:], in_progress]
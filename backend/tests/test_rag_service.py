@@ -0,0 +1,49 @@
+from chromadb.api.shared_system_client import SharedSystemClient
+
+from app.services.rag_service import BlogRAGService
+from conftest import HashEmbeddings, write_posts
+
+
+def _systems(root) -> list:
+    return [identifier for identifier in SharedSystemClient._identifier_to_system if identifier.startswith(str(root))]
+
+
+def _corpus(tmp_path) -> BlogRAGService:
+    return BlogRAGService(
+        data_dir=write_posts(tmp_path / "posts", 3), persist_directory=str(tmp_path / "db"),
+        embeddings=HashEmbeddings(), name="blog"
+    )
+
+
+def test_reindex_releases_previous_snapshot(tmp_path):
+    corpus = _corpus(tmp_path)
+    for _ in range(3):
+        corpus.load_and_index()
+        assert corpus.retrieve("post 1", k=1)
+    # 교체될 때마다 이전 버전의 System 이 해제되어 활성 버전 하나만 남음
+    assert _systems(tmp_path) == [corpus.index_path]
+
+
+def test_swap_defers_release_until_search_ends(tmp_path):
+    corpus = _corpus(tmp_path)
+    corpus.open()
+    with corpus.lease() as (version, vector_store):
+        corpus.load_and_index()
+        assert corpus.index_version != version
+        assert vector_store.similarity_search("post 2", k=1)
+        assert len(_systems(tmp_path)) == 2
+    assert _systems(tmp_path) == [corpus.index_path]
+
+
+def test_rollback_to_serving_version_keeps_it_open(tmp_path):
+    corpus = _corpus(tmp_path)
+    corpus.load_and_index()
+    first = corpus.index_version
+    corpus.load_and_index()
+    with corpus.lease():
+        assert corpus.rollback(first) == first
+        corpus.rollback(corpus.snapshots.versions()[-1])
+        # 해제 대기 중에 다시 활성화된 버전은 대여가 끝나도 닫히지 않아야 함
+        corpus.rollback(first)
+    assert corpus.index_version == first
+    assert corpus.retrieve("post 0", k=1)
@@ -0,0 +1,24 @@
+import pytest
+
+from app.core import security
+from app.core.config import settings
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+
+
+def test_admin_authorized(admin_token):
+    assert security.admin_authorized("s3cret")
+    assert not security.admin_authorized("wrong")
+    assert not security.admin_authorized(None)
+
+
+def test_admin_authorized_rejects_non_ascii_token(admin_token):
+    assert not security.admin_authorized("비밀")
+
+
+def test_admin_authorized_without_configured_token(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "")
+    assert not security.admin_authorized("")
@@ -0,0 +1,112 @@
+import pytest
+
+from app.services.sql_engine import (
+    SQLExecutionEngine,
+    SQLExecutionUnsupported,
+    expand_inline_indexes,
+    extract_setup_statements,
+    split_statements,
+    translate_mysql,
+)
+
+
+def _context(table: str, rows: int) -> str:
+    values = ", ".join(f"({i}, '{'x' * 200}')" for i in range(rows))
+    return f"CREATE TABLE {table} (id INT PRIMARY KEY, body VARCHAR(255)); INSERT INTO {table} VALUES {values};"
+
+
+def test_image_cache_bounded_by_bytes():
+    engine = SQLExecutionEngine(cache_size=64, cache_bytes=200 * 1024)
+    for i in range(10):
+        engine.warm(_context(f"t{i}", 200))
+    sizes = [len(image) for image in engine._images.values()]
+    assert engine._image_bytes == sum(sizes) <= engine.cache_bytes
+    assert 0 < len(sizes) < 10
+    # 가장 최근 context 는 캐시에 남아 바로 재사용
+    assert engine.execute("SELECT COUNT(*) AS n FROM t9", _context("t9", 200))["data"] == [{"n": 200}]
+
+
+def test_image_larger_than_budget_is_not_cached():
+    engine = SQLExecutionEngine(cache_bytes=16 * 1024)
+    engine.warm(_context("small", 1))
+    engine.warm(_context("big", 500))
+    assert len(engine._images) == 1
+    assert engine.execute("SELECT COUNT(*) AS n FROM big", _context("big", 500))["data"] == [{"n": 500}]
+
+
+CONTEXT = """
+SET NAMES utf8mb4;
+CREATE TABLE `users` (
+  `id` INT(11) UNSIGNED NOT NULL AUTO_INCREMENT,
+  `email` VARCHAR(100) NOT NULL COMMENT 'login; id',
+  `role` ENUM('admin', 'member') DEFAULT 'member',
+  `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_email` (`email`),
+  KEY `idx_role` (`role`)
+) ENGINE=InnoDB AUTO_INCREMENT=3 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+INSERT INTO `users` (`email`, `role`) VALUES ('kim@example.com', 'admin'), ('o\\'neil@example.com', 'member');
+"""
+
+
+def test_translate_mysql_dialect():
+    sql = translate_mysql("SELECT `id` FROM `users` WHERE `email` = 'a`b' LIMIT 10, 5")
+    assert sql == "SELECT \"id\" FROM \"users\" WHERE \"email\" = 'a`b' LIMIT 5 OFFSET 10"
+    assert translate_mysql("INSERT IGNORE INTO t VALUES ('it\\'s')") == "INSERT OR IGNORE INTO t VALUES ('it''s')"
+    ddl = translate_mysql("CREATE TABLE t (id BIGINT(20) UNSIGNED AUTO_INCREMENT PRIMARY KEY, s SET('a','b')) ENGINE=InnoDB")
+    assert ddl.strip() == "CREATE TABLE t (id INTEGER PRIMARY KEY, s TEXT)"
+
+
+def test_split_statements_respects_string_literals():
+    assert split_statements("SELECT ';'; SELECT 2;\n") == ["SELECT ';'", "SELECT 2"]
+
+
+def test_context_schema_and_inline_indexes_apply():
+    engine = SQLExecutionEngine()
+    result = engine.execute("SELECT id, email, role FROM `users` ORDER BY id LIMIT 0, 10", CONTEXT)
+    assert result["data"] == [
+        {"id": 1, "email": "kim@example.com", "role": "admin"},
+        {"id": 2, "email": "o'neil@example.com", "role": "member"},
+    ]
+    statements = [s for s in extract_setup_statements(CONTEXT) if s.upper().startswith("CREATE")]
+    assert [s.split(" ON ")[0] for s in expand_inline_indexes(statements[0])] == [
+        'CREATE UNIQUE INDEX "users_uq_email_0"', 'CREATE INDEX "users_idx_role_1"'
+    ]
+
+
+def test_dml_does_not_leak_into_cached_image():
+    engine = SQLExecutionEngine()
+    assert engine.execute("DELETE FROM users", CONTEXT)["row_count"] == 2
+    assert engine.execute("SELECT COUNT(*) AS n FROM users", CONTEXT)["data"] == [{"n": 2}]
+
+
+def test_row_limit_truncates():
+    engine = SQLExecutionEngine(row_limit=5)
+    result = engine.execute("WITH RECURSIVE s(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM s WHERE n < 100) SELECT n FROM s")
+    assert result["row_count"] == 5 and result["truncated"]
+
+
+def test_timeout_stops_runaway_query():
+    engine = SQLExecutionEngine(timeout_ms=100)
+    result = engine.execute("WITH RECURSIVE s(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM s) SELECT COUNT(*) FROM s")
+    assert not result["success"]
+    assert "100ms" in result["query_explanation"]
+
+
+@pytest.mark.parametrize("query", [
+    "ATTACH DATABASE '/tmp/x.db' AS x",
+    "PRAGMA writable_schema = ON",
+    "SELECT load_extension('libevil')",
+])
+def test_sandbox_denies_escape_hatches(query):
+    with pytest.raises(SQLExecutionUnsupported):
+        SQLExecutionEngine().execute(query, CONTEXT)
+
+
+def test_database_size_is_capped():
+    engine = SQLExecutionEngine(max_db_bytes=256 * 1024)
+    with pytest.raises(SQLExecutionUnsupported, match="full"):
+        engine.execute(
+            "CREATE TABLE big AS WITH RECURSIVE s(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM s WHERE n < 100000) "
+            "SELECT n, hex(randomblob(100)) AS pad FROM s"
+        )
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from app.utils.structured_output import IncrementalJSONParser
+
+DOCUMENT = {
+    "answer": "SELECT a, b FROM t WHERE c = '{x}, [y]'",
+    "escaped": "quote \" backslash \\ comma , brace }",
+    "nested": {"list": [1, {"k": "v,}"}], "empty": {}},
+    "count": 3,
+    "ok": True,
+    "none": None,
+}
+
+
+def _parse(chunks):
+    parser = IncrementalJSONParser()
+    fields = []
+    for chunk in chunks:
+        fields.extend(parser.feed(chunk))
+    return parser, fields
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, 10_000])
+def test_fields_match_json_loads_for_any_chunking(size):
+    text = "```json\n" + json.dumps(DOCUMENT, indent=2) + "\n```"
+    parser, fields = _parse(text[i:i + size] for i in range(0, len(text), size))
+    assert parser.done
+    assert fields == list(DOCUMENT.items())
+
+
+def test_field_is_emitted_as_soon_as_it_completes():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"first": "a", "sec') == [("first", "a")]
+    assert parser.feed('ond": [1, 2') == []
+    assert parser.feed("]}") == [("second", [1, 2])]
+    assert parser.done
+
+
+def test_stops_after_top_level_object_and_skips_malformed_member():
+    parser, fields = _parse(['{"a": 1, "b": oops, "c": 2} {"d": 4}'])
+    assert parser.done
+    assert fields == [("a", 1), ("c", 2)]
@@ -0,0 +1,126 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from app.services import upload_service as upload_module
+from app.services.upload_service import Rejections, StagedFile, UploadError, UploadService, safe_relpath
+
+
+def _service(tmp_path, **limits):
+    options = dict(max_bytes=1 << 30, max_file_bytes=1 << 20, max_files=100,
+                   max_expanded_bytes=1 << 24, buffer_bytes=1 << 16, max_entries=1000)
+    options.update(limits)
+    staging = tmp_path / "staging"
+    staging.mkdir(exist_ok=True)
+    return UploadService(str(staging), **options)
+
+
+def _tar(path, entries):
+    with tarfile.open(path, "w:gz") as archive:
+        for name, data in entries:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return StagedFile(path.name, str(path))
+
+
+def _zip(path, entries):
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+    return StagedFile(path.name, str(path))
+
+
+def test_rejections_keep_bounded_sample():
+    rejected = Rejections(limit=3)
+    for i in range(10):
+        rejected.add(f"f{i}", "unsupported file type")
+    assert rejected.count == 10
+    assert [r["name"] for r in rejected.sample] == ["f0", "f1", "f2"]
+
+
+def test_expand_bounds_rejections_and_streams_tar(tmp_path, monkeypatch):
+    service = _service(tmp_path)
+    entries = [(f"img/{i}.png", b"x") for i in range(500)] + [("posts/a.md", b"# a\n")]
+    staged = _tar(tmp_path / "posts.tar.gz", entries)
+
+    held = []
+    original_next = tarfile.TarFile.next
+
+    def next_member(archive):
+        member = original_next(archive)
+        held.append(len(archive.members))
+        return member
+
+    monkeypatch.setattr(tarfile.TarFile, "next", next_member)
+    rejected, extracted = Rejections(), []
+    documents = service._expand([staged], "", extracted, rejected)
+
+    assert [d.name for d in documents] == ["posts/a.md"]
+    assert rejected.count == 500
+    assert len(rejected.sample) == upload_module.REJECTED_SAMPLE
+    # 지나간 TarInfo 가 쌓이지 않음
+    assert max(held) <= 1
+
+
+@pytest.mark.parametrize("build", [_tar, _zip])
+def test_expand_caps_archive_entries(tmp_path, build):
+    service = _service(tmp_path, max_entries=50)
+    suffix = ".tar.gz" if build is _tar else ".zip"
+    staged = build(tmp_path / f"many{suffix}", [(f"img/{i}.png", b"x") for i in range(51)])
+    with pytest.raises(UploadError) as e:
+        service._expand([staged], "", [], Rejections())
+    assert e.value.status_code == 413
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("posts/a.md", "posts/a.md"),
+    ("./posts//b.md", "posts/b.md"),
+    ("posts\\win\\c.md", "posts/win/c.md"),
+    ("/etc/passwd.md", "etc/passwd.md"),
+    ("../escape.md", None),
+    ("posts/../../escape.md", None),
+    ("posts/.hidden.md", None),
+    (".git/config.md", None),
+    ("__MACOSX/posts/a.md", None),
+    ("C:/Windows/a.md", None),
+    ("", None),
+])
+def test_safe_relpath(name, expected):
+    assert safe_relpath(name) == expected
+
+
+@pytest.mark.parametrize("build", [_tar, _zip])
+def test_expand_rejects_unsafe_archive_paths(tmp_path, build):
+    service = _service(tmp_path)
+    suffix = ".tar.gz" if build is _tar else ".zip"
+    staged = build(tmp_path / f"evil{suffix}", [
+        ("../../outside.md", b"# x\n"),
+        ("posts/../../../outside.md", b"# x\n"),
+        ("posts/.secret.md", b"# x\n"),
+        ("posts/ok.md", b"# ok\n"),
+    ])
+    rejected, extracted = Rejections(), []
+    documents = service._expand([staged], "imports", extracted, rejected)
+
+    assert [d.name for d in documents] == ["imports/posts/ok.md"]
+    assert {r["reason"] for r in rejected.sample} == {"unsafe or hidden path"}
+    assert rejected.count == 3
+    # 추출 파일은 스테이징 디렉터리 안에만 생김
+    assert all(os.path.dirname(d.path) == service.staging_dir for d in extracted)
+    assert not (tmp_path / "outside.md").exists()
+
+
+def test_expand_ignores_tar_links(tmp_path):
+    service = _service(tmp_path)
+    path = tmp_path / "links.tar"
+    with tarfile.open(path, "w") as archive:
+        for name, kind, target in (("posts/passwd.md", tarfile.SYMTYPE, "/etc/passwd"),
+                                   ("posts/hard.md", tarfile.LNKTYPE, "/etc/passwd")):
+            info = tarfile.TarInfo(name)
+            info.type, info.linkname = kind, target
+            archive.addfile(info)
+    assert service._expand([StagedFile(path.name, str(path))], "", [], Rejections()) == []
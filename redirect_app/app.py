@@ -1,24 +1,38 @@
 # app.py
-from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
-from dotenv import load_dotenv
 import os
 
-load_dotenv()
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:  # optional
+    pass
 
-app = FastAPI(
-    title="Mocha Chat API", version="0.0.1",
-    docs_url=None, redoc_url=None
-)
+# REDIRECT_MODE=asgi (기본): 미리 만든 응답을 보내는 raw ASGI 앱
+# REDIRECT_MODE=fastapi: 기존 FastAPI 앱
+REDIRECT_MODE = os.getenv("REDIRECT_MODE", "asgi")
 
 
-@app.get("/")
-async def redirect_to_vercel():
-    """
-    루트 경로 접근 시 Vercel로 리다이렉트, /api/v1/* 엔드포인트는 별도 처리
-    mochachat.app:443 -> mochachat.vercel.app
-    """
-    return RedirectResponse(
-        url=os.getenv("REDIRECT_URL"),
-        status_code=301  # Permanent Redirect
+if REDIRECT_MODE == "fastapi":
+    from fastapi import FastAPI
+    from fastapi.responses import RedirectResponse
+
+    app = FastAPI(
+        title="Mocha Chat API", version="0.0.1",
+        docs_url=None, redoc_url=None
     )
+
+    @app.get("/")
+    async def redirect_to_vercel():
+        """
+        루트 경로 접근 시 Vercel로 리다이렉트, /api/v1/* 엔드포인트는 별도 처리
+        mochachat.app:443 -> mochachat.vercel.app
+        """
+        return RedirectResponse(
+            url=os.getenv("REDIRECT_URL"),
+            status_code=301  # Permanent Redirect
+        )
+else:
+    from asgi_redirect import create_app
+
+    # mochachat.app:443 -> mochachat.vercel.app (헤더/바디는 시작 시 1회 생성)
+    app = create_app()
@@ -0,0 +1,105 @@
+# asgi_redirect.py
+"""
+초경량 raw ASGI 리다이렉트 앱.
+
+FastAPI/pydantic 없이 응답 헤더와 바디를 시작 시 한 번만 만들어 두고,
+요청마다 미리 만든 메시지를 그대로 전송합니다.
+경로/쿼리 보존 옵션을 켜면 Location 헤더만 요청마다 조합합니다.
+"""
+import os
+from typing import List, Optional, Tuple
+
+Headers = List[Tuple[bytes, bytes]]
+
+_REDIRECT_METHODS = ("GET", "HEAD")
+
+
+def _start(status: int, headers: Headers) -> dict:
+    return {"type": "http.response.start", "status": status, "headers": headers}
+
+
+_EMPTY_BODY = {"type": "http.response.body", "body": b""}
+_NOT_FOUND = (
+    _start(404, [(b"content-type", b"text/plain; charset=utf-8"), (b"content-length", b"9")]),
+    {"type": "http.response.body", "body": b"Not Found"},
+)
+_METHOD_NOT_ALLOWED = (
+    _start(405, [(b"allow", b"GET, HEAD"), (b"content-type", b"text/plain; charset=utf-8"), (b"content-length", b"18")]),
+    {"type": "http.response.body", "body": b"Method Not Allowed"},
+)
+
+
+class RedirectApp:
+    """
+    Args:
+        target: 리다이렉트 대상 URL (REDIRECT_URL)
+        status_code: 리다이렉트 상태 코드 (기본 301)
+        preserve_path: 요청 경로를 대상 URL 뒤에 붙임
+        preserve_query: 쿼리 문자열을 대상 URL 뒤에 붙임
+        root_only: True 면 "/" 만 리다이렉트하고 나머지 경로는 404 (기존 FastAPI 앱과 동일)
+    """
+
+    def __init__(self, target: str, status_code: int = 301, preserve_path: bool = False,
+                 preserve_query: bool = False, root_only: bool = True):
+        if not target:
+            raise ValueError("REDIRECT_URL is not set")
+        self.target = target.encode("latin-1")
+        self.base = self.target.rstrip(b"/") if preserve_path else self.target
+        self.status_code = status_code
+        self.preserve_path = preserve_path
+        self.preserve_query = preserve_query
+        self.root_only = root_only
+        # 고정 Location 이면 응답 메시지 전체를 미리 생성
+        self._static: Optional[dict] = None
+        if not (preserve_path or preserve_query):
+            self._static = _start(status_code, self._headers(self.target))
+
+    @staticmethod
+    def _headers(location: bytes) -> Headers:
+        return [(b"location", location), (b"content-length", b"0")]
+
+    def _location(self, scope) -> bytes:
+        location = self.base
+        if self.preserve_path:
+            location += scope.get("raw_path") or scope["path"].encode("utf-8")
+        if self.preserve_query and scope.get("query_string"):
+            location += b"?" + scope["query_string"]
+        return location
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            if self.root_only and scope["path"] != "/":
+                await send(_NOT_FOUND[0])
+                await send(_NOT_FOUND[1])
+                return
+            if scope["method"] not in _REDIRECT_METHODS:
+                await send(_METHOD_NOT_ALLOWED[0])
+                await send(_METHOD_NOT_ALLOWED[1])
+                return
+            await send(self._static or _start(self.status_code, self._headers(self._location(scope))))
+            await send(_EMPTY_BODY)
+        elif scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+
+def _env_flag(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def create_app() -> RedirectApp:
+    """환경 변수는 시작 시 한 번만 읽습니다."""
+    preserve_path = _env_flag("REDIRECT_PRESERVE_PATH")
+    return RedirectApp(
+        target=os.getenv("REDIRECT_URL", ""),
+        status_code=int(os.getenv("REDIRECT_STATUS", "301")),
+        preserve_path=preserve_path,
+        preserve_query=_env_flag("REDIRECT_PRESERVE_QUERY"),
+        # 경로 보존 시에는 모든 경로를 리다이렉트하는 것이 기본
+        root_only=_env_flag("REDIRECT_ROOT_ONLY", "false" if preserve_path else "true"),
+    )
@@ -0,0 +1,157 @@
+# bench_redirect.py
+"""
+리다이렉트 서버 벤치마크: 기존 FastAPI 앱 vs raw ASGI 앱
+
+실행:
+    python bench_redirect.py [--duration 10] [--connections 64] [--clients 2] [--target-rps 2000]
+
+- 서버는 모드별로 uvicorn 워커 1개를 CPU 코어 1개에 고정해 실행 (requests/s per core)
+- 부하 생성기는 나머지 코어에 고정된 별도 프로세스에서 keep-alive 연결로 GET / 반복
+- 부하 후 서버 프로세스의 RSS / PSS 측정 (워커당 메모리)
+- 측정값과 --target-rps 로 권장 워커 수 계산
+"""
+import argparse
+import asyncio
+import math
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+_REQUEST = b"GET / HTTP/1.1\r\nHost: bench\r\n\r\n"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout: float = 15.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not start on port {port}")
+
+
+def _memory_mb(pid: int):
+    rss = pss = 0.0
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss = int(line.split()[1]) / 1024
+    rollup = f"/proc/{pid}/smaps_rollup"
+    if os.path.exists(rollup):
+        with open(rollup) as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    pss = int(line.split()[1]) / 1024
+    return rss, pss
+
+
+async def _connection(port: int, deadline: float) -> int:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    count = 0
+    try:
+        while time.perf_counter() < deadline:
+            writer.write(_REQUEST)
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            count += 1
+    finally:
+        writer.close()
+    return count
+
+
+def _client(port: int, connections: int, duration: float, cpus, queue):
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+    async def run():
+        deadline = time.perf_counter() + duration
+        results = await asyncio.gather(*(_connection(port, deadline) for _ in range(connections)))
+        return sum(results)
+
+    queue.put(asyncio.run(run()))
+
+
+def bench_mode(mode: str, args) -> dict:
+    port = _free_port()
+    env = dict(os.environ, REDIRECT_MODE=mode, REDIRECT_URL=args.url)
+    cpu_count = os.cpu_count() or 1
+    server_cpus = {0}
+    client_cpus = set(range(1, cpu_count)) or None
+
+    def pin_server():
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, server_cpus)
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--workers", "1",
+         "--no-access-log", "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        preexec_fn=pin_server,
+    )
+    try:
+        _wait_for_port(port)
+        idle_rss, _ = _memory_mb(server.pid)
+
+        queue = multiprocessing.Queue()
+        per_client = max(1, args.connections // args.clients)
+        clients = [
+            multiprocessing.Process(target=_client, args=(port, per_client, args.duration, client_cpus, queue))
+            for _ in range(args.clients)
+        ]
+        for c in clients:
+            c.start()
+        total = sum(queue.get() for _ in clients)
+        for c in clients:
+            c.join()
+
+        rss, pss = _memory_mb(server.pid)
+        return {"mode": mode, "rps": total / args.duration, "idle_rss": idle_rss, "rss": rss, "pss": pss}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="redirect server benchmark")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=2)
+    parser.add_argument("--url", default="https://mochachat.vercel.app")
+    parser.add_argument("--target-rps", type=float, default=2000.0, help="expected peak requests/s")
+    parser.add_argument("--modes", default="fastapi,asgi")
+    args = parser.parse_args()
+
+    results = [bench_mode(mode.strip(), args) for mode in args.modes.split(",") if mode.strip()]
+
+    print(f"\n{'mode':<8} {'req/s/core':>11} {'idle_rss_mb':>12} {'rss_mb':>8} {'pss_mb':>8}")
+    for r in results:
+        print(f"{r['mode']:<8} {r['rps']:>11.0f} {r['idle_rss']:>12.1f} {r['rss']:>8.1f} {r['pss']:>8.1f}")
+
+    # 리다이렉트는 CPU 만 쓰는 짧은 요청이므로 워커 수는 코어 수를 넘길 필요가 없음 (2n+1 은 블로킹 I/O 기준)
+    cpu_count = os.cpu_count() or 1
+    print(f"\nrecommended workers for {args.target_rps:.0f} req/s peak (30% headroom, cores={cpu_count}):")
+    for r in results:
+        needed = max(1, math.ceil(args.target_rps * 1.3 / r["rps"])) if r["rps"] else cpu_count
+        workers = min(needed, cpu_count)
+        print(f"  {r['mode']:<8} workers={workers}  memory~{workers * r['rss']:.0f} MB"
+              + ("  (target exceeds capacity of all cores)" if needed > cpu_count else ""))
+
+
+if __name__ == "__main__":
+    main()
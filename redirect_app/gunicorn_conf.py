@@ -19,7 +19,14 @@ if port == "443":
     ssl_version = 5  # TLS 1.2+
 
 # ===== 워커 설정 =====
-workers = multiprocessing.cpu_count() * 2 + 1
+# raw ASGI 리다이렉트(기본)는 요청당 CPU 사용이 매우 짧아 코어 1개로도 충분한 처리량이 나오므로
+# 2n+1 워커는 메모리만 늘림. 재시작(max_requests) 중에도 응답하도록 최대 2개, WEB_CONCURRENCY 로 조정
+# (측정값: docs/setup.md "Redirect 서버", python bench_redirect.py --target-rps <peak> 결과의 권장 워커 수 참고)
+if os.getenv("REDIRECT_MODE", "asgi") == "fastapi":
+    workers = multiprocessing.cpu_count() * 2 + 1
+else:
+    workers = min(multiprocessing.cpu_count(), 2)
+workers = int(os.getenv("WEB_CONCURRENCY", workers))
 worker_class = "uvicorn.workers.UvicornWorker"
 worker_connections = 1000
 max_requests = 1000